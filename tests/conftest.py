@@ -0,0 +1,6 @@
+# coding=utf-8
+"""timmeh's modules import each other as siblings, as when run from beside timmeh.py"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'timmeh'))
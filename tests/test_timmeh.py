@@ -0,0 +1,347 @@
+# coding=utf-8
+"""TimezoneLookup on the shipped map, and maps built from it"""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import timmeh
+import tzbuild
+
+
+def test_lookup_many_rejects_non_finite():
+    """NaN and infinity are a ValueError naming the point, as from the scalar lookup, not an IndexError"""
+    with pytest.raises(ValueError, match='number 1'):
+        timmeh.lookup_many([48.85, np.nan], [2.35, 2.35])
+    with pytest.raises(ValueError):
+        timmeh.lookup_many([48.85], [np.inf])
+    with pytest.raises(ValueError):
+        timmeh.lookup(float('nan'), 2.35)
+
+
+def quarter_map(tmp_path, **options):
+    """A quarter scale map of the shipped image, built in tmp_path"""
+    return timmeh.TimezoneLookup(raster_path=str(tmp_path / 'tz.npy'), scale=.25, **options)
+
+
+@pytest.fixture(scope='module')
+def quarter(tmp_path_factory):
+    """A quarter scale map, built once for the tests that only read it"""
+    timezones = quarter_map(tmp_path_factory.mktemp('quarter'))
+    timezones.load()
+    return timezones
+
+
+def test_run_length_index(quarter):
+    """The ZoneIndex answers as the raster it was squeezed from, pixel by pixel and window by window"""
+    raster = np.asarray(quarter.zone_raster)
+    index = quarter.zone_index
+    rng = np.random.default_rng(7)
+    pixel_rows, pixel_columns = rng.integers(0, raster.shape[0], (50, 40)), rng.integers(0, raster.shape[1], (50, 40))
+    assert np.array_equal(index.zones_at(pixel_rows, pixel_columns), raster[pixel_rows, pixel_columns])
+    assert [index.zone_at(row, column) for row, column in zip(pixel_rows[0], pixel_columns[0])] == \
+        raster[pixel_rows[0], pixel_columns[0]].tolist()
+    for row, column in (np.argwhere(index.tile_zones == timmeh.MIXED_TILE)[0] * index.tile_size,
+                        np.argwhere(index.tile_zones != timmeh.MIXED_TILE)[0] * index.tile_size):
+        assert np.ndim(index.zones_at(row, column)) == 0  # A single pixel, mixed tile or not
+        assert index.zones_at(row, column) == raster[row, column]
+
+    for first_row, first_column, rows, columns in zip(rng.integers(0, raster.shape[0] - 100, 200),
+                                                      rng.integers(0, raster.shape[1] - 100, 200),
+                                                      rng.integers(1, 100, 200), rng.integers(1, 100, 200)):
+        window = raster[first_row:first_row + rows, first_column:first_column + columns]
+        assert np.array_equal(index.zones_in_window(first_row, first_row + rows - 1, first_column,
+                                                    first_column + columns - 1), np.unique(window))
+
+
+def test_lookup_many_on_the_index(quarter):
+    """On the run-length index a single point, or a grid of them, comes back as from the raster"""
+    on_index = timmeh.TimezoneLookup(**dict(quarter.options, runs=True))
+    assert on_index.lookup_many(48.85, 2.35) == quarter.lookup_many(48.85, 2.35) == \
+        (quarter.zone_names.index('Europe/Paris'), 'Europe/Paris')
+    lats, lons = np.meshgrid(np.linspace(-60, 70, 40), np.linspace(-180, 179, 60))
+    assert np.array_equal(on_index.lookup_many(lats, lons)[1], quarter.lookup_many(lats, lons)[1])
+
+
+def test_zones_in_box(quarter):
+    """The timezones with any part in a box, across the antimeridian as two boxes"""
+    assert quarter.zones_in_box(48.85, 2.35, 48.85, 2.35) == ['Europe/Paris']
+    around_paris = quarter.zones_in_box(45, 0, 55, 15)
+    assert {'Europe/Paris', 'Europe/Berlin', 'Europe/Brussels', 'Europe/Zurich'} <= set(around_paris)
+    assert 'America/New_York' not in around_paris
+    across = quarter.zones_in_box(-50, 170, -40, -170)
+    west, east = quarter.zones_in_box(-50, 170, -40, 180), quarter.zones_in_box(-50, -180, -40, -170)
+    assert 'Pacific/Auckland' in across
+    assert set(across) == set(west) | set(east)
+    assert across == sorted(across, key=quarter.zone_names.index)
+
+
+def test_other_builds_refused(tmp_path):
+    """A zone table of a newer build format, or without one, is an IOError rather than built over"""
+    timezones = quarter_map(tmp_path)
+    timezones.load()
+    build_format, zone_lines = timmeh.read_zone_table(timezones.table_path)
+    assert build_format == timmeh.BUILD_FORMAT
+    with open(timezones.table_path, 'w', encoding='utf-8') as table:
+        table.write('{}{}\n'.format(timmeh.TABLE_HEADER, timmeh.BUILD_FORMAT + 1) + '\n'.join(zone_lines) + '\n')
+    with pytest.raises(IOError, match='newer'):
+        quarter_map(tmp_path).load()
+
+    with open(timezones.table_path, 'w', encoding='utf-8') as table:
+        table.write('\n'.join(zone_lines) + '\n')
+    with pytest.raises(IOError, match='no build format header'):
+        quarter_map(tmp_path).load()
+
+
+def test_stale_database_rebuilt(tmp_path):
+    """A zone database older than the raster beside it is packed again, one of another version refused"""
+    database_path = str(tmp_path / 'tz.tzdb')
+    quarter_map(tmp_path, database=database_path).load()
+    assert timmeh.ZoneDatabase(database_path).build_format == timmeh.BUILD_FORMAT
+
+    database_time = os.path.getmtime(database_path)
+    os.utime(quarter_map(tmp_path).raster_path, (database_time + 10, database_time + 10))  # The raster built since
+    timezones = quarter_map(tmp_path, database=database_path)
+    assert timezones.lookup(48.85, 2.35)[3] == 'Europe/Paris'
+    assert os.path.getmtime(database_path) > database_time
+
+    with open(database_path, 'r+b') as database:
+        database.seek(4)
+        database.write(b'\x02\x00')
+    with pytest.raises(IOError, match='version 2'):
+        timmeh.ZoneDatabase(database_path)
+    with pytest.raises(IOError, match='version 2'):
+        quarter_map(tmp_path, database=database_path).load()
+
+
+def test_builds_at_once(tmp_path):
+    """Processes all finding the map missing at once build it between them, none tripping over another's
+    half written files"""
+    code = 'import timmeh; print(timmeh.TimezoneLookup(raster_path={!r}, scale=.25).lookup(48.85, 2.35)[3])'.format(
+        str(tmp_path / 'tz.npy'))
+    environment = dict(os.environ, PYTHONPATH=os.path.dirname(timmeh.__file__))
+    processes = [subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                  env=environment, cwd=str(tmp_path)) for __ in range(8)]
+    results = [process.communicate(timeout=300) for process in processes]
+    assert [(process.returncode, stdout.decode().strip()) for process, (stdout, __stderr) in zip(processes, results)] \
+        == [(0, 'Europe/Paris')] * 8, [stderr.decode()[-300:] for __stdout, stderr in results]
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')]
+
+
+def test_imported_as_a_package(tmp_path):
+    """'from timmeh import timmeh' from elsewhere, only the directory above timmeh on the path, builds,
+    tags and finds the colour dictionaries with the modules of the package, not ones beside the caller"""
+    code = '\n'.join([
+        'import io',
+        'from timmeh import timmeh, tzbuild, tztag',
+        'timezones = timmeh.TimezoneLookup(raster_path={!r}, scale=.25)'.format(str(tmp_path / 'tz.npy')),
+        'print(timezones.lookup(48.85, 2.35)[3], tzbuild.timmeh is timmeh is tztag.timmeh, len(timmeh.seadic) > 0)',
+        'tagged = io.StringIO()',
+        'tztag.tag_csv(io.StringIO("lat,lon\\n52.52,13.4\\n"), tagged, timezones, "lat", "lon", "tz", 10)',
+        'print(tagged.getvalue().split()[-1])'])
+    environment = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(timmeh.__file__)))
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            env=environment, cwd=str(tmp_path), timeout=300)
+    assert result.stdout.decode().split() == ['Europe/Paris', 'True', 'True', '52.52,13.4,Europe/Berlin'], \
+        result.stderr.decode()[-300:]
+
+
+def database_only(tmp_path, distances=False):
+    """A quarter scale zone database, with the raster and everything beside it gone
+    Arguments:
+        distances (bool), the distance field worked out before packing, so packed too
+    """
+    database_path = str(tmp_path / 'tz.tzdb')
+    if distances:
+        quarter_map(tmp_path).distance_field
+    quarter_map(tmp_path, database=database_path).load()
+    for name in os.listdir(str(tmp_path)):
+        if not name.endswith('.tzdb'):
+            os.remove(str(tmp_path / name))
+    return timmeh.TimezoneLookup(raster_path=str(tmp_path / 'tz.npy'), database=database_path)
+
+
+def test_extent_from_database(tmp_path):
+    """A zone database alone says where a zone is, as the raster it was packed from does"""
+    (tmp_path / 'raster').mkdir()
+    (tmp_path / 'database').mkdir()
+    from_raster = quarter_map(tmp_path / 'raster').extent('Europe/Berlin')
+    from_database = database_only(tmp_path / 'database').extent('Europe/Berlin')
+    assert from_database == from_raster
+
+
+def test_border_distance_from_database(tmp_path):
+    """The distance field is worked out when first wanted, not with the map. A zone database packed with
+    it needs nothing else; one packed without works it out from the raster beside it, or says plainly
+    there's none."""
+    (tmp_path / 'raster').mkdir()
+    (tmp_path / 'database').mkdir()
+    lats, lons = np.random.default_rng(21).uniform([-60, -180], [70, 180], (2000, 2)).T
+    from_raster = quarter_map(tmp_path / 'raster', database=str(tmp_path / 'raster' / 'tz.tzdb'))
+    from_raster.load()
+    assert not os.path.exists(from_raster.distance_path)  # Lookups needn't wait for it
+    assert timmeh.ZoneDatabase(from_raster.database).distances is None
+    distances = [from_raster.border_distance(lat, lon) for lat, lon in zip(lats, lons)]
+    assert os.path.exists(from_raster.distance_path)
+
+    from_database = database_only(tmp_path / 'database', distances=True)
+    assert [from_database.border_distance(lat, lon) for lat, lon in zip(lats, lons)] == distances
+
+    import tzbuild
+    tzbuild.write_database(from_database.database, from_raster.raster_path, distances=False)
+    with pytest.raises(IOError, match='without a distance field'):
+        timmeh.TimezoneLookup(raster_path=from_database.raster_path, database=from_database.database)\
+            .border_distance(48.85, 2.35)
+
+
+def test_skipping_within_border_distance_is_safe(tmp_path):
+    """However it moves, a point moved less than its border distance is still in the same zone"""
+    rng = np.random.default_rng(46)
+    timezones = quarter_map(tmp_path)
+    lats, lons = rng.uniform([-70, -180], [75, 180], (46000, 2)).T
+    distances = timezones.border_distances(lats, lons)
+    moved_lons, moved_lats, __bearings = timezones.geoid.fwd(lons, lats, rng.uniform(0, 360, len(lats)),
+                                                             distances * rng.uniform(0, 1, len(lats)))
+    zone_ids, __names = timezones.lookup_many(lats, lons)
+    moved_ids, __names = timezones.lookup_many(moved_lats, moved_lons)
+    assert (distances > 0).sum() > 20000
+    assert list(zip(lats[zone_ids != moved_ids], lons[zone_ids != moved_ids])) == []
+
+
+def test_track_runs_and_crossings(quarter):
+    """A track comes back as runs of fixes by zone, each run with where the track came into its zone:
+    in that zone, and within a pixel of where the segment before was last elsewhere"""
+    lats = [48.85, 48.86, 52.52, 52.53, 52.51, 40.71, -45.0, -45.0]
+    lons = [2.35, 2.36, 13.40, 13.41, 13.39, -74.0, 175.0, -175.0]
+    runs = quarter.track(lats, lons)
+    assert [(run.start, run.end, run.tz) for run in runs[:3]] == \
+        [(0, 1, 'Europe/Paris'), (2, 4, 'Europe/Berlin'), (5, 5, 'America/New_York')]
+    assert [run.tz for run in runs] == [quarter.lookup(lats[run.start], lons[run.start])[3] for run in runs]
+    assert (runs[0].lat, runs[0].lon) == (48.85, 2.35)
+    pixel = 360 / quarter.max_columns
+    for run in runs[1:]:
+        assert quarter.lookup(run.lat, run.lon)[3] == run.tz
+        before = run.start - 1  # A pixel further back towards the fix before is another zone
+        towards = np.array([lats[before] - run.lat, (lons[before] - run.lon + 180) % 360 - 180])
+        back_lat, back_lon = np.array([run.lat, run.lon]) + towards / np.hypot(*towards) * 2 * pixel
+        assert quarter.lookup(back_lat, (back_lon + 180) % 360 - 180)[3] != run.tz
+    assert runs[-1].lon >= 175 or runs[-1].lon <= -175  # The short way, over the antimeridian
+    assert quarter.track([], []) == []
+
+
+def test_lookup_many_across_workers(quarter):
+    """Worker processes answer a big batch as one process does, and a bad point is numbered in the batch"""
+    lats, lons = np.random.default_rng(13).uniform([-90, -180], [90, 180], (timmeh.PARALLEL_MINIMUM + 50000, 2)).T
+    with timmeh.TimezoneLookup(workers=2, **quarter.options) as parallel:
+        zone_ids, names = parallel.lookup_many(lats, lons)
+        assert np.array_equal(zone_ids, quarter.lookup_many(lats, lons)[0])
+        assert np.array_equal(names, quarter.zone_name_array[zone_ids])
+        grid_ids, __names = parallel.lookup_many(lats.reshape(-1, 50), lons.reshape(-1, 50))
+        assert np.array_equal(grid_ids, zone_ids.reshape(-1, 50))
+        lats[230000] = np.nan
+        with pytest.raises(ValueError, match='number 230000'):
+            parallel.lookup_many(lats, lons)
+
+
+def test_spatial_join_as_gathered(quarter):
+    """join=True answers as the plain gather, for a batch, a single point and a grid, on the raster and the
+    run-length index"""
+    lats, lons = np.random.default_rng(17).uniform([-90, -180], [90, 180], (20000, 2)).T
+    lats[:4], lons[:4] = [90, -90, 0, 48.85], [180, -180, 0, 2.35]  # Edges of the map
+    grid_lats, grid_lons = np.meshgrid(np.linspace(-80, 80, 30), np.linspace(-180, 180, 50), indexing='ij')
+    on_index = timmeh.TimezoneLookup(**dict(quarter.options, runs=True))
+    for timezones in (quarter, on_index):
+        for point_lats, point_lons in ((lats, lons), (48.85, 2.35), (grid_lats, grid_lons)):
+            joined_ids, joined_names = timezones.lookup_many(point_lats, point_lons, join=True)
+            zone_ids, names = timezones.lookup_many(point_lats, point_lons)
+            assert np.shape(joined_ids) == np.shape(zone_ids) == np.shape(point_lats)
+            assert np.array_equal(joined_ids, zone_ids) and np.array_equal(joined_names, names)
+    assert quarter.lookup_many(48.85, 2.35, join=True) == (quarter.zone_names.index('Europe/Paris'), 'Europe/Paris')
+
+    pixel_rows, pixel_columns = np.random.default_rng(19).integers(0, [20000, 40000], (5000, 2)).T
+    order = timmeh.join_order(pixel_rows, pixel_columns, (20000, 40000))  # Tiles grown to keep 16 bit keys
+    assert np.array_equal(np.sort(order), np.arange(5000))
+    tiles = (pixel_rows[order] >> 8) * 1000 + (pixel_columns[order] >> 8)  # 256 pixels square, each visited once
+    assert np.count_nonzero(np.diff(tiles)) + 1 == len(np.unique(tiles))
+
+
+def test_lookup_many_as_lookup(quarter):
+    """The vectorised lookups answer point for point as the scalar ones, edges of the map included"""
+    lats, lons = np.random.default_rng(23).uniform([-90, -180], [90, 180], (2000, 2)).T
+    lats[:6], lons[:6] = [90, -90, 0, 0, 48.85, -89.99], [180, -180, 180, -180, 2.35, 179.99]
+    pixel_columns, pixel_rows, zone_ids = quarter.get_pixels(lats, lons)
+    __zone_ids, names = quarter.lookup_many(lats, lons)
+    assert [quarter.get_zone(lat, lon) for lat, lon in zip(lats, lons)] == \
+        list(zip(pixel_columns.tolist(), pixel_rows.tolist(), zone_ids.tolist()))
+    assert [quarter.lookup(lat, lon)[3] for lat, lon in zip(lats, lons)] == names.tolist()
+
+
+def sentinel_map(tmp_path, **options):
+    """A 10 degree map of zone 0 (north of 60 N), sea (south of it) and land (the quarter from 0 to 90 E, 0 to 60 N)"""
+    zone_raster = np.ones((18, 36), dtype=np.uint16)
+    zone_raster[:3] = 0
+    zone_raster[3:9, 18:27] = 2
+    tzbuild.write_zones(str(tmp_path / 'tz.npy'), zone_raster,
+                        [tzbuild.LOST_SOUL, ((0, 0, 35), 'sea', 'Etc/GMT'), ((10, 20, 30), 'land', 'Europe/Paris')])
+    return timmeh.TimezoneLookup(raster_path=str(tmp_path / 'tz.npy'), **options)
+
+
+LAND, SEA, SENTINEL = (45, 45), (-45, -45), (75, 0)
+
+
+def test_lookup_stats(tmp_path):
+    """Land, sea and zone 0 counted, scalar and batch, a cache hit counted as that alone, steps timed, and
+    the lot in Prometheus' text format"""
+    timezones = sentinel_map(tmp_path, cache_size=4, stats=True)
+    assert [timezones.lookup(*point)[3] for point in (LAND, SEA, SENTINEL, LAND)] == \
+        ['Europe/Paris', 'Etc/GMT', tzbuild.LOST_SOUL[2], 'Europe/Paris']
+    timezones.lookup_many(*zip(LAND, LAND, SEA, SENTINEL, SENTINEL))
+    stats = timezones.stats.as_dict()
+    assert stats['counts'] == {'land': 3, 'sea': 2, 'sentinel': 3, 'border_refine': 0, 'cache_hit': 1,
+                               'cache_miss': 3}
+    assert [stats['timings'][step]['count'] for step in timezones.stats.STEPS] == [3, 3, 0, 1, 1]
+    assert stats['timings']['projection']['buckets'][-1] == {'le': float('inf'), 'count': 3}
+
+    lines = timezones.stats.prometheus().splitlines()
+    assert lines[:7] == ['# TYPE timmeh_lookups_total counter'] + \
+        ['timmeh_lookups_total{{branch="{}"}} {}'.format(branch, count) for branch, count in
+         (('border_refine', 0), ('cache_hit', 1), ('cache_miss', 3), ('land', 3), ('sea', 2), ('sentinel', 3))]
+    assert lines[7] == '# TYPE timmeh_step_seconds histogram'
+    assert 'timmeh_step_seconds_bucket{step="projection",le="1e-07"} ' + \
+        str(stats['timings']['projection']['buckets'][0]['count']) in lines
+    assert 'timmeh_step_seconds_bucket{step="batch_pixel_fetch",le="+Inf"} 1' in lines
+    assert 'timmeh_step_seconds_count{step="geodesic"} 0' in lines
+    assert 'timmeh_step_seconds_sum{step="geodesic"} 0.0' in lines
+    assert len(lines) == 8 + len(timezones.stats.STEPS) * (len(timmeh.STEP_BOUNDS) + 3)
+
+    timezones.stats.clear()
+    assert timezones.stats.as_dict()['counts'] == {'land': 0, 'sea': 0, 'sentinel': 0, 'border_refine': 0,
+                                                   'cache_hit': 1, 'cache_miss': 3}  # The cache keeps its own
+
+
+def test_histogram():
+    """Values at a bound count in its bucket, the buckets are cumulative, and the sum is kept"""
+    histogram = timmeh.Histogram([.5, 2.0])
+    for value in (.25, .5, 1, 5):
+        histogram.observe(value)
+    assert histogram.as_dict() == {'buckets': [{'le': .5, 'count': 2}, {'le': 2.0, 'count': 3},
+                                               {'le': float('inf'), 'count': 4}], 'count': 4, 'sum': 6.75}
+    assert histogram.prometheus('x') == ['x_bucket{le="0.5"} 2', 'x_bucket{le="2.0"} 3', 'x_bucket{le="+Inf"} 4',
+                                         'x_count 4', 'x_sum 6.75']
+
+
+def test_pixel_cache():
+    """The least recently used pixel is forgotten first, a get counting as use, and clear resets the counters"""
+    cache = timmeh.PixelCache(2)
+    cache.put((1, 1), 'a')
+    cache.put((2, 2), 'b')
+    assert cache.get((1, 1)) == 'a'
+    cache.put((3, 3), 'c')
+    assert cache.get((2, 2)) is None
+    assert (cache.get((1, 1)), cache.get((3, 3))) == ('a', 'c')
+    assert cache.info() == {'hits': 3, 'misses': 1, 'size': 2, 'pixels': 2}
+    cache.clear()
+    assert cache.info() == {'hits': 0, 'misses': 0, 'size': 2, 'pixels': 0}
+    assert cache.get((1, 1)) is None
@@ -0,0 +1,168 @@
+# coding=utf-8
+"""Rasterizing, border refinement and accuracy on a small synthetic shapefile, France and Germany
+meeting at 7.84 degrees East, a degree to the pixel"""
+import numpy as np
+import pytest
+
+import timmeh
+import tzbench
+import tzbuild
+
+shapefile = pytest.importorskip('shapefile')  # pyshp, as reading the polygons needs
+
+
+def write_shapefile(shapefile_path, berlin_north=55.0):
+    """Two sea zones splitting the globe, a France with a sea hole in it, a Germany beside it and a
+    New York, in a .shp/.shx/.dbf as tz_color_sea has them
+    Arguments:
+        shapefile_path (str), .shp to write
+        berlin_north (float), latitude of Germany's north west corner, moved to change one band of rows
+    """
+    writer = shapefile.Writer(shapefile_path, shapeType=shapefile.POLYGON)
+    writer.field('TZID', 'C', 80)
+    writer.field('COLOR', 'C', 40)
+    writer.poly([[(-180, 90), (0, 90), (0, -90), (-180, -90), (-180, 90)]])
+    writer.record('Etc/GMT+6', '0, 0, 35, 255')
+    writer.poly([[(0, 90), (180, 90), (180, -90), (0, -90), (0, 90)]])
+    writer.record('Etc/GMT-6', '0, 0, 70, 255')
+    writer.poly([[(-5, 52), (7.84, 51), (7.84, 42), (-5, 43), (-5, 52)], [(0, 48), (2, 48), (2, 46), (0, 46), (0, 48)]])
+    writer.record('Europe/Paris', '10, 20, 30, 255')
+    writer.poly([[(7.84, berlin_north), (15, 55), (15, 47), (7.84, 47), (7.84, berlin_north)]])
+    writer.record('Europe/Berlin', '40, 50, 60, 255')
+    writer.poly([[(-75, 45), (-70, 45), (-70, 40), (-75, 40), (-75, 45)]])
+    writer.record('America/New_York', '1, 2, 3, 255')
+    writer.close()
+
+
+@pytest.fixture
+def polygon_map(tmp_path):
+    """Shapefile and the 360 x 180 zone raster rasterized from it"""
+    shapefile_path = str(tmp_path / 'tz.shp')
+    raster_path = str(tmp_path / 'tz.npy')
+    write_shapefile(shapefile_path)
+    tzbuild.build_from_polygons(shapefile_path, raster_path, [1], columns=360, rows=180)
+    return shapefile_path, raster_path
+
+
+def test_rasterized_zones(polygon_map):
+    """Zones land where the polygons put them, the hole in France left to the sea"""
+    shapefile_path, raster_path = polygon_map
+    timezones = timmeh.TimezoneLookup(raster_path=raster_path, shapefile_path=shapefile_path)
+    timezones.load()
+    assert (timezones.max_columns, timezones.max_rows) == (360, 180)
+    assert [timezones.lookup(lat, lon)[3] for lat, lon in ((49.5, 3.5), (50.5, 12.5), (42.5, -72.5), (46.5, 1.5),
+                                                           (-30.5, -100.5), (-30.5, 100.5))] == \
+        ['Europe/Paris', 'Europe/Berlin', 'America/New_York', 'Etc/GMT-6', 'Etc/GMT+6', 'Etc/GMT-6']
+
+
+def test_rasterized_incrementally(polygon_map, tmp_path):
+    """Only the band of rows whose polygons changed is rasterized again, and a pool rasterizes as one
+    process does"""
+    shapefile_path, raster_path = polygon_map
+    assert tzbuild.build_from_polygons(shapefile_path, raster_path, [1], columns=360, rows=180)[1] == [0]
+    write_shapefile(shapefile_path, berlin_north=56.0)
+    assert tzbuild.build_from_polygons(shapefile_path, raster_path, [1], columns=360, rows=180)[1] == [1]
+    assert timmeh.TimezoneLookup(raster_path=raster_path).lookup(55.5, 9.5)[3] == 'Europe/Berlin'
+
+    zones = tzbuild.shapefile_zone_table(shapefile_path)
+    serial, __rebuilt = tzbuild.rasterize(shapefile_path, str(tmp_path / 'serial.npy'), zones, 360, 180)
+    pooled, rebuilt = tzbuild.rasterize(shapefile_path, str(tmp_path / 'pooled.npy'), zones, 360, 180, workers=2)
+    assert rebuilt == 3
+    assert np.array_equal(pooled, serial)
+    assert np.array_equal(serial, np.load(str(tmp_path / 'tz.polygons.npy')))
+
+
+def test_border_refinement(polygon_map):
+    """Either side of the border, within one pixel, the raster answers alike and the polygons tell apart"""
+    shapefile_path, raster_path = polygon_map
+    coarse = timmeh.TimezoneLookup(raster_path=raster_path, shapefile_path=shapefile_path)
+    exact = timmeh.TimezoneLookup(raster_path=raster_path, shapefile_path=shapefile_path, borders=True)
+    coarse.load()
+    assert coarse.pixel_of(49.5, 7.8) == coarse.pixel_of(49.5, 7.9)
+    assert coarse.lookup(49.5, 7.8)[3] == coarse.lookup(49.5, 7.9)[3] == 'Europe/Paris'
+    assert exact.lookup(49.5, 7.8)[3] == 'Europe/Paris'
+    assert exact.lookup(49.5, 7.9)[3] == 'Europe/Berlin'
+    assert exact.lookup(46.9, 1.9)[3] == 'Etc/GMT-6'  # In the hole
+    assert exact.lookup(46.9, 2.1)[3] == 'Europe/Paris'
+    assert exact.border_index.is_border(*exact.pixel_of(49.5, 7.9)[::-1])
+    for join in (False, True):  # Batches refine as 'lookup' does, a single point, a row or a grid of them
+        assert exact.lookup_many(49.5, 7.9, join)[1] == 'Europe/Berlin'
+        assert exact.lookup_many([49.5, 49.5], [7.8, 7.9], join)[1].tolist() == ['Europe/Paris', 'Europe/Berlin']
+        assert exact.lookup_many([[49.5], [49.5]], [[7.8], [7.9]], join)[1].tolist() == \
+            [['Europe/Paris'], ['Europe/Berlin']]
+    assert not exact.border_index.is_border(*exact.pixel_of(-30.5, -100.5)[::-1])
+
+
+def test_accuracy_harness(polygon_map):
+    """Polygon truth names the polygon each point is in, and the raster mostly agrees, more so refined"""
+    shapefile_path, raster_path = polygon_map
+    timezones = timmeh.TimezoneLookup(raster_path=raster_path, shapefile_path=shapefile_path)
+    timezones.load()
+    truth = tzbench.polygon_truth(timezones, [49.5, 49.5, 46.9, -30.5], [7.8, 7.9, 1.9, 100.5], shapefile_path)
+    assert [timezones.zone_names[zone_id] for zone_id in truth] == \
+        ['Europe/Paris', 'Europe/Berlin', 'Etc/GMT-6', 'Etc/GMT-6']
+
+    coarse = tzbench.measure_accuracy(200, shapefile_path=shapefile_path, raster_path=raster_path)
+    exact = tzbench.measure_accuracy(200, borders=True, shapefile_path=shapefile_path, raster_path=raster_path)
+    for name in tzbench.POINT_SETS:
+        assert coarse['sets'][name]['no_polygon'] == 0
+        assert exact['sets'][name]['agree'] >= coarse['sets'][name]['agree']
+    assert exact['sets']['coast']['land_agree'] == 1  # Sea still goes to the territorial waters beside land
+    assert exact['sets']['coast']['agree'] > coarse['sets']['coast']['agree']
+
+
+def write_map(raster_path, zone_raster, names):
+    """A zone raster and its zone table, zone 1 the sea and the rest land, and the zone database packed from them,
+    in 8 pixel tiles
+    Returns:
+        database_path (str), the .tzdb beside the raster
+    """
+    zones = [tzbuild.LOST_SOUL] + [((0, 0, number), 'sea' if number == 1 else 'land', tz)
+                                   for number, tz in enumerate(names, 1)]
+    tzbuild.write_zones(raster_path, zone_raster, zones)
+    database_path = raster_path.replace('.npy', '.tzdb')
+    tzbuild.write_database(database_path, raster_path, tile_size=8, distances=False)
+    return database_path
+
+
+def test_diff_maps(tmp_path):
+    """A patch of sea gone to a new zone across the corner of four blocks, and a column of Paris gone to sea
+    away from it, are two regions; Paris moving in the zone table is no change. Databases diff as rasters."""
+    old_raster = np.ones((36, 72), dtype=np.uint16)  # 5 degree pixels, all Etc/GMT
+    old_raster[20:24, 40:48] = 2  # Paris
+    new_raster = np.where(old_raster == 2, 3, old_raster).astype(np.uint16)  # Paris, now zone 3
+    new_raster[6:10, 14:18] = 2  # Berlin, astride the block edges at row 8 and column 16
+    new_raster[20:24, 47] = 1
+    old_paths = str(tmp_path / 'old.npy'), write_map(str(tmp_path / 'old.npy'), old_raster, ['Etc/GMT', 'Europe/Paris'])
+    new_paths = str(tmp_path / 'new.npy'), write_map(str(tmp_path / 'new.npy'), new_raster,
+                                                     ['Etc/GMT', 'Europe/Berlin', 'Europe/Paris'])
+
+    diff = tzbuild.diff_maps(old_paths[0], new_paths[0], block_size=8)
+    row_area = tzbuild.row_areas(36, 72)
+    assert (diff['rows'], diff['columns'], diff['changed_pixels']) == (36, 72, 20)
+    assert (diff['added'], diff['removed']) == (['Europe/Berlin'], [])
+    assert {tz: (zone['gained_pixels'], zone['lost_pixels']) for tz, zone in diff['zones'].items()} == \
+        {'Etc/GMT': (4, 16), 'Europe/Berlin': (16, 0), 'Europe/Paris': (0, 4)}
+    assert diff['zones']['Europe/Berlin']['gained_km2'] == pytest.approx(row_area[6:10].sum() * 4)
+    assert diff['zones']['Europe/Paris']['lost_km2'] == pytest.approx(row_area[20:24].sum())
+    assert diff['changed_km2'] == pytest.approx(row_area[6:10].sum() * 4 + row_area[20:24].sum())
+
+    berlin, paris = diff['regions']
+    assert (berlin['south'], berlin['west'], berlin['north'], berlin['east']) == (40, -110, 60, -90)
+    assert berlin['pixels'] == 16
+    assert berlin['area_km2'] == pytest.approx(diff['zones']['Europe/Berlin']['gained_km2'])
+    assert berlin['moves'] == [{'from': 'Etc/GMT', 'to': 'Europe/Berlin', 'pixels': 16}]
+    assert (paris['south'], paris['west'], paris['north'], paris['east'], paris['pixels']) == (-30, 55, -10, 60, 4)
+    assert paris['moves'] == [{'from': 'Europe/Paris', 'to': 'Etc/GMT', 'pixels': 4}]
+
+    for old_path, new_path in ((old_paths[1], new_paths[1]), (old_paths[0], new_paths[1])):
+        assert tzbuild.diff_maps(old_path, new_path, block_size=8) == diff
+    assert tzbuild.diff_maps(new_paths[1], new_paths[0])['changed_pixels'] == 0
+
+
+def test_connected_blocks():
+    """Blocks touching by a side or a corner are one region, blocks apart are two"""
+    changed = np.zeros((4, 5), dtype=bool)
+    changed[0, 0] = changed[1, 1] = changed[1, 2] = True
+    changed[3, 4] = True
+    assert tzbuild.connected_blocks(changed) == [[(0, 0), (1, 1), (1, 2)], [(3, 4)]]
@@ -0,0 +1,103 @@
+# coding=utf-8
+"""tzgps against a fake gpsd on a local socket, which drops the first connection part way through"""
+import asyncio
+import json
+import time
+
+import timmeh
+import tzgps
+
+PARIS, PARIS_TOO, BERLIN, NEW_YORK = (48.85, 2.35), (48.86, 2.36), (52.52, 13.40), (40.71, -74.0)
+
+
+def tpv(lat, lon, time='2016-06-01T12:00:00.000Z'):
+    """A gpsd TPV report of a 2D fix"""
+    return json.dumps({'class': 'TPV', 'mode': 2, 'time': time, 'lat': lat, 'lon': lon}).encode('utf-8') + b'\n'
+
+
+SESSIONS = [  # What the fake gpsd says on each connection, before hanging up
+    [b'{"class":"VERSION","release":"3.17","proto_major":3,"proto_minor":12}\n',
+     b'not JSON\n',
+     b'{"class":"TPV","mode":1}\n',  # No fix yet
+     tpv(*PARIS), tpv(*PARIS_TOO), tpv(*PARIS), tpv(*BERLIN)],
+    [tpv(*BERLIN), tpv(*NEW_YORK), tpv(*NEW_YORK)]]
+
+
+async def changes_from_fake_gpsd(count, **options):
+    """The first 'count' zone changes tzgps.zone_changes reports off the fake gpsd, and the commands gpsd
+    was sent on each connection"""
+    commands = []
+
+    async def gpsd(reader, writer):
+        session = len(commands)
+        commands.append(await reader.readline())
+        for line in SESSIONS[min(session, len(SESSIONS) - 1)]:
+            writer.write(line)
+        await writer.drain()
+        if session >= len(SESSIONS) - 1:
+            await asyncio.sleep(10)  # Last session stays up
+        writer.close()
+
+    server = await asyncio.start_server(gpsd, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    changes = []
+    async with server:
+        async for change in tzgps.zone_changes(host='127.0.0.1', port=port, **options):
+            changes.append(change)
+            if len(changes) == count:
+                break
+    return changes, commands
+
+
+def test_zone_changes_across_reconnect(tmp_path):
+    """Only changes of zone are told, through a dropped connection and the reconnection after it"""
+    timezones = timmeh.TimezoneLookup(raster_path=str(tmp_path / 'tz.npy'), scale=.25)
+    changes, commands = asyncio.run(asyncio.wait_for(changes_from_fake_gpsd(3, timezones=timezones), 30))
+    assert [(change.tz, change.previous) for change in changes] == \
+        [('Europe/Paris', None), ('Europe/Berlin', 'Europe/Paris'), ('America/New_York', 'Europe/Berlin')]
+    assert [(change.lat, change.lon) for change in changes] == [PARIS, BERLIN, NEW_YORK]
+    assert changes[0].time == '2016-06-01T12:00:00.000Z' and changes[0].confidence is None
+    assert commands == [tzgps.WATCH, tzgps.WATCH]
+
+
+def test_zone_changes_skipping(tmp_path):
+    """Skipping fixes within the border distance tells the same changes, with how sure each is"""
+    timezones = timmeh.TimezoneLookup(raster_path=str(tmp_path / 'tz.npy'), scale=.25)
+    looked_up = []
+    lookup_confidence = timezones.lookup_confidence
+    timezones.lookup_confidence = lambda lat, lon: looked_up.append((lat, lon)) or lookup_confidence(lat, lon)
+    changes, __commands = asyncio.run(asyncio.wait_for(
+        changes_from_fake_gpsd(3, timezones=timezones, skip=True), 30))
+    assert [change.tz for change in changes] == ['Europe/Paris', 'Europe/Berlin', 'America/New_York']
+    assert [change.confidence for change in changes] == \
+        [lookup_confidence(*point)[5] for point in (PARIS, BERLIN, NEW_YORK)]
+    assert changes[0].confidence == 1  # Paris is 100 km or more from any other zone
+    assert looked_up == [PARIS, BERLIN, NEW_YORK]  # Paris again a km away, Berlin again after the reconnect,
+    # both well inside their zones
+
+
+async def longest_stall(work):
+    """Result of awaiting 'work', and the longest the event loop went without running a ticking task meanwhile"""
+    ticks = [time.monotonic()]
+
+    async def tick():
+        while True:
+            await asyncio.sleep(.01)
+            ticks.append(time.monotonic())
+
+    ticker = asyncio.ensure_future(tick())
+    try:
+        result = await work
+    finally:
+        ticker.cancel()
+    return result, max(later - earlier for earlier, later in zip(ticks, ticks[1:] + [time.monotonic()]))
+
+
+def test_building_leaves_the_loop_running(tmp_path):
+    """The map, and when skipping the distance field, are built off the event loop, which keeps running meanwhile"""
+    timezones = timmeh.TimezoneLookup(raster_path=str(tmp_path / 'tz.npy'), scale=.25)
+    started = time.monotonic()
+    (changes, __commands), stall = asyncio.run(asyncio.wait_for(
+        longest_stall(changes_from_fake_gpsd(1, timezones=timezones, skip=True)), 60))
+    assert changes[0].tz == 'Europe/Paris'
+    assert stall < (time.monotonic() - started) / 4
@@ -0,0 +1,56 @@
+# coding=utf-8
+"""tzserve over a Unix socket, requests sent together so they share a batch"""
+import asyncio
+import json
+import os
+
+import timmeh
+import tzserve
+
+
+async def request(path, method, target, body=b''):
+    """One request on its own connection, the status and JSON answer"""
+    reader, writer = await asyncio.open_unix_connection(path)
+    writer.write('{} {} HTTP/1.1\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'.format(
+        method, target, len(body)).encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, __blank, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+async def requests_together(path, requests):
+    """Server up, the requests sent at once, the server down"""
+    server = asyncio.ensure_future(tzserve.LookupServer(wait=.05).serve(unix=path))
+    while not os.path.exists(path):
+        await asyncio.sleep(.01)
+    try:
+        return await asyncio.gather(*(request(path, *arguments) for arguments in requests))
+    finally:
+        server.cancel()
+
+
+def test_bad_request_spoils_no_batch(tmp_path):
+    """NaN and off the globe points are a 400 each, the good requests batched with them answered"""
+    answers = asyncio.run(requests_together(str(tmp_path / 'tzserve.sock'), [
+        ('GET', '/lookup?lat=nan&lon=0'),
+        ('GET', '/lookup?lat=48.85&lon=2.35'),
+        ('GET', '/lookup?lat=91&lon=0'),
+        ('GET', '/lookup?lat=0&lon=181'),
+        ('POST', '/lookup', json.dumps({'lats': [52.5, 1e400], 'lons': [13.4, 0]}).encode('utf-8')),
+        ('POST', '/lookup', json.dumps({'lats': [52.5, -33.9], 'lons': [13.4, 151.2]}).encode('utf-8'))]))
+    assert [status for status, __answer in answers] == [400, 200, 400, 400, 400, 200]
+    assert answers[1][1]['tz'] == timmeh.lookup(48.85, 2.35)[3] == 'Europe/Paris'
+    assert answers[5][1]['tz'] == ['Europe/Berlin', 'Australia/Sydney']
+
+
+def test_batch_failure_stays_with_its_request():
+    """Should a lookup fail anyway, only the request it belongs to gets the error"""
+    async def batch():
+        batcher = tzserve.Batcher(timmeh.timezones, wait=.05)
+        return await asyncio.gather(batcher.lookup([48.85], [2.35]), batcher.lookup([float('nan')], [0.0]),
+                                    return_exceptions=True)
+    good, bad = asyncio.run(batch())
+    assert timmeh.timezones.zone_names[good[0]] == 'Europe/Paris'
+    assert isinstance(bad, ValueError)
@@ -0,0 +1,54 @@
+# coding=utf-8
+"""tztag's handling of awkward input"""
+import io
+
+import pytest
+
+import timmeh
+import tztag
+
+
+def tag_csv(text):
+    """Tagged CSV text"""
+    destination = io.StringIO()
+    tztag.tag_csv(io.StringIO(text), destination, timmeh.timezones, 'lat', 'lon', 'tz', 2)
+    return destination.getvalue()
+
+
+def test_short_rows_padded_off_globe_untagged():
+    """The timezone stays in its own column, and a point off the globe gets none"""
+    assert tag_csv('lat,lon,x\n91,0\n48.85,2.35,a\n,3,b\n48.85,181\n') == \
+        'lat,lon,x,tz\n91,0,,\n48.85,2.35,a,Europe/Paris\n,3,b,\n48.85,181,,\n'
+
+
+def test_bad_input_is_a_value_error():
+    """Empty input, missing columns and overlong rows, each a ValueError for the parser to report"""
+    with pytest.raises(ValueError, match='empty'):
+        tag_csv('')
+    with pytest.raises(ValueError, match="'lat'"):
+        tag_csv('a,b\n1,2\n')
+    with pytest.raises(ValueError, match='row 3'):
+        tag_csv('lat,lon\n1,2\n1,2,3\n')
+
+
+def tag_ndjson(text):
+    """Tagged NDJSON text"""
+    destination = io.StringIO()
+    tztag.tag_ndjson(io.StringIO(text), destination, timmeh.timezones, 'lat', 'lon', 'tz', 2)
+    return destination.getvalue()
+
+
+def test_ndjson_tagged_blank_lines_skipped():
+    """Each object gets its timezone, across chunks and past blank lines"""
+    assert tag_ndjson('{"lat": 48.85, "lon": 2.35}\n\n{"lat": 91, "lon": 0}\n{"x": 1}\n') == \
+        '{"lat": 48.85, "lon": 2.35, "tz": "Europe/Paris"}\n{"lat": 91, "lon": 0, "tz": ""}\n{"x": 1, "tz": ""}\n'
+
+
+def test_bad_ndjson_is_a_value_error():
+    """A line that isn't JSON, or is JSON but not an object, is a ValueError naming the line"""
+    with pytest.raises(ValueError, match='line 4 is not JSON'):
+        tag_ndjson('{"lat": 1, "lon": 2}\n\n{"lat": 1, "lon": 2}\n{"lat": 1,\n')
+    with pytest.raises(ValueError, match='line 2 is a JSON list, not an object'):
+        tag_ndjson('{"lat": 1, "lon": 2}\n[1, 2]\n')
+    with pytest.raises(ValueError, match='line 1 is a JSON int'):
+        tag_ndjson('3\n')
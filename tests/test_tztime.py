@@ -0,0 +1,40 @@
+# coding=utf-8
+"""tztime against zoneinfo, and the open ocean's everyday named Etc/GMT zones"""
+import datetime
+import zoneinfo
+
+import numpy as np
+
+import timmeh
+import tzbench
+import tztime
+
+MOMENTS = [int(datetime.datetime(year, month, 15, 12, tzinfo=datetime.timezone.utc).timestamp())
+           for year in (1975, 2000, 2024, 2040, 2090) for month in (1, 4, 7, 10)]
+
+
+def test_open_ocean_offsets_by_longitude():
+    """Mid-ocean, far from any territorial waters, the offset is the nautical one for the longitude"""
+    lons = np.arange(-170, 171, 20.0)
+    zone_ids, offsets, local_seconds = tztime.local_times(np.full(len(lons), -50.0), lons, MOMENTS[0])
+    sea = (zone_ids >= 1) & (zone_ids <= timmeh.timezones.sea_zones)
+    assert sea.sum() > 12
+    assert np.all(np.abs(offsets[sea] / 3600 - lons[sea] / 15) <= 1)
+    __zone_ids, offsets, __local_seconds = tztime.local_times([-50.0, -50.0], [-150.0, 170.0], MOMENTS[0])
+    assert offsets.tolist() == [-10 * 3600, 11 * 3600]
+
+
+def test_land_offsets_match_zoneinfo():
+    """Every land zone a sample point lands in, at moments either side of DST and of the TZif file's end"""
+    lats, lons = tzbench.sample_points(20000)
+    timezones = timmeh.timezones
+    zone_ids, __tz = timezones.lookup_many(lats, lons)
+    land = np.flatnonzero(zone_ids > timezones.sea_zones)
+    for moment in MOMENTS:
+        offsets = tztime.utc_offsets(zone_ids[land], timezones.zone_names, moment, lons[land], timezones.sea_zones)
+        for zone_id in np.unique(zone_ids[land]):
+            tz = timezones.zone_names[zone_id]
+            if tz in tztime.NO_ZONE:
+                continue
+            expected = datetime.datetime.fromtimestamp(moment, zoneinfo.ZoneInfo(tz)).utcoffset().total_seconds()
+            assert set(offsets[zone_ids[land] == zone_id].tolist()) == {expected}, (tz, moment)
@@ -0,0 +1,10 @@
+# coding=utf-8
+"""timmeh as a package, 'from timmeh import timmeh' from beside the timmeh directory. Importing it loads nothing;
+the modules inside also run, and import each other, from beside timmeh.py as before.
+"""
+__author__ = 'Moe'
+__copyright__ = 'Copyright 2016  Moe'
+__license__ = 'MIT'
+__version__ = '0.0.5'
+#
+# End
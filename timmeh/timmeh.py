@@ -1,31 +1,51 @@
 #! /usr/bin/env python3
 # coding=utf-8
 """Reads latitude/longitude from gpsd and looks up indexed timezones on color referenced image"""
+import importlib
+import io
+import os
+import struct
 import time
-from math import pi
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from math import asin, cos, radians, sin, sqrt
 
-from PIL import Image
-from gps3 import gps3
-from pyproj import Geod, Proj
+import numpy as np
 
 __author__ = 'Moe'
 __copyright__ = 'Copyright 2016  Moe'
 __license__ = 'MIT'
 __version__ = '0.0.5'
 
-tz_image = Image.open('tz_5265x2633.png')  # timezone width x height
-max_columns, max_rows = tz_image.size  # Overall maximums
-pixel_array = tz_image.load()
-coordinates = Proj('+proj=longlat +datum=WGS84 +no_defs')  # pixel array projection (shapefile)
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))  # Image, zone rasters and tables live beside timmeh.py
+image_file = os.path.join(DATA_DIR, 'tz_5265x2633.png')  # timezone width x height, color referenced
+raster_file = os.path.join(DATA_DIR, 'tz_5265x2633.npy')  # zone index per pixel, built from the image by tzbuild.py
+shapefile_file = os.path.join(os.path.dirname(DATA_DIR), 'tz_shapefiles', 'tz_color_sea.shp')  # the polygons
 color_spread = 35  # Colors in the timezone dictionaries at least 35 points divergent from the next color
 
 CONVERSION = {'imperial': 1609.344, 'metric': 1000.0, 'nautical': 1852.0}
 DISTANCE = CONVERSION['nautical'] * 12  # International Waters is 12 nautical miles, as I recall.
-geoid = Geod(ellps='WGS84')  # For the points (currently 8@45degrees) for 'at sea' DISTANCE calculation (12nm)
+EARTH_RADIUS = 6371008.8  # meters, mean radius. Pixel to pixel distances are local, a sphere is plenty
+FIELD_DISTANCE = 100000.0  # meters, how far the distance field looks for a border
+FIELD_UNIT = 10.0  # meters per step of the distance field's uint16
+MIXED_TILE = 0xFFFF  # ZoneIndex tile of more than one zone
+DATABASE_MAGIC = b'TZDB'  # Zone database, see ZoneDatabase
+DATABASE_VERSION = 1  # Of the zone database's layout, databases of any other refused
+DATABASE_HEADER = struct.Struct('<4sHHHIIHHQQQQQQQQ')  # Little endian, whatever the machine that wrote it
+BUILD_FORMAT = 1  # What tzbuild's rasters hold. Raised whenever the build changes, and rasters built otherwise
+TABLE_HEADER = '# timmeh zone table, build format '  # rebuilt
+PARALLEL_MINIMUM = 200000  # Points in a batch before it's worth handing round worker processes
+ZoneRun = namedtuple('ZoneRun', 'start end zone_id tz lat lon')  # See TimezoneLookup.track
+JOIN_TILE = 64  # Pixels square of the smallest tiles a spatial join groups points by, 8 KB of zones
+STEP_BOUNDS = [1e-7, 2.5e-7, 5e-7, 1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 1e-4, 1e-3, 1e-2, .1, 1]  # seconds, LookupStats
 
 
 def get_latlon():
     """gps3 client connects to gpsd for current lat/lon"""
+    from gps3 import gps3  # Only needed for a live fix
+
     gpsd_socket = gps3.GPSDSocket()
     gpsd_socket.connect()
     gpsd_socket.watch()
@@ -48,554 +68,1295 @@ def get_latlon():
         print('\nTerminated by user\nGood Bye.\n')
 
 
-def get_pixel(lat, lon):
-    """Unclutters 'lookup' function by converting Latitude/Longitude to return
-    pixel column/row and color value of the pixel.
+def meters_between(lat_1, lon_1, lat_2, lon_2):
+    """Great circle distance in meters between two points, on the sphere"""
+    haversine = sin(radians(lat_2 - lat_1) / 2) ** 2 + \
+        cos(radians(lat_1)) * cos(radians(lat_2)) * sin(radians(lon_2 - lon_1) / 2) ** 2
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(haversine)))
+
+
+def check_finite(lats, lons):
+    """ValueError naming the first point that isn't finite, NaN or infinity, which would otherwise index
+    anywhere, as 'pixel_of' gives for one point
     Arguments:
-        lat (float), Latitude North (positive), South (negative)
-        lon (float), Longitude East (positive), West (negative)
-    Returns:
-        pixel_column (int), x pixel column in image
-        pixel_row (int), y pixel row in image
-        rgb_values (tuple of ints), RGB color tuple
+        lats (array of floats), lons (array of floats), points, numbered as flattened
     """
-    x_coord, y_coord = coordinates(lon, lat)  # x = -pi --> pi; y = 1/2pi --> -1/2pi
-    pixel_column = int((x_coord + pi) * ((max_columns / 2) / pi))
-    pixel_row = int(max_rows - (y_coord + (pi / 2)) * (max_rows / pi))
-    rgb_values = pixel_array[pixel_column, pixel_row]
-    return pixel_column, pixel_row, rgb_values
+    if not (np.isfinite(lats).all() and np.isfinite(lons).all()):
+        lats, lons = np.broadcast_arrays(lats, lons)
+        unusable = np.flatnonzero(~(np.isfinite(lats) & np.isfinite(lons)))
+        raise ValueError('{} points are not finite, the first, number {}, at lat {}, lon {}'.format(
+            len(unusable), unusable[0], lats.flat[unusable[0]], lons.flat[unusable[0]]))
 
 
-def lookup(lat, lon):
-    """looks up rgb_values values on image as key to timezones
+def read_zone_table(table_path):
+    """Zone table file, and the build format its header line gives
     Arguments:
-        lat (float), Latitude North (positive), South (negative)
-        lon (float), Longitude East (positive), West (negative)
+        table_path (str), .zones written by tzbuild.write_zones
     Returns:
-        pixel_column (int), pixel column
-        pixel_row (int), pixel row
-        rgb_values (tuple of ints) RGB color values
-        tz (str), 'proper named' timezone
+        build_format (int), BUILD_FORMAT of the build that wrote it
+        zone_lines (list of str), 'r,g,b', kind and tz tab separated, per zone index
+    """
+    with open(table_path, encoding='utf-8') as table_file:
+        zone_lines = table_file.read().splitlines()
+    if not (zone_lines and zone_lines[0].startswith(TABLE_HEADER)):
+        raise IOError('{} has no build format header, it is not a zone table tzbuild wrote'.format(table_path))
+    return int(zone_lines[0][len(TABLE_HEADER):]), zone_lines[1:]
+
+
+def current_build(build_format, path):
+    """Whether a table or database of this build format wants building again, IOError if it's of a
+    newer build than this timmeh makes, rather than build over it
+    """
+    if build_format > BUILD_FORMAT:
+        raise IOError('{} is build format {}, newer than this timmeh builds'.format(path, build_format))
+    return build_format == BUILD_FORMAT
+
+
+def sibling(name):
+    """A module from beside timmeh.py, tzbuild say. Part of the timmeh package when timmeh is one,
+    'from timmeh import timmeh', else a module of its own, as when run or imported from beside timmeh.py.
+    """
+    return importlib.import_module('.' + name, __package__) if __package__ else importlib.import_module(name)
+
+
+@contextmanager
+def build_lock(lock_path):
+    """Held while building, so that of several processes finding the same file missing, say workers
+    all starting at once, one builds it and the rest wait, then find it built. An fcntl.flock, let go
+    by the system should the builder die; where there's no fcntl, builds aren't serialised.
+    Arguments:
+        lock_path (str), lock file, made if need be
     """
     try:
-        pixel_column, pixel_row, rgb_values = get_pixel(lat, lon)
-        if rgb_values in bigdic.keys():
-            tz = bigdic[rgb_values]
-            return pixel_column, pixel_row, rgb_values, tz
-
-        if rgb_values in seadic.keys():  # If pixel is ocean,
-            tz = seadic[rgb_values]
-            for bearing in range(0, 315, 45):  # look at 8 points around the original location.
-                new_lon, new_lat = where_go(lat, lon, bearing, DISTANCE)  # return a point
-                pixel_column, pixel_row, rgb_values = get_pixel(new_lat, new_lon)  # Get pixel values
-                if rgb_values not in seadic.keys():  # and compare.  Errors are exceptions.
-                    tz = bigdic[rgb_values]  # If it pegs land it will stay on last land because
-            return pixel_column, pixel_row, rgb_values, tz  # you are in the territorial waters of Deep Burgundy.
-
-    except KeyError:  # This takes care of near-miss color values, but throws errors with melded colors, however,
-        pixel_column, pixel_row, rgb_values = get_pixel(lat, lon)  # If the pixel RGB is off for edge reasons
-        rgb_values = tuple(round(value / color_spread) * color_spread for value in rgb_values)  # slaps them back
-        if rgb_values in bigdic.keys():  # if is in the bigdic
-            tz = bigdic[rgb_values]  # use that.
-        elif rgb_values in seadic.keys():
-            tz = seadic[rgb_values]
-        else:  # This should never happen. The whole exception should never happen.
-            # print("Lasciate ogne speranza, voi ch'intrate")
-            tz = "Gates'o'Hell/Houston"
-        return pixel_column, pixel_row, rgb_values, tz
-
-
-def where_go(lat, lon, azimuth, distance):
-    """Calculates *new* lat/lon pair from another pair, given bearing and distance
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(lock_path, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def level_path(raster_path, scale):
+    """Zone raster of the pyramid level at 'scale' times the resolution of raster_path
     Arguments:
-        lon (float): longitude of reference point
-        lat (float): latitude of reference point
-        azimuth (float): bearing in degrees to solution
-        distance (float): distance in meters to solution
+        raster_path (str), zone raster at scale 1
+        scale (float), 0.25 for a quarter of the rows and columns, 2 for twice as many
     Returns:
-        lon (float): longitude of solution
-        lat (float: latitude of solution
-     #  __bearing_fro (float): bearing from the solution point to the reference point
+        raster_path (str), e.g. tz_5265x2633_x0.25.npy
     """
-    new_lon, new_lat, __bearing_fro = geoid.fwd(lon, lat, azimuth, distance)  # How easy is that?
-
-    return new_lon, new_lat
-
-
-seadic = {(0,   0,  35): 'Etc/GMT-12',
-          (0,   0,  70): 'Etc/GMT-11',
-          (0,   0, 105): 'Etc/GMT-10',
-          (0,   0, 140): 'Etc/GMT-9',
-          (0,   0, 175): 'Etc/GMT-8',
-          (0,   0, 210): 'Etc/GMT-7',
-          (0,   0, 245): 'Etc/GMT-6',
-          (0,  35,   0): 'Etc/GMT-5',
-          (0,  35,  35): 'Etc/GMT-4',
-          (0,  35,  70): 'Etc/GMT-3',
-          (0,  35, 105): 'Etc/GMT-2',
-          (0,  35, 140): 'Etc/GMT-1',
-          (0,  35, 175): 'Etc/GMT0',
-          (0,  35, 210): 'Etc/GMT+1',
-          (0,  35, 245): 'Etc/GMT+2',
-          (0,  70,   0): 'Etc/GMT+3',
-          (0,  70,  35): 'Etc/GMT+4',
-          (0,  70,  70): 'Etc/GMT+5',
-          (0,  70, 105): 'Etc/GMT+6',
-          (0,  70, 140): 'Etc/GMT+7',
-          (0,  70, 175): 'Etc/GMT+8',
-          (0,  70, 210): 'Etc/GMT+9',
-          (0,  70, 245): 'Etc/GMT+10',
-          (0, 105,   0): 'Etc/GMT+11',
-          (0, 105,  35): 'Etc/GMT+12'}
-
-bigdic = {(175,   0, 105): 'Africa/Abidjan',
-          ( 35, 105, 105): 'Africa/Accra',
-          (175, 210, 210): 'Africa/Addis_Ababa',
-          (210, 105,   0): 'Africa/Algiers',
-          (105,   0,   0): 'Africa/Asmara',
-          ( 70, 210, 245): 'Africa/Bamako',
-          (105,  35, 210): 'Africa/Bangui',
-          (140,  70,  35): 'Africa/Banjul',
-          (  0, 210, 140): 'Africa/Bissau',
-          (105, 140, 175): 'Africa/Blantyre',
-          ( 70, 140, 210): 'Africa/Brazzaville',
-          ( 35, 175, 245): 'Africa/Bujumbura',
-          ( 70,  35, 140): 'Africa/Cairo',
-          (175, 105,  70): 'Africa/Casablanca',
-          (175, 105,   0): 'Africa/Ceuta',
-          ( 70, 245, 175): 'Africa/Conakry',
-          (105, 245,   0): 'Africa/Dakar',
-          (  0, 140, 175): 'Africa/Dar_es_Salaam',
-          (175,  70, 175): 'Africa/Djibouti',
-          (175, 105, 210): 'Africa/Douala',
-          (  0, 175, 210): 'Africa/El_Aaiun',
-          ( 35, 105,  35): 'Africa/Freetown',
-          (  0, 140,  70): 'Africa/Gaborone',
-          (140, 175, 140): 'Africa/Harare',
-          ( 70, 175, 140): 'Africa/Johannesburg',
-          (210, 105, 210): 'Africa/Juba',
-          ( 70, 245,   0): 'Africa/Kampala',
-          (175, 105, 175): 'Africa/Khartoum',
-          (140, 210,  35): 'Africa/Kigali',
-          (175, 140,  35): 'Africa/Kinshasa',
-          ( 35, 140,  70): 'Africa/Lagos',
-          ( 70, 140, 245): 'Africa/Libreville',
-          (140, 175, 245): 'Africa/Lome',
-          (175,   0,   0): 'Africa/Luanda',
-          (175, 245, 140): 'Africa/Lubumbashi',
-          (140, 140,  35): 'Africa/Lusaka',
-          (105, 105, 210): 'Africa/Malabo',
-          (210,  35,  70): 'Africa/Maputo',
-          (175, 175, 210): 'Africa/Maseru',
-          ( 70,  35, 105): 'Africa/Mbabane',
-          (105, 210, 175): 'Africa/Mogadishu',
-          (210,   0,   0): 'Africa/Monrovia',
-          (210, 210, 210): 'Africa/Nairobi',
-          (105, 140,   0): 'Africa/Ndjamena',
-          (140, 105,  35): 'Africa/Niamey',
-          (  0, 210,   0): 'Africa/Nouakchott',
-          (140, 105, 105): 'Africa/Ouagadougou',
-          ( 35, 210, 105): 'Africa/Porto-Novo',
-          ( 70, 175,   0): 'Africa/Sao_Tome',
-          (175, 140, 175): 'Africa/Tripoli',
-          (175,  35, 175): 'Africa/Tunis',
-          (105,  70, 140): 'Africa/Windhoek',
-          ( 70, 210,  70): 'America/Adak',
-          (210,  70, 105): 'America/Anchorage',
-          ( 70, 210, 105): 'America/Anguilla',
-          (105, 140, 140): 'America/Antigua',
-          ( 35,  35, 175): 'America/Araguaina',
-          (105, 245, 245): 'America/Argentina/Buenos_Aires',
-          ( 35, 210, 175): 'America/Argentina/Catamarca',
-          (140, 175,  35): 'America/Argentina/Cordoba',
-          ( 70, 245, 210): 'America/Argentina/Jujuy',
-          (140,  35, 245): 'America/Argentina/La_Rioja',
-          ( 70, 245, 140): 'America/Argentina/Mendoza',
-          ( 35, 210, 140): 'America/Argentina/Rio_Gallegos',
-          ( 70,  70, 175): 'America/Argentina/Salta',
-          (175, 210,  70): 'America/Argentina/San_Juan',
-          (175,  70, 245): 'America/Argentina/San_Luis',
-          ( 70, 105,   0): 'America/Argentina/Tucuman',
-          (140, 245,  35): 'America/Argentina/Ushuaia',
-          (140,   0,  70): 'America/Aruba',
-          (105, 175, 210): 'America/Asuncion',
-          (105, 210, 245): 'America/Atikokan',
-          ( 70, 175, 175): 'America/Bahia',
-          (  0, 210,  70): 'America/Bahia_Banderas',
-          (105, 140, 105): 'America/Barbados',
-          (210, 175, 105): 'America/Belem',
-          (  0, 245,  70): 'America/Belize',
-          (140,  35, 175): 'America/Blanc-Sablon',
-          (175, 210, 175): 'America/Boa_Vista',
-          (210, 245, 105): 'America/Bogota',
-          (  0, 175,  35): 'America/Boise',
-          ( 70,  35, 175): 'America/Cambridge_Bay',
-          (175,  35, 140): 'America/Campo_Grande',
-          (210, 175,  35): 'America/Cancun',
-          (210, 140, 140): 'America/Caracas',
-          (210,   0, 175): 'America/Cayenne',
-          (105, 210,  35): 'America/Cayman',
-          (105, 105,  35): 'America/Chicago',
-          (105,   0,  35): 'America/Chihuahua',
-          ( 35,  70, 210): 'America/Coral_Harbour',
-          (210, 105, 245): 'America/Costa_Rica',
-          (140,  70, 105): 'America/Creston',
-          (210,  35,  35): 'America/Cuiaba',
-          ( 35, 245,   0): 'America/Curacao',
-          (175, 175,  35): 'America/Danmarkshavn',
-          (175, 140,   0): 'America/Dawson',
-          ( 70,  35,  70): 'America/Dawson_Creek',
-          (140, 175, 210): 'America/Denver',
-          ( 35,  70, 140): 'America/Detroit',
-          (  0, 105,  70): 'America/Dominica',
-          (105, 245, 105): 'America/Edmonton',
-          (140,   0, 245): 'America/Eirunepe',
-          (140,  70, 245): 'America/El_Salvador',
-          (140, 175, 105): 'America/Fort_Nelson',
-          ( 70, 140,  35): 'America/Fortaleza',
-          ( 35, 210,  35): 'America/Glace_Bay',
-          ( 70,   0, 105): 'America/Godthab',
-          ( 70, 245, 105): 'America/Goose_Bay',
-          ( 35, 245, 210): 'America/Grand_Turk',
-          ( 35, 175,  70): 'America/Grenada',
-          (140, 140, 245): 'America/Guadeloupe',
-          (210, 210,  35): 'America/Guatemala',
-          (210, 105,  35): 'America/Guayaquil',
-          (175,   0,  70): 'America/Guyana',
-          ( 70, 105,  35): 'America/Halifax',
-          (210, 175,   0): 'America/Havana',
-          (210, 175,  70): 'America/Hermosillo',
-          ( 35, 210, 210): 'America/Indiana/Indianapolis',
-          (140,  70,   0): 'America/Indiana/Knox',
-          (210, 140,  70): 'America/Indiana/Marengo',
-          ( 35,   0, 245): 'America/Indiana/Petersburg',
-          ( 35, 210, 245): 'America/Indiana/Tell_City',
-          (210, 175, 245): 'America/Indiana/Vevay',
-          (175,  35, 245): 'America/Indiana/Vincennes',
-          (105, 210, 105): 'America/Indiana/Winamac',
-          ( 35,  35,  70): 'America/Inuvik',
-          ( 70, 175,  35): 'America/Iqaluit',
-          ( 35, 140, 105): 'America/Jamaica',
-          (210,  35, 210): 'America/Juneau',
-          ( 70,  70, 245): 'America/Kentucky/Louisville',
-          ( 70,   0, 175): 'America/Kentucky/Monticello',
-          ( 35, 175, 210): 'America/Kralendijk',
-          (105,  70, 245): 'America/La_Paz',
-          (105,  35, 245): 'America/Lima',
-          (  0, 210, 175): 'America/Los_Angeles',
-          (175, 245, 210): 'America/Lower_Princes',
-          (175, 105, 140): 'America/Maceio',
-          (140, 105,   0): 'America/Managua',
-          ( 70, 245,  35): 'America/Manaus',
-          (210, 245,  70): 'America/Marigot',
-          (175, 140,  70): 'America/Martinique',
-          (210,  70, 140): 'America/Matamoros',
-          (210, 210, 140): 'America/Mazatlan',
-          ( 35, 105, 245): 'America/Menominee',
-          (  0, 210,  35): 'America/Merida',
-          (105,   0, 105): 'America/Metlakatla',
-          (105, 105,  70): 'America/Mexico_City',
-          ( 35,  70,  70): 'America/Miquelon',
-          ( 35, 175,   0): 'America/Moncton',
-          (210, 105, 175): 'America/Monterrey',
-          (140,  35, 105): 'America/Montevideo',
-          (  0, 140, 245): 'America/Montreal',
-          ( 35, 210,   0): 'America/Montserrat',
-          (140, 210, 210): 'America/Nassau',
-          ( 70, 175,  70): 'America/New_York',
-          (175, 175,   0): 'America/Nipigon',
-          ( 70, 105, 140): 'America/Nome',
-          (140, 245, 175): 'America/Noronha',
-          ( 35, 105, 210): 'America/North_Dakota/Beulah',
-          ( 70,   0,   0): 'America/North_Dakota/Center',
-          ( 35,   0, 175): 'America/North_Dakota/New_Salem',
-          (210, 210, 175): 'America/Ojinaga',
-          (  0, 175,   0): 'America/Panama',
-          (105, 245,  70): 'America/Pangnirtung',
-          (105, 105, 245): 'America/Paramaribo',
-          (  0, 140,   0): 'America/Phoenix',
-          (  0, 140, 210): 'America/Port-au-Prince',
-          (105,   0,  70): 'America/Port_of_Spain',
-          (175, 175, 175): 'America/Porto_Velho',
-          (210, 245,  35): 'America/Puerto_Rico',
-          (210,  70, 175): 'America/Rainy_River',
-          (175,  35, 210): 'America/Rankin_Inlet',
-          (105, 105,   0): 'America/Recife',
-          (175,  35,  35): 'America/Regina',
-          ( 70, 140, 175): 'America/Resolute',
-          ( 70, 210, 210): 'America/Rio_Branco',
-          (175,  70,   0): 'America/Santarem',
-          (  0, 175, 140): 'America/Santiago',
-          (105, 245, 175): 'America/Santo_Domingo',
-          (175, 140, 140): 'America/Sao_Paulo',
-          ( 35, 140, 245): 'America/Scoresbysund',
-          (  0, 210, 210): 'America/Sitka',
-          (105,  35,  70): 'America/St_Barthelemy',
-          (140, 245, 210): 'America/St_Johns',
-          (175, 105,  35): 'America/St_Kitts',
-          (210,   0, 210): 'America/St_Lucia',
-          (175, 175, 140): 'America/St_Thomas',
-          (  0, 105, 105): 'America/St_Vincent',
-          ( 35, 140, 140): 'America/Swift_Current',
-          (175, 245,  70): 'America/Tegucigalpa',
-          (175,  35,  70): 'America/Thule',
-          (210,   0,  70): 'America/Thunder_Bay',
-          (105, 105, 140): 'America/Tijuana',
-          (140,  35,   0): 'America/Toronto',
-          (175,   0, 140): 'America/Tortola',
-          (  0, 245, 105): 'America/Vancouver',
-          (175,  70, 140): 'America/Whitehorse',
-          (140, 210, 175): 'America/Winnipeg',
-          ( 35, 245,  35): 'America/Yakutat',
-          ( 70, 140, 105): 'America/Yellowknife',
-          ( 35,  35, 140): 'Antarctica/Macquarie',
-          ( 70,   0, 210): 'Arctic/Longyearbyen',
-          (105,  70,  35): 'Asia/Aden',
-          (175, 210, 105): 'Asia/Almaty',
-          (105, 105, 175): 'Asia/Amman',
-          (210,  35, 105): 'Asia/Anadyr',
-          ( 70,  35, 210): 'Asia/Aqtau',
-          (140,   0, 210): 'Asia/Aqtobe',
-          ( 35,  70, 105): 'Asia/Ashgabat',
-          (  0, 175, 105): 'Asia/Baghdad',
-          ( 70,   0, 140): 'Asia/Bahrain',
-          ( 35,  35,   0): 'Asia/Baku',
-          (140, 175, 175): 'Asia/Bangkok',
-          (140, 210, 105): 'Asia/Barnaul',
-          (210, 175, 175): 'Asia/Beirut',
-          (105, 245, 210): 'Asia/Bishkek',
-          (105, 175, 140): 'Asia/Brunei',
-          (210, 210,   0): 'Asia/Chita',
-          (105, 140,  35): 'Asia/Choibalsan',
-          (210, 175, 140): 'Asia/Chongqing',
-          (140, 245,  70): 'Asia/Colombo',
-          (210,  35, 175): 'Asia/Damascus',
-          (105,  70, 175): 'Asia/Dhaka',
-          (175, 210,   0): 'Asia/Dili',
-          (175,  70, 105): 'Asia/Dubai',
-          (105, 175,   0): 'Asia/Dushanbe',
-          (140,  70, 210): 'Asia/Gaza',
-          (  0, 245,  35): 'Asia/Harbin',
-          (175, 105, 105): 'Asia/Hebron',
-          (  0, 175,  70): 'Asia/Ho_Chi_Minh',
-          (210, 140, 175): 'Asia/Hong_Kong',
-          ( 70,  35, 245): 'Asia/Hovd',
-          ( 70, 105, 245): 'Asia/Irkutsk',
-          (  0, 210, 245): 'Asia/Jakarta',
-          (210, 245,   0): 'Asia/Jayapura',
-          (  0, 105, 245): 'Asia/Jerusalem',
-          (210,  35, 140): 'Asia/Kabul',
-          (210,  70,  35): 'Asia/Kamchatka',
-          (105,  35, 140): 'Asia/Karachi',
-          (  0, 105, 175): 'Asia/Kashgar',
-          (140, 140,  70): 'Asia/Kathmandu',
-          ( 35, 245, 245): 'Asia/Khandyga',
-          (210,   0, 245): 'Asia/Kolkata',
-          (140, 245, 105): 'Asia/Krasnoyarsk',
-          (175, 105, 245): 'Asia/Kuala_Lumpur',
-          (140, 245,   0): 'Asia/Kuching',
-          (140,   0,   0): 'Asia/Kuwait',
-          ( 70, 105, 105): 'Asia/Macau',
-          ( 35,   0,  70): 'Asia/Magadan',
-          (210, 140, 105): 'Asia/Makassar',
-          (140, 175,   0): 'Asia/Manila',
-          (210,   0,  35): 'Asia/Muscat',
-          (105,   0, 245): 'Asia/Nicosia',
-          ( 35, 175, 105): 'Asia/Novokuznetsk',
-          ( 35, 140,   0): 'Asia/Novosibirsk',
-          (210,  70, 245): 'Asia/Omsk',
-          ( 70,  35,  35): 'Asia/Oral',
-          (140,  70,  70): 'Asia/Phnom_Penh',
-          (175, 210, 245): 'Asia/Pontianak',
-          ( 70, 210,  35): 'Asia/Pyongyang',
-          ( 35, 245, 140): 'Asia/Qatar',
-          (140,   0, 175): 'Asia/Qyzylorda',
-          ( 35, 245, 105): 'Asia/Rangoon',
-          (105, 140,  70): 'Asia/Riyadh',
-          ( 35, 105, 140): 'Asia/Sakhalin',
-          ( 70, 175, 105): 'Asia/Samarkand',
-          (  0, 140, 140): 'Asia/Seoul',
-          (175,  35,   0): 'Asia/Shanghai',
-          (175,  35, 105): 'Asia/Singapore',
-          (105,  70,   0): 'Asia/Srednekolymsk',
-          ( 70,  70, 140): 'Asia/Taipei',
-          (140,  35, 140): 'Asia/Tashkent',
-          (  0, 245, 210): 'Asia/Tbilisi',
-          ( 35,  35,  35): 'Asia/Tehran',
-          ( 35,  70,   0): 'Asia/Thimphu',
-          (140, 175,  70): 'Asia/Tokyo',
-          (175, 140, 245): 'Asia/Tomsk',
-          ( 70,  70,  70): 'Asia/Ulaanbaatar',
-          (210, 210, 105): 'Asia/Urumqi',
-          (175, 245,  35): 'Asia/Ust-Nera',
-          (140, 105, 245): 'Asia/Vientiane',
-          ( 35, 140, 210): 'Asia/Vladivostok',
-          ( 70, 105, 210): 'Asia/Yakutsk',
-          ( 70, 245,  70): 'Asia/Yekaterinburg',
-          (  0, 245, 245): 'Asia/Yerevan',
-          (140, 210, 140): 'Atlantic/Azores',
-          (140,  35, 210): 'Atlantic/Bermuda',
-          (140, 105, 210): 'Atlantic/Canary',
-          (175, 245, 175): 'Atlantic/Cape_Verde',
-          (210,   0, 140): 'Atlantic/Faroe',
-          ( 35,  70, 175): 'Atlantic/Madeira',
-          (105, 210, 140): 'Atlantic/Reykjavik',
-          ( 35, 105,  70): 'Atlantic/South_Georgia',
-          ( 70, 175, 245): 'Atlantic/St_Helena',
-          ( 35, 210,  70): 'Atlantic/Stanley',
-          ( 35, 105, 175): 'Australia/Adelaide',
-          (140,   0, 105): 'Australia/Brisbane',
-          ( 70,  70, 210): 'Australia/Broken_Hill',
-          (  0, 245,   0): 'Australia/Currie',
-          ( 35,  70,  35): 'Australia/Darwin',
-          ( 35, 175,  35): 'Australia/Eucla',
-          ( 70,   0, 245): 'Australia/Hobart',
-          (105, 175, 105): 'Australia/Lindeman',
-          (  0, 105, 140): 'Australia/Lord_Howe',
-          ( 70, 105,  70): 'Australia/Melbourne',
-          ( 35,   0, 105): 'Australia/Perth',
-          (105, 140, 210): 'Australia/Sydney',
-          # (0,   0,  35): 'Etc/GMT-12',
-          # (0,   0,  70): 'Etc/GMT-11',
-          # (0,   0, 105): 'Etc/GMT-10',
-          # (0,   0, 140): 'Etc/GMT-9',
-          # (0,   0, 175): 'Etc/GMT-8',
-          # (0,   0, 210): 'Etc/GMT-7',
-          # (0,   0, 245): 'Etc/GMT-6',
-          # (0,  35,   0): 'Etc/GMT-5',
-          # (0,  35,  35): 'Etc/GMT-4',
-          # (0,  35,  70): 'Etc/GMT-3',
-          # (0,  35, 105): 'Etc/GMT-2',
-          # (0,  35, 140): 'Etc/GMT-1',
-          # (0,  35, 175): 'Etc/GMT0',
-          # (0,  35, 210): 'Etc/GMT+1',
-          # (0,  35, 245): 'Etc/GMT+2',
-          # (0,  70,   0): 'Etc/GMT+3',
-          # (0,  70,  35): 'Etc/GMT+4',
-          # (0,  70,  70): 'Etc/GMT+5',
-          # (0,  70, 105): 'Etc/GMT+6',
-          # (0,  70, 140): 'Etc/GMT+7',
-          # (0,  70, 175): 'Etc/GMT+8',
-          # (0,  70, 210): 'Etc/GMT+9',
-          # (0,  70, 245): 'Etc/GMT+10',
-          # (0, 105,   0): 'Etc/GMT+11',
-          # (0, 105,  35): 'Etc/GMT+12',
-          (210, 105, 140): 'Europe/Amsterdam',
-          (210, 210, 245): 'Europe/Andorra',
-          (  0, 210, 105): 'Europe/Astrakhan',
-          (105, 105, 105): 'Europe/Athens',
-          (105, 175,  35): 'Europe/Belgrade',
-          (  0, 140,  35): 'Europe/Berlin',
-          ( 70, 245, 245): 'Europe/Bratislava',
-          (140,  70, 175): 'Europe/Brussels',
-          (140, 140,   0): 'Europe/Bucharest',
-          (105,   0, 210): 'Europe/Budapest',
-          (210,  70, 210): 'Europe/Busingen',
-          (140, 210,  70): 'Europe/Chisinau',
-          (175,  70,  70): 'Europe/Copenhagen',
-          (140, 210, 245): 'Europe/Dublin',
-          (210, 210,  70): 'Europe/Gibraltar',
-          (140, 245, 245): 'Europe/Guernsey',
-          (175, 245, 245): 'Europe/Helsinki',
-          (140,  35,  35): 'Europe/Isle_of_Man',
-          (105,  35, 175): 'Europe/Istanbul',
-          (175, 245,   0): 'Europe/Jersey',
-          (105,  35,  35): 'Europe/Kaliningrad',
-          (140, 140, 140): 'Europe/Kiev',
-          (210,  35, 245): 'Europe/Kirov',
-          ( 35,  35, 105): 'Europe/Lisbon',
-          ( 70, 210, 140): 'Europe/Ljubljana',
-          (175,   0, 210): 'Europe/London',
-          (105, 175,  70): 'Europe/Luxembourg',
-          (175, 140, 210): 'Europe/Madrid',
-          (175,   0, 175): 'Europe/Malta',
-          (105,  70, 210): 'Europe/Mariehamn',
-          (210, 140, 245): 'Europe/Minsk',
-          (140, 105,  70): 'Europe/Monaco',
-          (105, 245, 140): 'Europe/Moscow',
-          (210,   0, 105): 'Europe/Oslo',
-          (175,   0,  35): 'Europe/Paris',
-          (105,  35, 105): 'Europe/Podgorica',
-          (105, 210,   0): 'Europe/Prague',
-          (175, 140, 105): 'Europe/Riga',
-          (140, 140, 210): 'Europe/Rome',
-          ( 70, 210,   0): 'Europe/Samara',
-          (175,  70, 210): 'Europe/San_Marino',
-          (175, 210, 140): 'Europe/Sarajevo',
-          (105,   0, 175): 'Europe/Simferopol',
-          (175, 175, 105): 'Europe/Skopje',
-          (175, 175, 245): 'Europe/Sofia',
-          (210, 140,   0): 'Europe/Stockholm',
-          ( 35,   0,   0): 'Europe/Tallinn',
-          ( 35, 140, 175): 'Europe/Tirane',
-          ( 35, 140,  35): 'Europe/Ulyanovsk',
-          (210, 140,  35): 'Europe/Uzhgorod',
-          ( 35,   0, 140): 'Europe/Vaduz',
-          ( 35,  35, 210): 'Europe/Vatican',
-          (140, 140, 175): 'Europe/Vienna',
-          ( 35,   0, 210): 'Europe/Vilnius',
-          ( 35, 245,  70): 'Europe/Volgograd',
-          (105,  70, 105): 'Europe/Warsaw',
-          (  0, 175, 245): 'Europe/Zagreb',
-          ( 70, 140,   0): 'Europe/Zaporozhye',
-          ( 70, 175, 210): 'Europe/Zurich',
-          ( 35, 245, 175): 'Indian/Antananarivo',
-          (  0, 140, 105): 'Indian/Chagos',
-          ( 70,  70, 105): 'Indian/Christmas',
-          ( 35, 175, 140): 'Indian/Cocos',
-          (105, 175, 175): 'Indian/Comoro',
-          (140, 105, 175): 'Indian/Kerguelen',
-          ( 35, 105,   0): 'Indian/Mahe',
-          (210, 105, 105): 'Indian/Maldives',
-          (140,   0,  35): 'Indian/Mauritius',
-          (175, 245, 105): 'Indian/Mayotte',
-          (140, 140, 105): 'Indian/Reunion',
-          (105,  35,   0): 'Pacific/Apia',
-          (210, 105,  70): 'Pacific/Auckland',
-          (105, 140, 245): 'Pacific/Bougainville',
-          ( 35,  35, 245): 'Pacific/Chatham',
-          (105, 175, 245): 'Pacific/Chuuk',
-          (140, 105, 140): 'Pacific/Easter',
-          (140,  70, 140): 'Pacific/Efate',
-          (140, 210,   0): 'Pacific/Enderbury',
-          (175, 175,  70): 'Pacific/Fakaofo',
-          ( 70, 140,  70): 'Pacific/Fiji',
-          ( 35,  70, 245): 'Pacific/Funafuti',
-          ( 70,  35,   0): 'Pacific/Galapagos',
-          (175,  70,  35): 'Pacific/Gambier',
-          (175,   0, 245): 'Pacific/Guadalcanal',
-          ( 35, 175, 175): 'Pacific/Guam',
-          (140,  35,  70): 'Pacific/Honolulu',
-          ( 35,   0,  35): 'Pacific/Johnston',
-          (140,   0, 140): 'Pacific/Kiritimati',
-          (105, 210,  70): 'Pacific/Kosrae',
-          (140, 245, 140): 'Pacific/Kwajalein',
-          (  0, 175, 175): 'Pacific/Majuro',
-          ( 70,   0,  70): 'Pacific/Marquesas',
-          (105,   0, 140): 'Pacific/Midway',
-          (210, 140, 210): 'Pacific/Nauru',
-          (210,  70,  70): 'Pacific/Niue',
-          (105, 245,  35): 'Pacific/Norfolk',
-          (210,  70,   0): 'Pacific/Noumea',
-          (  0, 245, 140): 'Pacific/Pago_Pago',
-          (105,  70,  70): 'Pacific/Palau',
-          ( 70,   0,  35): 'Pacific/Pitcairn',
-          (105, 210, 210): 'Pacific/Pohnpei',
-          ( 70, 210, 175): 'Pacific/Port_Moresby',
-          (210,  35,   0): 'Pacific/Rarotonga',
-          (210, 175, 210): 'Pacific/Saipan',
-          (175, 210,  35): 'Pacific/Tahiti',
-          ( 70, 140, 140): 'Pacific/Tarawa',
-          ( 70,  70,   0): 'Pacific/Tongatapu',
-          ( 70, 105, 175): 'Pacific/Wake',
-          (  0, 105, 210): 'Pacific/Wallis',
-          (  0, 245, 175): 'Pacific/Yap',
-          ( 70,  70,  35): 'uninhabited'}
+    if scale == 1:
+        return raster_path
+    base, extension = os.path.splitext(raster_path)
+    return '{}_x{:g}{}'.format(base, scale, extension)
 
-if __name__ == '__main__':
+
+def _spread_bits(values):
+    """8 bit values with a 0 bit put between each of their bits, half a Z-order key"""
+    values = values.astype(np.uint16)
+    values = (values | (values << 4)) & 0x0F0F
+    values = (values | (values << 2)) & 0x3333
+    return (values | (values << 1)) & 0x5555
+
+
+def join_order(pixel_rows, pixel_columns, shape, tile_size=JOIN_TILE):
+    """Order visiting points tile by tile, for a spatial join. Tiles go in Z-order, so tiles beside each
+    other either way mostly come together. The key is held to 16 bits, the tiles doubling in size on
+    larger rasters, as numpy sorts 16 bit keys stably by radix, a couple of passes over them.
+    Arguments:
+        pixel_rows (array of ints), pixel_columns (array of ints), pixels of the points
+        shape (tuple), rows, columns of the raster
+        tile_size (int), pixels square of the smallest tiles, a power of 2
+    Returns:
+        order (1D array of ints), indices into the flattened points, tile by tile
+    """
+    while max(shape) > tile_size * 256:  # Tile rows and columns to 8 bits each
+        tile_size *= 2
+    shift = tile_size.bit_length() - 1
+    keys = (_spread_bits(np.ravel(pixel_rows) >> shift) << 1) | _spread_bits(np.ravel(pixel_columns) >> shift)
+    return np.argsort(keys, kind='stable')
+
+
+class Histogram(object):
+    """Cumulative histogram, Prometheus style, for latencies and the like
+    Arguments:
+        bounds (list of floats), upper bound of each bucket, ascending; an unbounded one is added
+    """
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        """Counts the value in its bucket"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def as_dict(self):
+        """Buckets as {'le': upper bound, 'count': values at or below it}, plus count and sum"""
+        buckets, running = [], 0
+        for bound, count in zip(self.bounds + [float('inf')], self.counts):
+            running += count
+            buckets.append({'le': bound, 'count': running})
+        return {'buckets': buckets, 'count': running, 'sum': self.total}
+
+    def prometheus(self, name, labels=''):
+        """Prometheus text exposition lines of the histogram"""
+        histogram = self.as_dict()
+        separator = ',' if labels else ''
+        lines = ['{}_bucket{{{}{}le="{}"}} {}'.format(name, labels, separator, '+Inf' if bucket['le'] == float('inf')
+                                                      else repr(bucket['le']), bucket['count'])
+                 for bucket in histogram['buckets']]
+        lines.append('{}_count{} {}'.format(name, '{' + labels + '}' if labels else '', histogram['count']))
+        lines.append('{}_sum{} {!r}'.format(name, '{' + labels + '}' if labels else '', histogram['sum']))
+        return lines
+
+
+class PixelCache(object):
+    """Bounded, least recently used, cache of lookups keyed on (pixel_column, pixel_row). Fixes from
+    a slow moving receiver mostly land on the pixel before, so mostly come from here.
+    Arguments:
+        size (int), most pixels remembered, the least recently used forgotten first
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._pixels = OrderedDict()
+
+    def get(self, key):
+        """Remembered lookup for the pixel, None if forgotten or never seen"""
+        try:
+            value = self._pixels[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._pixels.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Remembers lookup for the pixel, forgetting the least recently used beyond 'size'"""
+        self._pixels[key] = value
+        if len(self._pixels) > self.size:
+            self._pixels.popitem(last=False)
+
+    def clear(self):
+        """Forgets everything, counters included"""
+        self._pixels.clear()
+        self.hits = self.misses = 0
+
+    def info(self):
+        """Counters as a dict, hits, misses, size and pixels currently remembered"""
+        return {'hits': self.hits, 'misses': self.misses, 'size': self.size, 'pixels': len(self._pixels)}
+
+
+class LookupStats(object):
+    """Which way lookups went, and how long their steps took. Kept by a TimezoneLookup made with
+    stats=True; without, the hot path pays one 'is None' test and nothing else.
+    Branches counted, per point:
+        land, sea, sentinel (zone 0, the colour that matched nothing), border_refine (border pixel
+        answered from the polygons), and the hits and misses of the lookup's PixelCache, if it has one.
+        A cache hit is counted as that, not again as land or sea.
+    Steps timed, per call, 'batch_' ones per vectorised call:
+        projection (lat/lon to pixel), pixel_fetch (zone of the pixel), geodesic ('where_go')
+    Arguments:
+        cache (PixelCache), the lookup's cache, counted from rather than counted again
+        bounds (list of floats), histogram bucket bounds, in seconds
+    """
+    BRANCHES = ('land', 'sea', 'sentinel', 'border_refine')
+    STEPS = ('projection', 'pixel_fetch', 'geodesic', 'batch_projection', 'batch_pixel_fetch')
+
+    def __init__(self, cache=None, bounds=STEP_BOUNDS):
+        self.cache = cache
+        self.bounds = bounds
+        self.clear()
+
+    def clear(self):
+        """Back to nothing counted or timed"""
+        self.counts = dict.fromkeys(self.BRANCHES, 0)
+        self.timings = {step: Histogram(self.bounds) for step in self.STEPS}
+
+    def count_zone(self, zone_id, sea_zones):
+        """Counts one answer as land, sea or sentinel"""
+        self.counts['land' if zone_id > sea_zones else 'sea' if zone_id else 'sentinel'] += 1
+
+    def count_zones(self, zone_ids, sea_zones):
+        """Vectorised 'count_zone'"""
+        land = int(np.count_nonzero(zone_ids > sea_zones))
+        sentinel = int(np.count_nonzero(zone_ids == 0))
+        self.counts['land'] += land
+        self.counts['sentinel'] += sentinel
+        self.counts['sea'] += np.size(zone_ids) - land - sentinel
+
+    def as_dict(self):
+        """Counts, and histograms as Histogram.as_dict has them"""
+        counts = dict(self.counts)
+        if self.cache is not None:
+            counts['cache_hit'], counts['cache_miss'] = self.cache.hits, self.cache.misses
+        return {'counts': counts, 'timings': {step: self.timings[step].as_dict() for step in self.STEPS}}
+
+    def prometheus(self, prefix='timmeh'):
+        """Prometheus text exposition of the counts and histograms"""
+        lines = ['# TYPE {}_lookups_total counter'.format(prefix)]
+        for branch, count in sorted(self.as_dict()['counts'].items()):
+            lines.append('{}_lookups_total{{branch="{}"}} {}'.format(prefix, branch, count))
+        lines.append('# TYPE {}_step_seconds histogram'.format(prefix))
+        for step in self.STEPS:
+            lines += self.timings[step].prometheus(prefix + '_step_seconds', 'step="{}"'.format(step))
+        return '\n'.join(lines) + '\n'
+
+
+class ZoneIndex(object):
+    """Zone raster squeezed into tiles that are all one zone plus row-wise runs for the rest. Most of
+    the map is ocean bands and continental interiors, so most lookups end at the tile, and only near
+    borders is a run searched for. A fraction of the memory of the raster it came from.
+    Arguments:
+        shape (tuple of ints), rows x columns of the zone raster
+        tile_size (int), pixels along a tile's side
+        tile_zones (2D uint16 array), zone index of each tile, MIXED_TILE if more than one zone
+        run_keys (1D int64 array), row * columns + column of the first pixel of each run, ascending
+        run_zones (1D uint16 array), zone index of each run
+    """
+
+    def __init__(self, shape, tile_size, tile_zones, run_keys, run_zones):
+        self.shape = shape
+        self.tile_size = tile_size
+        self.tile_zones = tile_zones
+        self.run_keys = run_keys
+        self.run_zones = run_zones
+
+    @classmethod
+    def load(cls, index_path):
+        """ZoneIndex from a .runs.npz written by tzbuild.write_runs"""
+        with np.load(index_path) as index:
+            return cls(tuple(int(value) for value in index['shape']), int(index['tile_size']),
+                       index['tile_zones'], index['run_keys'], index['run_zones'])
+
+    @property
+    def nbytes(self):
+        """Memory held by the index"""
+        return self.tile_zones.nbytes + self.run_keys.nbytes + self.run_zones.nbytes
+
+    def zone_at(self, pixel_row, pixel_column):
+        """Zone index at one pixel"""
+        zone_id = self.tile_zones[pixel_row // self.tile_size, pixel_column // self.tile_size]
+        if zone_id == MIXED_TILE:
+            run = np.searchsorted(self.run_keys, pixel_row * self.shape[1] + pixel_column, 'right') - 1
+            zone_id = self.run_zones[run]
+        return int(zone_id)
+
+    def zones_at(self, pixel_rows, pixel_columns):
+        """Zone indices at arrays of pixels, of their shape, a single pixel's a scalar as from the raster"""
+        shape = np.shape(pixel_rows)  # Worked on flat, a scalar's zone being no array to write runs' zones into
+        pixel_rows, pixel_columns = np.ravel(pixel_rows), np.ravel(pixel_columns)
+        zone_ids = self.tile_zones[pixel_rows // self.tile_size, pixel_columns // self.tile_size]
+        mixed = np.flatnonzero(zone_ids == MIXED_TILE)
+        if mixed.size:
+            keys = pixel_rows[mixed].astype(np.int64) * self.shape[1] + pixel_columns[mixed]
+            zone_ids[mixed] = self.run_zones[np.searchsorted(self.run_keys, keys, 'right') - 1]
+        return zone_ids.reshape(shape)[()]
+
+    def zones_in_window(self, first_row, last_row, first_column, last_column):
+        """Zone indices of every zone with a pixel in the window, ends included
+        Returns:
+            zone_ids (1D array of ints), ascending
+        """
+        tile_size = self.tile_size
+        if first_row // tile_size == last_row // tile_size and first_column // tile_size == last_column // tile_size:
+            zone_id = self.tile_zones[first_row // tile_size, first_column // tile_size]  # All in the one tile,
+            if zone_id != MIXED_TILE:  # and the one zone.
+                return np.array([zone_id], dtype=np.uint16)
+
+        row_keys = np.arange(first_row, last_row + 1, dtype=np.int64) * self.shape[1]
+        firsts = np.searchsorted(self.run_keys, row_keys + first_column, 'right') - 1  # Runs covering the
+        counts = np.searchsorted(self.run_keys, row_keys + last_column, 'right') - firsts  # window, row by row,
+        runs = np.arange(counts.sum()) + np.repeat(firsts - (np.cumsum(counts) - counts), counts)  # end to end
+        return np.unique(self.run_zones[runs])
+
+
+class ZoneExtents(object):
+    """Reverse index of a zone raster, where each zone is: its box, size, a point inside it and its
+    runs along the rows, so finding a zone takes no scan of the raster.
+    Arguments:
+        shape (tuple of ints), rows x columns of the zone raster
+        bounds (2D int32 array), first row, last row, west column, east column of each zone, west
+            greater than east where it crosses the antimeridian, -1s for a zone without pixels
+        pixels (1D int64 array), pixels of each zone
+        area (1D float64 array), km2 of each zone
+        interior (2D int32 array), row, column of a pixel of each zone, near its centroid
+        run_keys (1D int64 array), row * columns + column of the first pixel of each run, zone by zone
+        run_lengths (1D int32 array), pixels of each run
+        zone_starts (1D int64 array), first run of each zone, and one past the last
+    """
+
+    def __init__(self, shape, bounds, pixels, area, interior, run_keys, run_lengths, zone_starts):
+        self.shape = shape
+        self.bounds = bounds
+        self.pixels = pixels
+        self.area = area
+        self.interior = interior
+        self.run_keys = run_keys
+        self.run_lengths = run_lengths
+        self.zone_starts = zone_starts
+
+    @classmethod
+    def load(cls, extents_path):
+        """ZoneExtents from a .extents.npz written by tzbuild.write_extents"""
+        with np.load(extents_path) as extents:
+            return cls(tuple(extents['shape']), extents['bounds'], extents['pixels'], extents['area'],
+                       extents['interior'], extents['run_keys'], extents['run_lengths'], extents['zone_starts'])
+
+    def runs(self, zone_id):
+        """Runs of one zone, in raster order
+        Returns:
+            pixel_rows (1D int64 array), row of each run
+            first_columns (1D int64 array), first column of each run
+            last_columns (1D int64 array), last column of each run
+        """
+        runs = slice(self.zone_starts[zone_id], self.zone_starts[zone_id + 1])
+        pixel_rows, first_columns = np.divmod(self.run_keys[runs], self.shape[1])
+        return pixel_rows, first_columns, first_columns + self.run_lengths[runs] - 1
+
+
+class BorderIndex(object):
+    """Border pixels of a zone raster, those with a neighbor in another zone, and the timezone polygon
+    edges crossing each pixel row. A point on a border pixel gets the polygon exact answer by casting
+    a ray east along its latitude through just that row's edges; everywhere else stays one array read.
+    Arguments:
+        border_bits (2D uint8 array), border pixels, bit packed along the rows (numpy.packbits)
+        band_starts (1D int64 array), first edge of each pixel row, and one past the last
+        edges (2D float64 array), lon, lat, lon, lat of both ends of each polygon edge, row by row
+        edge_zones (1D uint16 array), zone index of the polygon each edge belongs to
+    """
+
+    def __init__(self, border_bits, band_starts, edges, edge_zones):
+        self.border_bits = border_bits
+        self.band_starts = band_starts
+        self.edges = edges
+        self.edge_zones = edge_zones
+        self.max_rows = len(band_starts) - 1
+
+    @classmethod
+    def load(cls, index_path):
+        """BorderIndex from a .border.npz written by tzbuild.write_borders"""
+        with np.load(index_path) as index:
+            return cls(index['border_bits'], index['band_starts'], index['edges'], index['edge_zones'])
+
+    def is_border(self, pixel_row, pixel_column):
+        """True for a pixel with a neighbor in another zone"""
+        return bool(self.border_bits[pixel_row, pixel_column >> 3] & (0x80 >> (pixel_column & 7)))
+
+    def are_border(self, pixel_rows, pixel_columns):
+        """Vectorised 'is_border'"""
+        return (self.border_bits[pixel_rows, pixel_columns >> 3] & (0x80 >> (pixel_columns & 7))) != 0
+
+    def zones_containing(self, lat, lon, candidates):
+        """Which of the candidate zones' polygons hold the point, by the parity of the edges crossed
+        going east from it. Edges are filed under every row they span, so its own row has them all.
+        Arguments:
+            lat (float), Latitude North (positive), South (negative)
+            lon (float), Longitude East (positive), West (negative)
+            candidates (1D array of ints), zone indices worth testing
+        Returns:
+            zone_ids (1D array of ints), ascending, empty if the point is in none of them
+        """
+        band_row = min(max(int((90 - lat) * (self.max_rows / 180)), 0), self.max_rows - 1)
+        band = slice(self.band_starts[band_row], self.band_starts[band_row + 1])
+        edge_zones = self.edge_zones[band]
+        wanted = np.isin(edge_zones, candidates)
+        lon_1, lat_1, lon_2, lat_2 = self.edges[band][wanted].T
+        edge_zones = edge_zones[wanted]
+
+        spanning = (lat_1 > lat) != (lat_2 > lat)  # Edges the latitude passes through,
+        lon_1, lat_1, lon_2, lat_2 = lon_1[spanning], lat_1[spanning], lon_2[spanning], lat_2[spanning]
+        crossing = lon_1 + (lat - lat_1) * (lon_2 - lon_1) / (lat_2 - lat_1)  # where,
+        crossings = np.bincount(edge_zones[spanning][crossing > lon])  # and how many east of the point
+        return np.flatnonzero(crossings & 1)
+
+
+class TiledRaster(object):
+    """uint16 raster in tiles within a zone database, a tile all of one value stored as just that value
+    in its directory and the rest zlib compressed one by one. A mixed tile is decompressed when first
+    wanted, and kept while it's used. Indexed as the array it stands for, [row, column], with ints or
+    arrays of them.
+    Layout, from 'directory_offset':
+        uint16 value of each tile (MIXED_TILE if more than one), row by row, then the uint64 offset of
+        each tile's compressed values, and one past the last
+    Arguments:
+        database (1D uint8 array), the zone database, memory mapped
+        directory_offset (int), where the tile directory starts
+        shape (tuple of ints), rows, columns of the raster
+        tile_size (int), pixels along a tile's side
+        tile_cache (int), decompressed tiles kept, the least recently used forgotten first
+    """
+
+    def __init__(self, database, directory_offset, shape, tile_size, tile_cache=256):
+        self._file = database
+        self.shape = shape
+        self.tile_size = tile_size
+        self.tile_columns = -(-shape[1] // tile_size)
+        tiles = -(-shape[0] // tile_size) * self.tile_columns
+        self.tile_values = np.frombuffer(database[directory_offset:directory_offset + tiles * 2], dtype='<u2').copy()
+        self.tile_offsets = np.frombuffer(database[directory_offset + tiles * 2:directory_offset + tiles * 10 + 8],
+                                          dtype='<u8').copy()
+        self.tiles = PixelCache(tile_cache)  # Same LRU as the pixels, keyed on tile number
+
+    @property
+    def nbytes(self):
+        """Bytes held in memory, the directory and the tiles currently decompressed"""
+        return self.tile_values.nbytes + self.tile_offsets.nbytes + \
+            self.tiles.info()['pixels'] * self.tile_size ** 2 * 2
+
+    def tile(self, number):
+        """Values of one mixed tile, decompressed on first use"""
+        values = self.tiles.get(number)
+        if values is None:
+            tile_row, tile_column = divmod(number, self.tile_columns)
+            rows = min(self.tile_size, self.shape[0] - tile_row * self.tile_size)  # Tiles along the bottom and
+            columns = min(self.tile_size, self.shape[1] - tile_column * self.tile_size)  # right edges are short
+            compressed = self._file[int(self.tile_offsets[number]):int(self.tile_offsets[number + 1])]
+            values = np.frombuffer(zlib.decompress(compressed), dtype='<u2').reshape(rows, columns)
+            self.tiles.put(number, values)
+        return values
+
+    def value_at(self, pixel_row, pixel_column):
+        """Value of one pixel"""
+        number = (pixel_row // self.tile_size) * self.tile_columns + pixel_column // self.tile_size
+        value = int(self.tile_values[number])
+        if value != MIXED_TILE:
+            return value
+        return int(self.tile(number)[pixel_row % self.tile_size, pixel_column % self.tile_size])
+
+    def values_at(self, pixel_rows, pixel_columns):
+        """Vectorised 'value_at', each mixed tile decompressed once for all the points on it"""
+        shape = np.shape(pixel_rows)
+        pixel_rows, pixel_columns = np.ravel(pixel_rows), np.ravel(pixel_columns)
+        numbers = (pixel_rows // self.tile_size) * self.tile_columns + pixel_columns // self.tile_size
+        values = self.tile_values[numbers]
+        mixed = np.flatnonzero(values == MIXED_TILE)
+        if len(mixed):
+            mixed = mixed[np.argsort(numbers[mixed], kind='stable')]  # Points grouped by tile
+            tile_numbers, starts = np.unique(numbers[mixed], return_index=True)
+            for number, points in zip(tile_numbers, np.split(mixed, starts[1:])):
+                values[points] = self.tile(number)[pixel_rows[points] % self.tile_size,
+                                                   pixel_columns[points] % self.tile_size]
+        return values.reshape(shape)[()]
+
+    def __getitem__(self, pixel):
+        pixel_rows, pixel_columns = pixel
+        if np.ndim(pixel_rows) == 0 and np.ndim(pixel_columns) == 0:
+            return self.value_at(int(pixel_rows), int(pixel_columns))
+        return self.values_at(pixel_rows, pixel_columns)
+
+
+class ZoneDatabase(object):
+    """Zone table, zone raster, reverse index, distance field and border index in one versioned file,
+    for when flash and RAM are short. The zone raster and distance field are TiledRasters, so nothing
+    but the header, table and tile directories is read on opening.
+    Layout, as tzbuild.write_database writes it:
+        header, DATABASE_HEADER: magic, version, BUILD_FORMAT of the raster it was packed from, tile size,
+            rows, columns, zones, sea zones, zone table offset and length, tile directory offset, border
+            index offset and length (0 for none), reverse index offset and length, distance field tile
+            directory offset (0 for none)
+        zone table, zlib compressed, the zone lines of a .zones file
+        zone raster, a TiledRaster of zone indices, its directory then its tiles
+        border index, the .border.npz of timmeh.BorderIndex.load
+        reverse index, the .extents.npz of timmeh.ZoneExtents.load, compressed
+        distance field, a TiledRaster of the .distance.npy
+    Arguments:
+        database_path (str), .tzdb written by tzbuild.write_database
+        tile_cache (int), decompressed tiles kept of each TiledRaster
+    """
+
+    def __init__(self, database_path, tile_cache=256):
+        self._file = np.memmap(database_path, dtype=np.uint8, mode='r')  # Only what is read gets paged in
+        magic, version = struct.unpack_from('<4sH', self._file)
+        if magic != DATABASE_MAGIC:
+            raise IOError('{} is not a zone database'.format(database_path))
+        if version != DATABASE_VERSION:
+            raise IOError('{} is zone database version {}, this timmeh reads {}, "python3 tzbuild.py --database" '
+                          'makes it anew'.format(database_path, version, DATABASE_VERSION))
+        (magic, version, self.build_format, self.tile_size, rows, columns, zones, self.sea_zones, table_offset,
+         table_length, directory_offset, self.border_offset, self.border_length, self.extents_offset,
+         self.extents_length, distance_offset) = DATABASE_HEADER.unpack_from(self._file)
+        self.shape = (rows, columns)
+        self.zone_lines = zlib.decompress(self._file[table_offset:table_offset + table_length]).decode('utf-8')\
+            .splitlines()
+        self.zones = TiledRaster(self._file, directory_offset, self.shape, self.tile_size, tile_cache)
+        self.tile_columns, self.tile_zones, self.tile_offsets, self.tiles = \
+            self.zones.tile_columns, self.zones.tile_values, self.zones.tile_offsets, self.zones.tiles
+        self.distances = TiledRaster(self._file, distance_offset, self.shape, self.tile_size, tile_cache) \
+            if distance_offset else None
+
+    @property
+    def nbytes(self):
+        """Bytes held in memory, the directories and the tiles currently decompressed"""
+        return self.zones.nbytes + (self.distances.nbytes if self.distances is not None else 0)
+
+    def tile(self, number):
+        """Zones of one mixed tile, decompressed on first use"""
+        return self.zones.tile(number)
+
+    def zone_at(self, pixel_row, pixel_column):
+        """Zone index of one pixel"""
+        return self.zones.value_at(pixel_row, pixel_column)
+
+    def zones_at(self, pixel_rows, pixel_columns):
+        """Vectorised 'zone_at', each mixed tile decompressed once for all the points on it"""
+        return self.zones.values_at(pixel_rows, pixel_columns)
+
+    def zones_in_window(self, first_row, last_row, first_column, last_column):
+        """Zone indices present in a window of pixels, bounds inclusive, ascending"""
+        found = []
+        for tile_row in range(first_row // self.tile_size, last_row // self.tile_size + 1):
+            top = tile_row * self.tile_size
+            for tile_column in range(first_column // self.tile_size, last_column // self.tile_size + 1):
+                left = tile_column * self.tile_size
+                number = tile_row * self.tile_columns + tile_column
+                if self.tile_zones[number] != MIXED_TILE:
+                    found.append(self.tile_zones[number:number + 1])
+                else:
+                    found.append(np.unique(self.tile(number)[max(first_row - top, 0):last_row - top + 1,
+                                                             max(first_column - left, 0):last_column - left + 1]))
+        return np.unique(np.concatenate(found))
+
+    def border_index(self):
+        """BorderIndex stored in the database, None if it was packed without one"""
+        if not self.border_length:
+            return None
+        return BorderIndex.load(io.BytesIO(self._file[self.border_offset:self.border_offset + self.border_length]))
+
+    def zone_extents(self):
+        """ZoneExtents stored in the database"""
+        return ZoneExtents.load(io.BytesIO(self._file[self.extents_offset:self.extents_offset + self.extents_length]))
+
+
+class TimezoneLookup(object):
+    """Timezone lookup on one zone raster. Nothing is read, mapped or imported until first asked for,
+    so any number of them, at any resolution, cost next to nothing to hold.
+    Arguments:
+        image_path (str), color referenced timezone image the zone raster is built from
+        raster_path (str), zone raster, defaults to the image path with a .npy extension
+        scale (float), pyramid level, resolution relative to the image, see tzbuild.build_pyramid
+        cache_size (int), pixels remembered by 'lookup' in a PixelCache, 0 for no cache
+        runs (bool), look up on the ZoneIndex instead of mapping the whole zone raster
+        borders (bool), polygon exact answers on border pixels, from the BorderIndex
+        shapefile_path (str), timezone polygons the BorderIndex is built from
+        projection (str), pyproj definition of a raster that isn't plain longitude/latitude (equirectangular)
+        bounds (tuple of floats), x_min, y_min, x_max, y_max of such a raster, in projected units
+        workers (int), processes sharing big 'lookup_many' batches, 0 or 1 for none. Each maps the
+            same zone raster, so they share its pages rather than holding copies. See 'close'.
+        stats (bool), keep LookupStats of the branches taken and the time spent, in 'stats'
+        database (str), ZoneDatabase (.tzdb) to look up on, zone table and all; packed from the zone
+            raster if it doesn't exist yet. Once it does, it's the only file read.
+    """
+
+    def __init__(self, image_path=image_file, raster_path=None, scale=1, cache_size=0, runs=False, borders=False,
+                 shapefile_path=shapefile_file, projection=None, bounds=None, workers=0, stats=False,
+                 database=None):
+        self.options = {'image_path': image_path, 'raster_path': raster_path, 'scale': scale, 'runs': runs,
+                        'borders': borders, 'shapefile_path': shapefile_path, 'projection': projection,
+                        'bounds': bounds, 'database': database}  # Enough for a worker process to make the same map
+        self.image_path = image_path
+        self.scale = scale
+        self.base_path = raster_path or os.path.splitext(image_path)[0] + '.npy'
+        self.raster_path = level_path(self.base_path, scale)
+        self.cache = PixelCache(cache_size) if cache_size else None
+        self.database = database
+        self.runs = runs or database is not None  # The database answers as the ZoneIndex would
+        self.borders = borders
+        self.shapefile_path = shapefile_path
+        self.projection = projection
+        self.bounds = bounds
+        self.workers = workers
+        self.stats = LookupStats(self.cache) if stats else None
+        self.zone_names = None
+        self._pool = None
+        self._zone_raster = None
+        self._zone_index = None
+        self._border_index = None
+        self._zone_extents = None
+        self._distance_field = None
+        self._coordinates = None
+        self._geoid = None
+
+    def build(self):
+        """Builds the zone raster and its zone table from the image, if they are not already there or
+        were built by another build format, and the zone database from them, if there's to be one and it
+        isn't already there, or is of another build format or older than the raster. One process at a
+        time builds, under the build lock; the others wait and find it built.
+        """
+        if self._built():
+            return  # Nothing to lock for
+        with build_lock(self.lock_path):
+            if self._built():
+                return  # Built by another process while this one waited
+            if not self._raster_current():
+                tzbuild = sibling('tzbuild')  # PNG decoding only ever happens here
+                tzcolors = sibling('tzcolors')
+                tzbuild.build_pyramid(self.image_path, self.base_path, tzcolors.seadic, tzcolors.bigdic,
+                                      [self.scale], color_spread, DISTANCE)
+            if self.database is not None:
+                tzbuild = sibling('tzbuild')  # The distance field packed only if it's already been worked out, it's
+                tzbuild.write_database(self.database, self.raster_path,  # 10 s of the full map that few lookups want
+                                       distances=os.path.exists(self.distance_path))
+
+    def _built(self):
+        """Whether there's nothing for 'build' to do"""
+        if self.database is not None:
+            return os.path.exists(self.database) and self._database_current()  # All in the one file
+        return self._raster_current()
+
+    def _raster_current(self):
+        """Whether the zone raster and its zone table are there, of this build format"""
+        return os.path.exists(self.raster_path) and os.path.exists(self.table_path) and \
+            current_build(read_zone_table(self.table_path)[0], self.table_path)
+
+    def _write_missing(self, path, write, *args):
+        """Writes a file of the zone raster's that isn't there yet, under the build lock, so that only one
+        process works it out
+        Arguments:
+            path (str), the file
+            write (function), tzbuild function writing it, given the path and 'args'
+        """
+        with build_lock(self.lock_path):
+            if not os.path.exists(path):  # Or written by another process while this one waited
+                write(path, *args)
+
+    def _database_current(self):
+        """Whether the zone database is of this build format, and no older than a raster beside it"""
+        with open(self.database, 'rb') as database:
+            magic, version, build_format = struct.unpack('<4sHH', database.read(8))
+        if magic != DATABASE_MAGIC or version != DATABASE_VERSION:
+            return True  # Not for rebuilding over, ZoneDatabase says what's wrong with it
+        if not current_build(build_format, self.database):
+            return False
+        return not (os.path.exists(self.raster_path) and
+                    os.path.getmtime(self.raster_path) > os.path.getmtime(self.database))
+
+    @property
+    def lock_path(self):
+        """Build lock of the zone raster, see 'build_lock'"""
+        return os.path.splitext(self.raster_path)[0] + '.lock'
+
+    @property
+    def table_path(self):
+        """Zone table accompanying the zone raster"""
+        return os.path.splitext(self.raster_path)[0] + '.zones'
+
+    @property
+    def index_path(self):
+        """Run-length index accompanying the zone raster"""
+        return os.path.splitext(self.raster_path)[0] + '.runs.npz'
+
+    @property
+    def extents_path(self):
+        """Reverse index accompanying the zone raster"""
+        return os.path.splitext(self.raster_path)[0] + '.extents.npz'
+
+    @property
+    def distance_path(self):
+        """Distance field accompanying the zone raster"""
+        return os.path.splitext(self.raster_path)[0] + '.distance.npy'
+
+    @property
+    def border_path(self):
+        """Border index accompanying the zone raster"""
+        return os.path.splitext(self.raster_path)[0] + '.border.npz'
+
+    def load(self):
+        """Loads the zone table, and the zone raster or its run-length index, building what's missing"""
+        self.build()
+        if self.database is not None:
+            table = self.zone_index.zone_lines
+        else:
+            __build_format, table = read_zone_table(self.table_path)
+        self.zone_colors, zone_kinds, zone_names = [], [], []
+        for line in table:
+            rgb_values, kind, tz = line.split('\t')
+            self.zone_colors.append(tuple(int(value) for value in rgb_values.split(',')))
+            zone_kinds.append(kind)
+            zone_names.append(tz)
+        self.zone_name_array = np.array(zone_names, dtype=object)
+        self.sea_zones = zone_kinds.count('sea')  # Zone indices 1..sea_zones are ocean, the remainder land
+
+        zones = self.zone_index if self.runs else self.zone_raster
+        self.max_rows, self.max_columns = zones.shape  # Overall maximums
+        self.zone_names = zone_names
+
+    @property
+    def zone_raster(self):
+        """Zone index per pixel, rows x columns, mapped on first use"""
+        if self._zone_raster is None:
+            self.build()
+            self._zone_raster = np.load(self.raster_path, mmap_mode='r')  # Shared page cache, every process
+        return self._zone_raster  # maps the same pages
+
+    @property
+    def zone_index(self):
+        """ZoneIndex of the zone raster, loaded on first use and made from the raster if not yet written,
+        or the ZoneDatabase, if there is one
+        """
+        if self._zone_index is None:
+            self.build()
+            if self.database is not None:
+                self._zone_index = ZoneDatabase(self.database)
+                return self._zone_index
+            if not os.path.exists(self.index_path):
+                tzbuild = sibling('tzbuild')
+                self._write_missing(self.index_path, tzbuild.write_runs, self.zone_raster)
+            self._zone_index = ZoneIndex.load(self.index_path)
+        return self._zone_index
+
+    @property
+    def distance_field(self):
+        """Distance from each pixel to the nearest other zone, in FIELD_UNITs, mapped on first use. One
+        packed into the zone database comes from there; otherwise it's worked out from the raster if
+        'python3 tzbuild.py' didn't write it, the first time a distance is asked for.
+        """
+        if self._distance_field is None:
+            if self.database is not None:
+                self._distance_field = self.zone_index.distances
+                if self._distance_field is not None:
+                    return self._distance_field
+                if not os.path.exists(self.raster_path):
+                    raise IOError('{} was packed without a distance field, and there\'s no raster beside it to work '
+                                  'one out from, "python3 tzbuild.py --database" packs one'.format(self.database))
+            if not os.path.exists(self.distance_path):
+                tzbuild = sibling('tzbuild')
+                self._write_missing(self.distance_path, tzbuild.write_distances, self.zone_raster)
+            self._distance_field = np.load(self.distance_path, mmap_mode='r')
+        return self._distance_field
+
+    @property
+    def zone_extents(self):
+        """ZoneExtents of the zone raster, loaded on first use and made from the raster if not yet written.
+        One packed into the zone database comes from there.
+        """
+        if self._zone_extents is None:
+            if self.zone_names is None:
+                self.load()
+            if self.database is not None:
+                self._zone_extents = self.zone_index.zone_extents()
+                return self._zone_extents
+            if not os.path.exists(self.extents_path):
+                tzbuild = sibling('tzbuild')
+                self._write_missing(self.extents_path, tzbuild.write_extents, self.zone_raster, len(self.zone_names))
+            self._zone_extents = ZoneExtents.load(self.extents_path)
+        return self._zone_extents
+
+    @property
+    def border_index(self):
+        """BorderIndex of the zone raster, loaded on first use and made from the polygons if not yet written.
+        One packed into the zone database comes from there.
+        """
+        if self._border_index is None:
+            if self.zone_names is None:
+                self.load()
+            if self.database is not None:
+                self._border_index = self.zone_index.border_index()
+                if self._border_index is not None:
+                    return self._border_index
+            if not os.path.exists(self.border_path):
+                tzbuild = sibling('tzbuild')
+                self._write_missing(self.border_path, tzbuild.write_borders, self.zone_raster, self.zone_names,
+                                    self.shapefile_path)
+            self._border_index = BorderIndex.load(self.border_path)
+        return self._border_index
+
+    @property
+    def coordinates(self):
+        """pixel array projection, for a raster configured with one. pyproj is imported on first use"""
+        if self._coordinates is None:
+            from pyproj import Proj
+            self._coordinates = Proj(self.projection)
+        return self._coordinates
+
+    def pixel_of(self, lat, lon):
+        """Pixel column/row of a point. Longitude wraps round, +180 being -180, latitude is clamped, so
+        the poles and the antimeridian land on the raster. Equirectangular is plain arithmetic; only a
+        raster configured with another projection goes through pyproj.
+        Arguments:
+            lat (float), Latitude North (positive), South (negative)
+            lon (float), Longitude East (positive), West (negative)
+        Returns:
+            pixel_column (int), x pixel column in image
+            pixel_row (int), y pixel row in image
+        """
+        if self.projection is None:
+            pixel_column = ((lon + 180) % 360) * (self.max_columns / 360)
+            pixel_row = (90 - lat) * (self.max_rows / 180)
+        else:
+            x_min, y_min, x_max, y_max = self.bounds
+            x_coord, y_coord = self.coordinates(lon, lat)
+            pixel_column = (x_coord - x_min) * (self.max_columns / (x_max - x_min))
+            pixel_row = (y_max - y_coord) * (self.max_rows / (y_max - y_min))
+        return (min(max(int(pixel_column), 0), self.max_columns - 1),
+                min(max(int(pixel_row), 0), self.max_rows - 1))
+
+    def pixels_of(self, lats, lons):
+        """Vectorised 'pixel_of'
+        Arguments:
+            lats (array of floats), Latitudes North (positive), South (negative)
+            lons (array of floats), Longitudes East (positive), West (negative)
+        Returns:
+            pixel_columns (array of ints), x pixel columns in image
+            pixel_rows (array of ints), y pixel rows in image
+        """
+        check_finite(lats, lons)
+        if self.projection is None:
+            pixel_columns = np.mod(lons + 180, 360) * (self.max_columns / 360)
+            pixel_rows = (90 - lats) * (self.max_rows / 180)
+        else:
+            x_min, y_min, x_max, y_max = self.bounds
+            x_coords, y_coords = self.coordinates(lons, lats)
+            pixel_columns = (x_coords - x_min) * (self.max_columns / (x_max - x_min))
+            pixel_rows = (y_max - y_coords) * (self.max_rows / (y_max - y_min))
+        return (np.clip(pixel_columns, 0, self.max_columns - 1).astype(np.intp),
+                np.clip(pixel_rows, 0, self.max_rows - 1).astype(np.intp))
+
+    @property
+    def geoid(self):
+        """Geodesic for 'where_go', made on first use"""
+        if self._geoid is None:
+            from pyproj import Geod
+            self._geoid = Geod(ellps='WGS84')
+        return self._geoid
+
+    def get_zone(self, lat, lon):
+        """Converts Latitude/Longitude to pixel column/row and the zone index at that pixel.
+        Arguments:
+            lat (float), Latitude North (positive), South (negative)
+            lon (float), Longitude East (positive), West (negative)
+        Returns:
+            pixel_column (int), x pixel column in image
+            pixel_row (int), y pixel row in image
+            zone_id (int), index into 'zone_names'
+        """
+        if self.zone_names is None:
+            self.load()
+        if self.stats is not None:
+            return self._get_zone_measured(lat, lon)
+        pixel_column, pixel_row = self.pixel_of(lat, lon)
+        return pixel_column, pixel_row, self._zone_at(lat, lon, pixel_row, pixel_column)
+
+    def _get_zone_measured(self, lat, lon):
+        """'get_zone', counted and timed into 'stats'"""
+        started = time.perf_counter()
+        pixel_column, pixel_row = self.pixel_of(lat, lon)
+        projected = time.perf_counter()
+        zone_id = self._zone_at(lat, lon, pixel_row, pixel_column)
+        self.stats.timings['pixel_fetch'].observe(time.perf_counter() - projected)
+        self.stats.timings['projection'].observe(projected - started)
+        self.stats.count_zone(zone_id, self.sea_zones)
+        return pixel_column, pixel_row, zone_id
+
+    def _zone_at(self, lat, lon, pixel_row, pixel_column):
+        """Zone index of the point's pixel, or of the point itself on a border pixel in borders mode"""
+        if self.runs:
+            zone_id = self.zone_index.zone_at(pixel_row, pixel_column)
+        else:
+            zone_id = int(self.zone_raster[pixel_row, pixel_column])
+        if self.borders and self.border_index.is_border(pixel_row, pixel_column):
+            zone_id = self._refine(lat, lon, pixel_row, pixel_column, zone_id)
+            if self.stats is not None:
+                self.stats.counts['border_refine'] += 1
+        return zone_id
+
+    def _refine(self, lat, lon, pixel_row, pixel_column, zone_id):
+        """Zone index of a point on a border pixel, by the polygons of the zones around it. Land
+        polygons decide; in sea polygons the raster stands, as it carries the territorial waters.
+        """
+        first_row, last_row = max(pixel_row - 1, 0), min(pixel_row + 1, self.max_rows - 1)
+        first_column, last_column = max(pixel_column - 1, 0), min(pixel_column + 1, self.max_columns - 1)
+        if self.runs:
+            candidates = self.zone_index.zones_in_window(first_row, last_row, first_column, last_column)
+        else:
+            candidates = np.unique(self.zone_raster[first_row:last_row + 1, first_column:last_column + 1])
+        for inside in self.border_index.zones_containing(lat, lon, candidates):
+            if inside > self.sea_zones:
+                return int(inside)
+        return zone_id
+
+    def get_pixel(self, lat, lon):
+        """Unclutters 'lookup' function by converting Latitude/Longitude to return
+        pixel column/row and color value of the pixel.
+        Arguments:
+            lat (float), Latitude North (positive), South (negative)
+            lon (float), Longitude East (positive), West (negative)
+        Returns:
+            pixel_column (int), x pixel column in image
+            pixel_row (int), y pixel row in image
+            rgb_values (tuple of ints), RGB color tuple of the pixel's zone, edge colors already snapped
+        """
+        pixel_column, pixel_row, zone_id = self.get_zone(lat, lon)
+        return pixel_column, pixel_row, self.zone_colors[zone_id]
+
+    def lookup(self, lat, lon):
+        """looks up zone index on the zone raster as key to timezones
+        Arguments:
+            lat (float), Latitude North (positive), South (negative)
+            lon (float), Longitude East (positive), West (negative)
+        Returns:
+            pixel_column (int), pixel column
+            pixel_row (int), pixel row
+            rgb_values (tuple of ints) RGB color values
+            tz (str), 'proper named' timezone
+        """
+        if self.cache is None:
+            return self._lookup(lat, lon)
+
+        if self.zone_names is None:
+            self.load()
+        pixel = self.pixel_of(lat, lon)
+        found = self.cache.get(pixel)
+        if found is None:
+            found = self._lookup(lat, lon)
+            if not (self.borders and self.border_index.is_border(pixel[1], pixel[0])):  # Border pixels answer
+                self.cache.put(pixel, found)  # point by point, there's no one answer to remember
+        return found
+
+    def _lookup(self, lat, lon):
+        """'lookup', uncached"""
+        pixel_column, pixel_row, zone_id = self.get_zone(lat, lon)  # Territorial waters are baked into the
+        return pixel_column, pixel_row, self.zone_colors[zone_id], self.zone_names[zone_id]  # raster, at build.
+
+    def border_distance(self, lat, lon):
+        """How far a point can move, in any direction, and still be in the same zone, as far as the
+        distance field looks. A receiver that hasn't moved that far since its last lookup needn't look up again.
+        Arguments:
+            lat (float), Latitude North (positive), South (negative)
+            lon (float), Longitude East (positive), West (negative)
+        Returns:
+            meters (float), 0 on a border pixel, FIELD_DISTANCE or more for 'a long way'
+        """
+        if self.zone_names is None:
+            self.load()
+        pixel_column, pixel_row = self.pixel_of(lat, lon)
+        return float(self.distance_field[pixel_row, pixel_column]) * FIELD_UNIT
+
+    def border_distances(self, lats, lons):
+        """Vectorised 'border_distance'"""
+        if self.zone_names is None:
+            self.load()
+        pixel_columns, pixel_rows = self.pixels_of(np.asarray(lats, dtype=np.float64),
+                                                   np.asarray(lons, dtype=np.float64))
+        return self.distance_field[pixel_rows, pixel_columns] * FIELD_UNIT
+
+    def lookup_confidence(self, lat, lon):
+        """'lookup', with how far the point is from another zone and so how much to trust the answer
+        Arguments:
+            lat (float), Latitude North (positive), South (negative)
+            lon (float), Longitude East (positive), West (negative)
+        Returns:
+            pixel_column (int), pixel_row (int), rgb_values (tuple of ints), tz (str), as 'lookup'
+            meters (float), 'border_distance'
+            confidence (float), 0 on a border, rising to 1 at DISTANCE (12 nautical miles) and beyond
+        """
+        meters = self.border_distance(lat, lon)
+        return self.lookup(lat, lon) + (meters, min(1.0, meters / DISTANCE))
+
+    def where_go(self, lat, lon, azimuth, distance):
+        """Calculates *new* lat/lon pair from another pair, given bearing and distance
+        Arguments:
+            lon (float): longitude of reference point
+            lat (float): latitude of reference point
+            azimuth (float): bearing in degrees to solution
+            distance (float): distance in meters to solution
+        Returns:
+            lon (float): longitude of solution
+            lat (float: latitude of solution
+         #  __bearing_fro (float): bearing from the solution point to the reference point
+        """
+        if self.stats is None:
+            new_lon, new_lat, __bearing_fro = self.geoid.fwd(lon, lat, azimuth, distance)  # How easy is that?
+        else:
+            geoid = self.geoid  # Made, if need be, outside the timing
+            started = time.perf_counter()
+            new_lon, new_lat, __bearing_fro = geoid.fwd(lon, lat, azimuth, distance)
+            self.stats.timings['geodesic'].observe(time.perf_counter() - started)
+
+        return new_lon, new_lat
+
+    def _zones_at(self, pixel_rows, pixel_columns):
+        """Zone indices at arrays of pixels, on the run-length index or the raster"""
+        if self.runs:
+            return self.zone_index.zones_at(pixel_rows, pixel_columns)
+        flat_raster = self.zone_raster.reshape(-1)  # One flat index gathers in half the time of a row, column pair
+        return flat_raster[pixel_rows * self.max_columns + pixel_columns]
+
+    def get_pixels(self, lats, lons, join=False):
+        """Vectorised 'get_zone', same pixel math over whole arrays at once.
+        Arguments:
+            lats (array of floats), Latitudes North (positive), South (negative)
+            lons (array of floats), Longitudes East (positive), West (negative)
+            join (bool), spatial join, the points sorted tile by tile (join_order), looked up in that order
+                and the zones put back in theirs. For rasters far bigger than the CPU's cache; whether it pays on
+                a machine, 'python3 tzbench.py join' tells.
+        Returns:
+            pixel_columns (array of ints), x pixel columns in image
+            pixel_rows (array of ints), y pixel rows in image
+            zone_ids (array of ints), index into 'zone_names' for each pixel
+        """
+        if self.zone_names is None:
+            self.load()
+        lats, lons = np.broadcast_arrays(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+        shape = lats.shape  # Points worked on flat, put back in shape at the end, a single point's as scalars
+        lats, lons = lats.ravel(), lons.ravel()
+        measured = self.stats is not None  # Per batch, so timed whole, points counted afterwards
+        started = time.perf_counter() if measured else 0
+        pixel_columns, pixel_rows = self.pixels_of(lats, lons)
+        projected = time.perf_counter() if measured else 0
+        if join:
+            order = join_order(pixel_rows, pixel_columns, (self.max_rows, self.max_columns))
+            zone_ids = np.empty(len(order), dtype=np.uint16)
+            zone_ids[order] = self._zones_at(pixel_rows[order], pixel_columns[order])  # Back in the points' order
+        else:
+            zone_ids = self._zones_at(pixel_rows, pixel_columns)
+        if self.borders:  # Border points one by one, they are the few
+            on_border = np.flatnonzero(self.border_index.are_border(pixel_rows, pixel_columns))
+            for point in on_border:
+                zone_ids[point] = self._refine(lats[point], lons[point], pixel_rows[point], pixel_columns[point],
+                                               zone_ids[point])
+            if measured:
+                self.stats.counts['border_refine'] += len(on_border)
+        if measured:
+            self.stats.timings['batch_pixel_fetch'].observe(time.perf_counter() - projected)
+            self.stats.timings['batch_projection'].observe(projected - started)
+            self.stats.count_zones(zone_ids, self.sea_zones)
+        return pixel_columns.reshape(shape)[()], pixel_rows.reshape(shape)[()], zone_ids.reshape(shape)[()]
+
+    def lookup_many(self, lats, lons, join=False):
+        """Vectorised 'lookup', resolves arrays of lat/lon to timezones without a Python loop per point
+        Arguments:
+            lats (array of floats), Latitudes North (positive), South (negative)
+            lons (array of floats), Longitudes East (positive), West (negative)
+            join (bool), spatial join, see 'get_pixels', in this process; worker processes gather directly
+        Returns:
+            zone_ids (array of ints), index into 'zone_names' for each point
+            tz (array of str), 'proper named' timezone for each point
+        """
+        if self.workers > 1 and np.size(lats) >= PARALLEL_MINIMUM:
+            zone_ids = self._lookup_parallel(lats, lons)
+        else:
+            __pixel_columns, __pixel_rows, zone_ids = self.get_pixels(lats, lons, join)
+        return zone_ids, self.zone_name_array[zone_ids]
+
+    def _lookup_parallel(self, lats, lons):
+        """Zone indices of a batch, a slice per worker. Points and answers go through one block of
+        shared memory, so nothing is pickled but the block's name and where each slice starts and ends.
+        """
+        if self.zone_names is None:
+            self.load()  # Built before any worker goes looking for it
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_start_worker, initargs=(self.options,))
+
+        from multiprocessing import shared_memory
+        lats, lons = np.broadcast_arrays(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+        check_finite(lats, lons)  # Here, on the whole batch, a worker would number the points of its slice
+        count = lats.size
+        block = shared_memory.SharedMemory(create=True, size=count * 18)  # float64 lat, float64 lon, uint16 zone
+        try:
+            shared_lats, shared_lons, shared_zones = _shared_arrays(block, count)
+            shared_lats[:], shared_lons[:] = lats.ravel(), lons.ravel()
+            bounds = np.linspace(0, count, self.workers * 4 + 1).astype(int)  # A few slices each, evens out
+            slices = len(bounds) - 1
+            list(self._pool.map(_lookup_slice, [block.name] * slices, [count] * slices, bounds[:-1], bounds[1:]))
+            zone_ids = shared_zones.reshape(lats.shape).copy()
+            if self.stats is not None:  # Counted here, the workers keep no stats
+                self.stats.count_zones(zone_ids, self.sea_zones)
+            del shared_lats, shared_lons, shared_zones  # No views left when the block goes
+        finally:
+            block.close()
+            block.unlink()
+        return zone_ids
+
+    def track(self, lats, lons):
+        """Zones along an ordered track, as runs of consecutive fixes in the same zone. The fixes go through
+        one vectorised lookup, a gather apiece, cheaper than anything that might tell which to skip; only
+        where the zone changes from one fix to the next is the segment between them bisected on the
+        raster, all such segments together, down to the pixel where it enters the next run's zone. Past
+        the lookup, the work goes with the crossings, not the fixes. A segment whose ends are in the same
+        zone is taken to stay in it. One passing other zones on the way is placed where it came into the
+        later fix's zone, whichever such place the bisection comes to, should there be more than one.
+        Arguments:
+            lats (array of floats), lons (array of floats), fixes in track order
+        Returns:
+            runs (list of ZoneRun), start and end index of the fixes (end inclusive), zone index, timezone
+                and lat, lon where the track entered the zone, the first fix or the crossing found
+        """
+        lats = np.ravel(np.asarray(lats, dtype=np.float64))
+        lons = np.ravel(np.asarray(lons, dtype=np.float64))
+        if not len(lats):
+            return []
+        __pixel_columns, __pixel_rows, zone_ids = self.get_pixels(lats, lons)
+        changes = np.flatnonzero(zone_ids[1:] != zone_ids[:-1])  # Last fix before each crossing
+        crossing_lats, crossing_lons = self._crossings(lats[changes + 1], lons[changes + 1], lats[changes],
+                                                       lons[changes], zone_ids[changes + 1])  # Bisected backwards
+        starts = np.append(0, changes + 1)
+        ends = np.append(changes, len(lats) - 1)
+        entered_lats = np.append(lats[0], crossing_lats)
+        entered_lons = np.append(lons[0], crossing_lons)
+        return [ZoneRun(int(start), int(end), int(zone_ids[start]), self.zone_names[zone_ids[start]], float(lat),
+                        float(lon)) for start, end, lat, lon in zip(starts, ends, entered_lats, entered_lons)]
+
+    def _crossings(self, start_lats, start_lons, end_lats, end_lons, zone_ids):
+        """Where each segment is last in the zone it starts in, bisected down to less than a pixel. Run
+        from the later fix back to the earlier, that's where the track entered the later fix's zone.
+        """
+        delta_lats = end_lats - start_lats
+        delta_lons = np.mod(end_lons - start_lons + 180, 360) - 180  # The short way, over the antimeridian if need be
+        if not len(zone_ids):
+            return start_lats, start_lons
+        pixels = np.hypot(delta_lats * (self.max_rows / 180), delta_lons * (self.max_columns / 360)).max()
+        inside, outside = np.zeros(len(zone_ids)), np.ones(len(zone_ids))  # Fractions of the way along
+        for __ in range(int(np.ceil(np.log2(max(pixels, 1)))) + 1):  # Halved until under half a pixel
+            middle = (inside + outside) / 2
+            __pixel_columns, __pixel_rows, middle_zones = self.get_pixels(start_lats + middle * delta_lats,
+                                                                          start_lons + middle * delta_lons)
+            still = middle_zones == zone_ids
+            inside = np.where(still, middle, inside)
+            outside = np.where(still, outside, middle)
+        return start_lats + inside * delta_lats, np.mod(start_lons + inside * delta_lons + 180, 360) - 180
+
+    def close(self):
+        """Shuts down the worker processes, if there are any. They start again if needed"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def zones_in_box(self, south, west, north, east):
+        """Timezones with any part inside a lat/lon box, answered from the run-length index
+        Arguments:
+            south (float), north (float), Latitude bounds of the box
+            west (float), east (float), Longitude bounds, west greater than east crosses the antimeridian
+        Returns:
+            tz (list of str), 'proper named' timezones, in zone index order
+        """
+        if self.zone_names is None:
+            self.load()
+        index = self.zone_index
+        first_row, last_row = (min(max(int((90 - lat) * (self.max_rows / 180)), 0), self.max_rows - 1)
+                               for lat in (north, south))
+        first_column, last_column = (min(max(int((lon + 180) * (self.max_columns / 360)), 0), self.max_columns - 1)
+                                     for lon in (west, east))
+        if first_column <= last_column:
+            zone_ids = index.zones_in_window(first_row, last_row, first_column, last_column)
+        else:  # Over the antimeridian, as two windows
+            zone_ids = np.union1d(index.zones_in_window(first_row, last_row, first_column, self.max_columns - 1),
+                                  index.zones_in_window(first_row, last_row, 0, last_column))
+        return [self.zone_names[zone_id] for zone_id in zone_ids]
+
+    def extent(self, tz):
+        """Where a timezone is, from the reverse index, for a plain longitude/latitude raster
+        Arguments:
+            tz (str), 'proper named' timezone
+        Returns:
+            extent (dict), None if the zone has no pixels on this map:
+                south, west, north, east (floats), its box, west greater than east across the antimeridian
+                pixels (int), area_km2 (float), its size
+                lat, lon (floats), a point inside it, near its centroid
+        """
+        if self.zone_names is None:
+            self.load()
+        if tz not in self.zone_names:
+            raise KeyError('{} is not a timezone on this map'.format(tz))
+        zone_id = self.zone_names.index(tz)
+        extents = self.zone_extents
+        if not extents.pixels[zone_id]:
+            return None
+        first_row, last_row, west_column, east_column = (int(bound) for bound in extents.bounds[zone_id])
+        interior_row, interior_column = (int(position) for position in extents.interior[zone_id])
+        row_degrees, column_degrees = 180 / self.max_rows, 360 / self.max_columns
+        return {'south': 90 - (last_row + 1) * row_degrees, 'west': west_column * column_degrees - 180,
+                'north': 90 - first_row * row_degrees, 'east': (east_column + 1) * column_degrees - 180,
+                'pixels': int(extents.pixels[zone_id]), 'area_km2': float(extents.area[zone_id]),
+                'lat': 90 - (interior_row + .5) * row_degrees, 'lon': (interior_column + .5) * column_degrees - 180}
+
+
+def _shared_arrays(block, count):
+    """Lats, lons and zone indices laid end to end in a shared memory block"""
+    return (np.ndarray(count, dtype=np.float64, buffer=block.buf),
+            np.ndarray(count, dtype=np.float64, buffer=block.buf, offset=count * 8),
+            np.ndarray(count, dtype=np.uint16, buffer=block.buf, offset=count * 16))
+
+
+_worker_timezones = None  # The map in a worker process
+
+
+def _start_worker(options):
+    """Worker process start up, the same map as the TimezoneLookup that started it"""
+    global _worker_timezones
+    _worker_timezones = TimezoneLookup(**options)
+
+
+def _lookup_slice(block_name, count, start, stop):
+    """Worker process, looks up a slice of the shared block's points into its zone indices"""
+    from multiprocessing import shared_memory
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        lats, lons, zone_ids = _shared_arrays(block, count)
+        zone_ids[start:stop] = _worker_timezones.get_pixels(lats[start:stop], lons[start:stop])[2]
+        del lats, lons, zone_ids
+    finally:
+        block.close()
+    return stop - start
+
+
+timezones = TimezoneLookup()  # The default map behind the module level functions, free until first used
+get_zone = timezones.get_zone
+get_pixel = timezones.get_pixel
+lookup = timezones.lookup
+where_go = timezones.where_go
+get_pixels = timezones.get_pixels
+lookup_many = timezones.lookup_many
+zones_in_box = timezones.zones_in_box
+extent = timezones.extent
+track = timezones.track
+border_distance = timezones.border_distance
+lookup_confidence = timezones.lookup_confidence
+
+
+def __getattr__(name):
+    """'seadic' and 'bigdic', moved to tzcolors, imported from there only if asked for"""
+    if name in ('seadic', 'bigdic'):
+        return getattr(sibling('tzcolors'), name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def main():
+    """Command line, the timezone of a live gps fix, or 'tag' to tag track files"""
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest='command')
+    tztag = sibling('tztag')
+    tag_parser = commands.add_parser('tag', help=tztag.__doc__)
+    tztag.add_arguments(tag_parser)
+    args = parser.parse_args()
+
+    if args.command == 'tag':
+        tztag.run(args, tag_parser)
+        return
     lat, lon = get_latlon()
     pixel_column, pixel_row, __rgb_values, timezone = lookup(lat, lon)
     print('Lat:', lat, ' Lon:', lon)
     print('Timezone:', timezone, 'px:', pixel_column, 'py:', pixel_row)
+
+
+if __name__ == '__main__':
+    main()
 #
 # End
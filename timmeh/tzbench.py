@@ -0,0 +1,350 @@
+#! /usr/bin/env python3
+# coding=utf-8
+"""Measures timmeh lookups, latency, throughput, start up, memory and accuracy, and prints the results as JSON"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+if __package__:  # 'from timmeh import tzbench', timmeh a package
+    from . import timmeh
+else:  # Run or imported from beside timmeh.py
+    import timmeh
+
+__author__ = 'Moe'
+__copyright__ = 'Copyright 2016  Moe'
+__license__ = 'MIT'
+__version__ = '0.0.5'
+
+SEED = 2016  # Same points every run, results comparable between runs
+POINT_SETS = ('land', 'coast', 'ocean')
+CALLS = ('lookup', 'get_pixel', 'where_go')
+WHERE_GO = (45.0, timmeh.DISTANCE)  # Azimuth and metres for the 'where_go' timings
+JOIN_CHUNK = 10000000  # Points per batch in the spatial join timings, 10**8 at once won't fit in memory
+
+
+def sample_points(count, seed=SEED):
+    """Points spread evenly over the globe's area, fixed by the seed
+    Arguments:
+        count (int), how many
+        seed (int), random seed
+    Returns:
+        lats (array of floats), Latitudes
+        lons (array of floats), Longitudes
+    """
+    generator = np.random.default_rng(seed)
+    lats = np.degrees(np.arcsin(generator.uniform(-1, 1, count)))  # Even by area, not by degree
+    lons = generator.uniform(-180, 180, count)
+    return lats, lons
+
+
+def point_sets(count, timezones=None, seed=SEED):
+    """Fixed land, coast and ocean points. Coast is a pixel with land and sea among itself and its
+    8 neighbors; land and ocean are whatever else falls on land or sea zones.
+    Arguments:
+        count (int), points in each set
+        timezones (timmeh.TimezoneLookup), map telling land from sea, defaults to timmeh.timezones
+        seed (int), random seed
+    Returns:
+        sets (dict), set name: (lats, lons)
+    """
+    tzbuild = timmeh.sibling('tzbuild')
+    timezones = timezones or timmeh.timezones
+    if timezones.zone_names is None:
+        timezones.load()
+    land = np.asarray(timezones.zone_raster) > timezones.sea_zones
+    coast = tzbuild.border_pixels(land)  # Land beside sea and sea beside land
+    found = {name: ([], []) for name in POINT_SETS}
+    draw = 0
+    while min(sum(len(lats) for lats in found[name][0]) for name in POINT_SETS) < count:
+        lats, lons = sample_points(1000000, seed + draw)  # Coast is the scarce one, a percent or so
+        pixel_columns, pixel_rows = timezones.pixels_of(lats, lons)
+        on_coast = coast[pixel_rows, pixel_columns]
+        on_land = land[pixel_rows, pixel_columns]
+        for name, wanted in (('land', on_land & ~on_coast), ('coast', on_coast), ('ocean', ~on_land & ~on_coast)):
+            found[name][0].append(lats[wanted])
+            found[name][1].append(lons[wanted])
+        draw += 1
+    return {name: (np.concatenate(found[name][0])[:count], np.concatenate(found[name][1])[:count])
+            for name in POINT_SETS}
+
+
+def fresh_python(code):
+    """Runs 'code' in a fresh Python beside timmeh.py
+    Returns:
+        printed (list of floats), what 'code' printed, then the peak resident memory in MB
+    """
+    script = 'import resource, sys\n{}\nprint(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)'.format(code)
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=timmeh.DATA_DIR).split()
+    return [float(value) for value in output[:-1]] + [int(output[-1]) / 1024]  # Linux reports kB
+
+
+def peak_rss(code):
+    """Peak resident memory, in MB, of a fresh Python running 'code' beside timmeh.py"""
+    return fresh_python(code)[-1]
+
+
+def measure_startup(call):
+    """Import time, first call time and peak memory of a fresh Python making one module level call
+    Arguments:
+        call (str), 'lookup', 'get_pixel' or 'where_go'
+    Returns:
+        results (dict), for the JSON
+    """
+    arguments = ', '.join(repr(value) for value in (48.5, 7.7) + (WHERE_GO if call == 'where_go' else ()))
+    import_seconds, call_seconds, rss = fresh_python(
+        'import time\nstarted = time.perf_counter()\nimport timmeh\nimported = time.perf_counter()\n'
+        'timmeh.{}({})\nprint(imported - started, time.perf_counter() - imported)'.format(call, arguments))
+    return {'import_ms': import_seconds * 1e3, 'first_call_ms': call_seconds * 1e3, 'peak_rss_mb': rss}
+
+
+def measure_calls(timezones, lats, lons, single=10000):
+    """Latency one point at a time, and throughput of the vectorised equivalent, for each call
+    Arguments:
+        timezones (timmeh.TimezoneLookup), map to look up on, loaded
+        lats (array of floats), lons (array of floats), sample points
+        single (int), points timed one at a time
+    Returns:
+        results (dict), call name: {'latency_us', 'batch_points_per_s'}
+    """
+    azimuths, distances = (np.full(len(lats), value) for value in WHERE_GO)
+    batches = {'lookup': lambda: timezones.lookup_many(lats, lons),
+               'get_pixel': lambda: timezones.get_pixels(lats, lons),
+               'where_go': lambda: timezones.where_go(lats, lons, azimuths, distances)}  # pyproj takes arrays too
+    results = {}
+    for call in CALLS:
+        function = getattr(timezones, call)
+        arguments = WHERE_GO if call == 'where_go' else ()
+        function(lats[0], lons[0], *arguments)  # Anything made on first use, made outside the timing
+
+        started = time.perf_counter()
+        for lat, lon in zip(lats[:single], lons[:single]):
+            function(lat, lon, *arguments)
+        latency = (time.perf_counter() - started) / min(single, len(lats))
+
+        started = time.perf_counter()
+        batches[call]()
+        results[call] = {'latency_us': latency * 1e6, 'batch_points_per_s': len(lats) / (time.perf_counter() - started)}
+    return results
+
+
+def measure_suite(count=100000, scale=1, runs=False, borders=False):
+    """'measure_calls' on each point set, and 'measure_startup' of each call
+    Arguments:
+        count (int), points in each set
+        scale (float), pyramid level
+        runs (bool), on the ZoneIndex rather than the raster
+        borders (bool), polygon exact on border pixels
+    Returns:
+        results (dict), for the JSON
+    """
+    timezones = timmeh.TimezoneLookup(scale=scale, runs=runs, borders=borders)
+    timezones.load()
+    return {'version': timmeh.__version__, 'seed': SEED, 'points': count, 'scale': scale, 'runs': runs,
+            'borders': borders,
+            'startup': {call: measure_startup(call) for call in CALLS},
+            'sets': {name: measure_calls(timezones, lats, lons)
+                     for name, (lats, lons) in point_sets(count, timezones).items()}}
+
+
+def polygon_truth(timezones, lats, lons, shapefile_path=timmeh.shapefile_file):
+    """Zone index of each point by the timezone polygons alone, land ahead of sea, -1 where no polygon
+    holds it. Every point goes through the BorderIndex ray cast, not just those on border pixels.
+    Arguments:
+        timezones (timmeh.TimezoneLookup), zone table the answers index, loaded
+        lats (array of floats), lons (array of floats), points
+        shapefile_path (str), timezone polygons
+    Returns:
+        zone_ids (array of ints), index into 'zone_names', or -1
+    """
+    tzbuild = timmeh.sibling('tzbuild')
+    polygons = timmeh.BorderIndex(None, *tzbuild.polygon_edges(tzbuild.read_polygons(shapefile_path),
+                                                               timezones.zone_names, timezones.max_rows))
+    every_zone = np.arange(len(timezones.zone_names))
+    zone_ids = np.full(len(lats), -1)
+    for point, (lat, lon) in enumerate(zip(lats, lons)):
+        inside = polygons.zones_containing(lat, lon, every_zone)
+        if len(inside):
+            zone_ids[point] = inside[-1]  # Land zone indices follow the sea's
+    return zone_ids
+
+
+def measure_accuracy(count=10000, scale=1, runs=False, borders=False, shapefile_path=timmeh.shapefile_file,
+                     raster_path=None):
+    """Raster answers held against the polygons, on each point set
+    Arguments:
+        count (int), points in each set
+        scale (float), pyramid level
+        runs (bool), on the ZoneIndex rather than the raster
+        borders (bool), polygon exact on border pixels
+        shapefile_path (str), timezone polygons
+        raster_path (str), zone raster, the shipped map's by default
+    Returns:
+        results (dict), for the JSON, per set the fractions of points:
+            agree, answered as the polygons have it, of those in any polygon
+            land_agree, of those the polygons put on land
+            sea_as_land, in sea polygons but answered with a land zone, mostly the territorial waters
+            no_polygon, in no polygon at all
+            sentinel, answered with zone 0, the colour that matched nothing
+    """
+    timezones = timmeh.TimezoneLookup(raster_path=raster_path, scale=scale, runs=runs, borders=borders,
+                                      shapefile_path=shapefile_path)
+    timezones.load()
+    results = {'version': timmeh.__version__, 'seed': SEED, 'points': count, 'scale': scale, 'runs': runs,
+               'borders': borders, 'sets': {}}
+    for name, (lats, lons) in point_sets(count, timezones).items():
+        __pixel_columns, __pixel_rows, zone_ids = timezones.get_pixels(lats, lons)
+        truth = polygon_truth(timezones, lats, lons, shapefile_path)
+        on_land = truth > timezones.sea_zones
+        in_sea = (truth > 0) & ~on_land
+        in_polygon = truth >= 0
+        results['sets'][name] = {
+            'agree': float((zone_ids == truth)[in_polygon].mean()) if in_polygon.any() else None,
+            'land_agree': float((zone_ids == truth)[on_land].mean()) if on_land.any() else None,
+            'sea_as_land': float((zone_ids > timezones.sea_zones)[in_sea].mean()) if in_sea.any() else None,
+            'no_polygon': float((truth < 0).mean()),
+            'sentinel': float((zone_ids == 0).mean())}
+    return results
+
+
+def measure_level(scale, lats, lons, reference, single=10000, runs=False):
+    """Latency, throughput, memory and agreement with the reference answers of one pyramid level
+    Arguments:
+        scale (float), pyramid level
+        lats (array of floats), lons (array of floats), sample points
+        reference (array of str), timezones the level is held against, the finest level's by default
+        single (int), points timed one at a time through 'lookup'
+        runs (bool), on the ZoneIndex rather than the raster
+    Returns:
+        results (dict), for the JSON
+    """
+    timezones = timmeh.TimezoneLookup(scale=scale, runs=runs)
+    timezones.load()  # Built, if need be, outside the timing
+
+    started = time.perf_counter()
+    for lat, lon in zip(lats[:single], lons[:single]):
+        timezones.lookup(lat, lon)
+    single_seconds = (time.perf_counter() - started) / min(single, len(lats))
+
+    started = time.perf_counter()
+    __zone_ids, answers = timezones.lookup_many(lats, lons)
+    batch_seconds = time.perf_counter() - started
+
+    zones = timezones.zone_index if runs else np.asarray(timezones.zone_raster)
+    differ = answers != reference
+    return {'scale': scale,
+            'columns': timezones.max_columns,
+            'rows': timezones.max_rows,
+            'runs': runs,
+            'lookup_us': single_seconds * 1e6,
+            'lookup_many_points_per_s': len(lats) / batch_seconds,
+            'zones_mb': zones.nbytes / 1e6,
+            'peak_rss_mb': peak_rss('import timmeh\ntimezones = timmeh.TimezoneLookup(scale={!r}, runs={!r})\n'
+                                    'timezones.lookup_many(*__import__("tzbench").sample_points({}))'
+                                    .format(scale, runs, len(lats))),
+            'border_error': float(differ.mean())}  # Levels only ever disagree near borders
+
+
+def measure_levels(scales, count=1000000, runs=False):
+    """'measure_level' for each level, all held against the finest of them
+    Arguments:
+        scales (list of floats), pyramid levels
+        count (int), sample points
+        runs (bool), on the ZoneIndex rather than the raster
+    Returns:
+        results (list of dicts), one per level, finest first
+    """
+    lats, lons = sample_points(count)
+    scales = sorted(scales, reverse=True)
+    __zone_ids, reference = timmeh.TimezoneLookup(scale=scales[0]).lookup_many(lats, lons)
+    return [measure_level(scale, lats, lons, reference, runs=runs) for scale in scales]
+
+
+def measure_join(counts, scale=1, runs=False, chunk=JOIN_CHUNK):
+    """Throughput of scattered points three ways: gathered straight from the raster by row and column, as
+    'get_pixel' indexes it, through lookup_many, and through lookup_many as a spatial join
+    Arguments:
+        counts (list of ints), points in each timing, e.g. 10**6, 10**7, 10**8
+        scale (float), pyramid level
+        runs (bool), on the ZoneIndex rather than the raster, the straight gather then left out
+        chunk (int), points per batch, each batch drawn afresh
+    Returns:
+        results (list of dicts), one per count
+    """
+    timezones = timmeh.TimezoneLookup(scale=scale, runs=runs)
+    timezones.load()
+    zone_raster = None if runs else np.asarray(timezones.zone_raster)  # Paged in outside the timing
+    results = []
+    for count in counts:
+        seconds = {'gather': 0.0, 'lookup_many': 0.0, 'join': 0.0}
+        agree = True
+        for batch, start in enumerate(range(0, count, chunk)):
+            lats, lons = sample_points(min(chunk, count - start), SEED + batch)
+            if zone_raster is not None:
+                started = time.perf_counter()
+                pixel_columns, pixel_rows = timezones.pixels_of(lats, lons)
+                gathered = zone_raster[pixel_rows, pixel_columns]
+                seconds['gather'] += time.perf_counter() - started
+            started = time.perf_counter()
+            zone_ids, __tz = timezones.lookup_many(lats, lons)
+            seconds['lookup_many'] += time.perf_counter() - started
+            started = time.perf_counter()
+            joined, __tz = timezones.lookup_many(lats, lons, join=True)
+            seconds['join'] += time.perf_counter() - started
+            agree &= bool(np.array_equal(zone_ids, joined) and (zone_raster is None or
+                                                                 np.array_equal(zone_ids, gathered)))
+            del lats, lons, zone_ids, joined, __tz
+        result = {'points': count, 'scale': scale, 'runs': runs, 'agree': agree}
+        result.update({'{}_points_per_s'.format(way): count / spent for way, spent in seconds.items() if spent})
+        result['join_speedup'] = seconds['lookup_many'] / seconds['join']
+        results.append(result)
+    return results
+
+
+def main():
+    """Command line, measures and prints JSON"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest='command')
+    levels = commands.add_parser('levels', help='latency, memory and border error of pyramid levels')
+    levels.add_argument('--scales', type=float, nargs='+', default=[0.25, 0.5, 1, 2])
+    levels.add_argument('--points', type=int, default=1000000)
+    levels.add_argument('--runs', action='store_true', help='on the run-length index rather than the raster')
+    suite = commands.add_parser('suite', help='latency, throughput, start up and memory of each call, by point set')
+    suite.add_argument('--points', type=int, default=100000, help='in each of the land, coast and ocean sets')
+    accuracy = commands.add_parser('accuracy', help='agreement with the timezone polygons, by point set')
+    accuracy.add_argument('--points', type=int, default=10000, help='in each of the land, coast and ocean sets')
+    accuracy.add_argument('--shapefile', default=timmeh.shapefile_file, help='timezone polygons')
+    join = commands.add_parser('join', help='throughput of scattered points, gathered directly or joined by tile')
+    join.add_argument('--points', type=int, nargs='+', default=[10 ** 6, 10 ** 7, 10 ** 8])
+    join.add_argument('--chunk', type=int, default=JOIN_CHUNK, help='points per batch')
+    for command in (join, suite, accuracy):
+        command.add_argument('--scale', type=float, default=1, help='pyramid level')
+        command.add_argument('--runs', action='store_true', help='on the run-length index rather than the raster')
+        if command is not join:
+            command.add_argument('--borders', action='store_true', help='polygon exact on border pixels')
+    args = parser.parse_args()
+
+    if args.command == 'levels':
+        results = measure_levels(args.scales, args.points, args.runs)
+    elif args.command == 'join':
+        results = measure_join(args.points, args.scale, args.runs, args.chunk)
+    elif args.command == 'suite':
+        results = measure_suite(args.points, args.scale, args.runs, args.borders)
+    elif args.command == 'accuracy':
+        try:
+            results = measure_accuracy(args.points, args.scale, args.runs, args.borders, args.shapefile)
+        except (ImportError, IOError) as error:
+            parser.exit(1, '{}\n'.format(error))
+    else:
+        parser.error('which measurement?')
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
+#
+# End
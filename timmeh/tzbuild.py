@@ -0,0 +1,871 @@
+#! /usr/bin/env python3
+# coding=utf-8
+"""Offline build steps turning the color referenced image into the zone indexed raster timmeh looks up"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from math import pi
+
+import numpy as np
+from PIL import Image
+
+if __package__:  # 'from timmeh import tzbuild', timmeh a package
+    from . import timmeh, tzcolors
+else:  # Run or imported from beside timmeh.py
+    import timmeh
+    import tzcolors
+
+__author__ = 'Moe'
+__copyright__ = 'Copyright 2016  Moe'
+__license__ = 'MIT'
+__version__ = '0.0.5'
+
+LOST_SOUL = ((255, 255, 255), 'none', "Gates'o'Hell/Houston")  # zone index 0, colors in neither dictionary
+EARTH_RADIUS = timmeh.EARTH_RADIUS
+DIFF_BLOCK = 256  # Pixels square, compared and reported on at a time
+
+
+@contextmanager
+def replacing(path, mode='wb'):
+    """File to write 'path' through: a temporary beside it, of this process and thread alone, renamed
+    into place once written whole and removed if not. Builds running at once never write over each
+    other's half written files, and whoever maps 'path' sees the old file or the new, never a part.
+    Arguments:
+        path (str), file being written
+        mode (str), 'wb', or 'w' for utf-8 text
+    Yields:
+        file (file object), the temporary, open for writing
+    """
+    temporary = '{}.{}-{}.tmp'.format(path, os.getpid(), threading.get_ident())
+    try:
+        with open(temporary, mode, encoding=None if 'b' in mode else 'utf-8') as file:
+            yield file
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def zone_table(seadic, bigdic):
+    """Lays the timezone dictionaries out as a zone table, the position in it being the zone index
+    Arguments:
+        seadic (dict), RGB color tuple --> ocean timezone
+        bigdic (dict), RGB color tuple --> land timezone
+    Returns:
+        zones (list of tuples), (rgb_values, kind, tz) per zone index, kind is 'none', 'sea' or 'land'
+    """
+    zones = [LOST_SOUL]
+    zones += [(rgb_values, 'sea', tz) for rgb_values, tz in seadic.items()]
+    zones += [(rgb_values, 'land', tz) for rgb_values, tz in bigdic.items()]
+    return zones
+
+
+def image_to_zones(image_path, zones, color_spread=35):
+    """Resolves every pixel of the color referenced image to a zone index. Edge colors are
+    slapped back onto the 35 point color grid here, once, rather than on every lookup.
+    Arguments:
+        image_path (str), color referenced timezone image
+        zones (list of tuples), zone table from 'zone_table'
+        color_spread (int), spacing of the colors in the timezone dictionaries
+    Returns:
+        zone_raster (2D uint16 array), zone index per pixel, rows x columns
+    """
+    levels = 256 // color_spread + 1  # 0, 35 ... 245 --> 0 .. 7
+    color_index = np.zeros(levels ** 3, dtype=np.uint16)  # snapped color --> zone index, 0 if unknown
+    for zone_id, (rgb_values, __kind, __tz) in enumerate(zones[1:], start=1):
+        red, green, blue = (value // color_spread for value in rgb_values)
+        color_index[(red * levels + green) * levels + blue] = zone_id
+
+    rgb_array = np.asarray(Image.open(image_path).convert('RGB'))
+    zone_raster = np.empty(rgb_array.shape[:2], dtype=np.uint16)
+    for row in range(0, rgb_array.shape[0], 256):  # Banded, to keep the snapping arithmetic small.
+        band = (rgb_array[row:row + 256].astype(np.uint16) + color_spread // 2) // color_spread  # == round()
+        zone_raster[row:row + 256] = color_index[(band[..., 0] * levels + band[..., 1]) * levels + band[..., 2]]
+    return zone_raster
+
+
+def nearest(target, max_distance):
+    """Distance from every pixel to the nearest 'target' pixel, as far as max_distance. Each row within
+    reach is scanned for its horizontally nearest target pixel (wrapping round at +-180 degrees), which
+    for a fixed row offset is also the nearest in meters, so a handful of whole array passes does it.
+    Arguments:
+        target (2D bool array), pixels to measure to, rows x columns of an equirectangular raster
+        max_distance (float), meters, how far to look
+    Returns:
+        distance (2D float32 array), meters to the nearest target pixel, inf if further than max_distance
+        nearest_row (2D int32 array), row of that target pixel
+        nearest_column (2D int32 array), column of that target pixel
+    """
+    rows, columns = target.shape
+    row_meters = pi * EARTH_RADIUS / rows
+    latitudes = 90 - (np.arange(rows) + .5) * (180 / rows)  # pixel centers
+    column_meters = (2 * pi * EARTH_RADIUS / columns) * np.cos(np.radians(latitudes)).astype(np.float32)
+
+    column_index = np.arange(columns, dtype=np.int32)
+    left = np.maximum.accumulate(np.where(target, column_index, -1), axis=1)  # nearest target at or left of
+    left = np.where(left < 0, left[:, -1:] - columns, left)  # Wrapped round from the right hand end
+    right = np.minimum.accumulate(np.where(target, column_index, 2 * columns)[:, ::-1], axis=1)[:, ::-1]
+    right = np.where(right >= 2 * columns, right[:, :1] + columns, right)  # and from the left hand end
+    steps = np.minimum(column_index - left, right - column_index)  # More than 'columns' if the row has none
+    across = np.where(column_index - left <= right - column_index, left, right) % columns
+    del left, right
+
+    distance = np.full(target.shape, np.inf, dtype=np.float32)
+    nearest_row = np.zeros(target.shape, dtype=np.int32)
+    nearest_column = np.zeros(target.shape, dtype=np.int32)
+    reach = int(max_distance // row_meters)
+    for offset in range(-reach, reach + 1):
+        here = slice(max(0, -offset), min(rows, rows - offset))  # rows looking,
+        there = slice(max(0, offset), min(rows, rows + offset))  # and the rows they look at
+        meters = np.hypot(np.float32(offset * row_meters), steps[there] * column_meters[here, None])
+        meters[(steps[there] > columns) | (meters > max_distance)] = np.inf
+        closer = meters < distance[here]
+        distance[here][closer] = meters[closer]
+        nearest_row[here][closer] = offset  # Offsets for now, rows at the end
+        nearest_column[here][closer] = across[there][closer]
+    nearest_row += np.arange(rows, dtype=np.int32)[:, None]
+    return distance, nearest_row, nearest_column
+
+
+def write_distances(distance_path, zone_raster, max_distance=timmeh.FIELD_DISTANCE, unit=timmeh.FIELD_UNIT):
+    """Writes the distance field of a zone raster (.distance.npy, uint16, memory mappable): how far
+    from each pixel the nearest pixel of another zone might be. That's the distance to the nearest
+    border pixel, less a pixel's diagonal for wherever in the pixels the point and the border are.
+    Arguments:
+        distance_path (str), destination of the distance field
+        zone_raster (2D uint16 array), zone index per pixel
+        max_distance (float), meters, how far to look, the field's largest value
+        unit (float), meters per step of the uint16
+    """
+    rows, columns = zone_raster.shape
+    meters, __nearest_row, __nearest_column = nearest(border_pixels(np.asarray(zone_raster)), max_distance)
+    latitudes = 90 - (np.arange(rows) + .5) * (180 / rows)
+    diagonals = np.hypot(pi * EARTH_RADIUS / rows, (2 * pi * EARTH_RADIUS / columns) * np.cos(np.radians(latitudes)))
+    meters = np.clip(meters - diagonals[:, None].astype(np.float32), 0, max_distance)  # inf, too far to tell,
+    with replacing(distance_path) as field:  # is the most it looked
+        np.save(field, (meters / unit).astype(np.uint16))
+
+
+def territorial_waters(zone_raster, zones, distance):
+    """Bakes the 'at sea' rule into the raster. Ocean pixels within 'distance' of land take the
+    nearest land zone, every bearing considered, so maritime lookups cost the same as land ones.
+    Arguments:
+        zone_raster (2D uint16 array), zone index per pixel
+        zones (list of tuples), zone table from 'zone_table'
+        distance (float), meters, extent of territorial waters
+    Returns:
+        zone_raster (2D uint16 array), zone index per pixel, territorial waters resolved
+    """
+    kinds = np.array([kind for __rgb_values, kind, __tz in zones])
+    on_land = (kinds == 'land')[zone_raster]
+    at_sea = (kinds == 'sea')[zone_raster]
+    meters, nearest_row, nearest_column = nearest(on_land, distance)
+    waters = at_sea & np.isfinite(meters)
+    zone_raster = zone_raster.copy()
+    zone_raster[waters] = zone_raster[nearest_row[waters], nearest_column[waters]]
+    return zone_raster
+
+
+def zone_table_path(raster_path):
+    """Zone table file that accompanies a zone raster file"""
+    return os.path.splitext(raster_path)[0] + '.zones'
+
+
+def write_zones(raster_path, zone_raster, zones):
+    """Writes the zone raster (.npy, uncompressed uint16, memory mappable) and its zone table (.zones, tab separated)
+    Arguments:
+        raster_path (str), destination of the zone raster
+        zone_raster (2D uint16 array), zone index per pixel
+        zones (list of tuples), zone table from 'zone_table'
+    """
+    with replacing(raster_path) as raster:
+        np.save(raster, np.ascontiguousarray(zone_raster, dtype=np.uint16))
+    with replacing(zone_table_path(raster_path), 'w') as table:  # The table last, as its build format vouches
+        table.write('{}{}\n'.format(timmeh.TABLE_HEADER, timmeh.BUILD_FORMAT))  # for the raster
+        for rgb_values, kind, tz in zones:
+            table.write('{}\t{}\t{}\n'.format(','.join(str(value) for value in rgb_values), kind, tz))
+
+
+def build_zone_raster(image_path, raster_path, seadic, bigdic, color_spread=35, distance=12 * 1852.0):
+    """Image and timezone dictionaries in, zone raster and zone table out
+    Arguments:
+        image_path (str), color referenced timezone image
+        raster_path (str), destination of the zone raster
+        seadic (dict), RGB color tuple --> ocean timezone
+        bigdic (dict), RGB color tuple --> land timezone
+        color_spread (int), spacing of the colors in the timezone dictionaries
+        distance (float), meters, extent of territorial waters
+    Returns:
+        zone_raster (2D uint16 array), zone index per pixel
+        zones (list of tuples), (rgb_values, kind, tz) per zone index
+    """
+    zones = zone_table(seadic, bigdic)
+    zone_raster = write_level(raster_path, image_to_zones(image_path, zones, color_spread), zones, distance)
+    return zone_raster, zones
+
+
+def resample(zone_raster, scale):
+    """Zone raster at 'scale' times the resolution, each new pixel taking the zone at its center
+    Arguments:
+        zone_raster (2D uint16 array), zone index per pixel
+        scale (float), 0.25 for a quarter of the rows and columns, 2 for twice as many
+    Returns:
+        zone_raster (2D uint16 array), zone index per pixel, resampled
+    """
+    rows, columns = zone_raster.shape
+    new_rows, new_columns = max(1, int(round(rows * scale))), max(1, int(round(columns * scale)))
+    row_index = ((np.arange(new_rows) + .5) * (rows / new_rows)).astype(np.intp)
+    column_index = ((np.arange(new_columns) + .5) * (columns / new_columns)).astype(np.intp)
+    return np.asarray(zone_raster)[row_index[:, None], column_index]
+
+
+def write_level(raster_path, zone_raster, zones, distance):
+    """Territorial waters, then the zone raster, zone table, run-length index and reverse index of one map
+    Arguments:
+        raster_path (str), destination of the zone raster
+        zone_raster (2D uint16 array), zone index per pixel, straight from the image
+        zones (list of tuples), zone table from 'zone_table'
+        distance (float), meters, extent of territorial waters
+    Returns:
+        zone_raster (2D uint16 array), zone index per pixel, as written
+    """
+    zone_raster = territorial_waters(zone_raster, zones, distance)  # Worked out at each resolution
+    write_zones(raster_path, zone_raster, zones)
+    write_runs(os.path.splitext(raster_path)[0] + '.runs.npz', zone_raster)
+    write_extents(os.path.splitext(raster_path)[0] + '.extents.npz', zone_raster, len(zones))
+    for stale in ('.border.npz', '.distance.npy', '.tzdb'):  # Remade from the polygons, and the raster, when
+        if os.path.exists(os.path.splitext(raster_path)[0] + stale):  # next asked for
+            os.remove(os.path.splitext(raster_path)[0] + stale)
+    return zone_raster
+
+
+def build_pyramid(image_path, raster_path, seadic, bigdic, scales, color_spread=35, distance=12 * 1852.0):
+    """Zone rasters at several resolutions from the one image, a pyramid of maps to choose from. Below
+    scale 1 they save memory; above it they only sharpen borders if the image was drawn finer than
+    the raster it is resampled to, otherwise it's border accuracy that 'rasterize'd polygons give.
+    Arguments:
+        image_path (str), color referenced timezone image
+        raster_path (str), zone raster at scale 1, levels are named after it by timmeh.level_path
+        seadic (dict), RGB color tuple --> ocean timezone
+        bigdic (dict), RGB color tuple --> land timezone
+        scales (list of floats), resolution of each level relative to the image
+        color_spread (int), spacing of the colors in the timezone dictionaries
+        distance (float), meters, extent of territorial waters
+    Returns:
+        level_paths (list of str), zone raster of each level
+    """
+    zones = zone_table(seadic, bigdic)
+    image_zones = image_to_zones(image_path, zones, color_spread)
+    level_paths = []
+    for scale in scales:
+        level_paths.append(timmeh.level_path(raster_path, scale))
+        write_level(level_paths[-1], resample(image_zones, scale) if scale != 1 else image_zones, zones, distance)
+    return level_paths
+
+
+def run_length_index(zone_raster, tile_size=64):
+    """Squeezes a zone raster into the tiles and runs of a timmeh.ZoneIndex
+    Arguments:
+        zone_raster (2D uint16 array), zone index per pixel
+        tile_size (int), pixels along a tile's side
+    Returns:
+        tile_zones (2D uint16 array), zone index of each tile, timmeh.MIXED_TILE if more than one zone
+        run_keys (1D int64 array), row * columns + column of the first pixel of each run, ascending
+        run_zones (1D uint16 array), zone index of each run
+    """
+    return (tile_zones_of(zone_raster, tile_size),) + row_runs(zone_raster)
+
+
+def row_runs(zone_raster):
+    """Runs of one zone along each row, none carrying on into the next row
+    Returns:
+        run_keys (1D int64 array), row * columns + column of the first pixel of each run, ascending
+        run_zones (1D uint16 array), zone index of each run
+    """
+    starts = np.ones(zone_raster.shape, dtype=bool)
+    starts[:, 1:] = zone_raster[:, 1:] != zone_raster[:, :-1]
+    run_keys = np.flatnonzero(starts).astype(np.int64)
+    return run_keys, np.asarray(zone_raster).ravel()[run_keys]
+
+
+def tile_zones_of(zone_raster, tile_size=64):
+    """Zone index of each tile, timmeh.MIXED_TILE where a tile has more than one zone"""
+    rows, columns = zone_raster.shape
+    tile_rows, tile_columns = -(-rows // tile_size), -(-columns // tile_size)
+    padded = np.pad(zone_raster, ((0, tile_rows * tile_size - rows), (0, tile_columns * tile_size - columns)),
+                    mode='edge')  # Repeating the edge adds no zone a tile doesn't already have
+    tiles = padded.reshape(tile_rows, tile_size, tile_columns, tile_size)
+    lowest, highest = tiles.min(axis=(1, 3)), tiles.max(axis=(1, 3))
+    return np.where(lowest == highest, lowest, timmeh.MIXED_TILE).astype(np.uint16)
+
+
+def write_runs(index_path, zone_raster, tile_size=64):
+    """Writes the run-length index of a zone raster (.runs.npz) for timmeh.ZoneIndex.load"""
+    tile_zones, run_keys, run_zones = run_length_index(zone_raster, tile_size)
+    with replacing(index_path) as index:
+        np.savez(index, shape=np.array(zone_raster.shape), tile_size=tile_size, tile_zones=tile_zones,
+                 run_keys=run_keys, run_zones=run_zones)
+
+
+def tiled_raster(raster, tile_size, level, directory_offset):
+    """A uint16 raster as timmeh.TiledRaster reads it, directory then tiles, tiles of one value taking no room
+    Arguments:
+        raster (2D uint16 array), zone indices, distances or the like, none of them MIXED_TILE
+        tile_size (int), pixels along a tile's side
+        level (int), zlib compression level
+        directory_offset (int), where in the database it's going
+    Returns:
+        packed (bytes), directory and tiles
+    """
+    columns = raster.shape[1]
+    tile_values = tile_zones_of(raster, tile_size).ravel()
+    tile_columns = -(-columns // tile_size)
+    tiles, tile_lengths = [], np.zeros(len(tile_values), dtype=np.uint64)
+    for number in np.flatnonzero(tile_values == timmeh.MIXED_TILE):
+        top, left = (number // tile_columns) * tile_size, (number % tile_columns) * tile_size
+        tiles.append(zlib.compress(np.ascontiguousarray(raster[top:top + tile_size, left:left + tile_size],
+                                                        dtype='<u2').tobytes(), level))
+        tile_lengths[number] = len(tiles[-1])
+    tile_offsets = directory_offset + len(tile_values) * 10 + 8 + np.concatenate(([0], np.cumsum(tile_lengths)))
+    return b''.join([tile_values.astype('<u2').tobytes(), tile_offsets.astype('<u8').tobytes()] + tiles)
+
+
+def write_database(database_path, raster_path, tile_size=64, level=9, distances=True):
+    """Packs a zone raster, its zone table, reverse index and distance field, and its border index if it
+    has one, into the one zone database file (.tzdb) of timmeh.ZoneDatabase, tile by tile. A reverse
+    index or distance field not yet beside the raster is worked out first.
+    Arguments:
+        database_path (str), destination of the zone database
+        raster_path (str), zone raster, its .zones, .extents.npz, .distance.npy and .border.npz beside it
+        tile_size (int), pixels along a tile's side
+        level (int), zlib compression level
+        distances (bool), pack the distance field, the most of the file by far, 8 MB of the full map's 9
+    """
+    zone_raster = np.load(raster_path, mmap_mode='r')
+    rows, columns = zone_raster.shape
+    build_format, zone_lines = timmeh.read_zone_table(zone_table_path(raster_path))
+    sea_zones = sum(line.split('\t')[1] == 'sea' for line in zone_lines)
+    table = zlib.compress('\n'.join(zone_lines).encode('utf-8'), level)
+    border_path = os.path.splitext(raster_path)[0] + '.border.npz'
+    border = b''
+    if os.path.exists(border_path):
+        with open(border_path, 'rb') as border_file:
+            border = border_file.read()
+    extents_path = os.path.splitext(raster_path)[0] + '.extents.npz'
+    if not os.path.exists(extents_path):
+        write_extents(extents_path, zone_raster, len(zone_lines))
+    with np.load(extents_path) as extents_file, io.BytesIO() as packed:
+        np.savez_compressed(packed, **extents_file)
+        extents = packed.getvalue()
+    distance_path = os.path.splitext(raster_path)[0] + '.distance.npy'
+    if distances and not os.path.exists(distance_path):
+        write_distances(distance_path, zone_raster)
+
+    directory_offset = timmeh.DATABASE_HEADER.size + len(table)
+    zones = tiled_raster(zone_raster, tile_size, level, directory_offset)
+    border_offset = directory_offset + len(zones)
+    extents_offset = border_offset + len(border)
+    distance_offset = extents_offset + len(extents)
+    distances = tiled_raster(np.load(distance_path, mmap_mode='r'), tile_size, level, distance_offset) \
+        if distances else b''
+
+    header = timmeh.DATABASE_HEADER.pack(timmeh.DATABASE_MAGIC, timmeh.DATABASE_VERSION, build_format, tile_size,
+                                         rows, columns, len(zone_lines), sea_zones, timmeh.DATABASE_HEADER.size,
+                                         len(table), directory_offset, border_offset if border else 0, len(border),
+                                         extents_offset, len(extents), distance_offset if distances else 0)
+    with replacing(database_path) as database:
+        for section in (header, table, zones, border, extents, distances):
+            database.write(section)
+
+
+def row_areas(rows, columns):
+    """km2 of a pixel in each row of a plain longitude/latitude raster, rows nearer the poles counting for less"""
+    edges = np.radians(90 - np.arange(rows + 1) * (180 / rows))  # Latitudes between the rows
+    return EARTH_RADIUS ** 2 * (2 * pi / columns) * (np.sin(edges[:-1]) - np.sin(edges[1:])) / 1e6
+
+
+def zone_extents(zone_raster, zone_count):
+    """Works out the reverse index of a zone raster, where each zone is rather than which zone is where
+    Arguments:
+        zone_raster (2D uint16 array), zone index per pixel
+        zone_count (int), zones in the zone table, those without a pixel included
+    Returns:
+        bounds (2D int32 array), first row, last row, west column, east column of each zone, west
+            greater than east where it crosses the antimeridian, -1s for a zone without pixels
+        pixels (1D int64 array), pixels of each zone
+        area (1D float64 array), km2 of each zone, rows nearer the poles counting for less
+        interior (2D int32 array), row, column of the zone's pixel nearest its centroid, -1s if none
+        run_keys (1D int64 array), row * columns + column of the first pixel of each run, zone by zone
+        run_lengths (1D int32 array), pixels of each run
+        zone_starts (1D int64 array), first run of each zone, and one past the last
+    """
+    rows, columns = zone_raster.shape
+    run_keys, run_zones = row_runs(zone_raster)
+    run_lengths = np.diff(np.append(run_keys, rows * columns))
+    order = np.argsort(run_zones, kind='stable')  # Zone by zone, each zone's runs still in raster order
+    run_keys, run_zones, run_lengths = run_keys[order], run_zones[order], run_lengths[order]
+    zone_starts = np.searchsorted(run_zones, np.arange(zone_count + 1))
+    run_rows, run_columns = np.divmod(run_keys, columns)
+
+    row_area = row_areas(rows, columns)
+    pixels = np.bincount(run_zones, weights=run_lengths, minlength=zone_count).astype(np.int64)
+    area = np.bincount(run_zones, weights=run_lengths * row_area[run_rows], minlength=zone_count)
+
+    bounds = np.full((zone_count, 4), -1, dtype=np.int32)
+    interior = np.full((zone_count, 2), -1, dtype=np.int32)
+    for zone_id in np.flatnonzero(pixels):
+        runs = slice(zone_starts[zone_id], zone_starts[zone_id + 1])
+        zone_rows, firsts, lengths = run_rows[runs], run_columns[runs], run_lengths[runs]
+        covered = np.zeros(columns + 1, dtype=np.int64)  # Columns the zone has a pixel in,
+        np.add.at(covered, firsts, 1)
+        np.add.at(covered, firsts + lengths, -1)
+        occupied = np.flatnonzero(np.cumsum(covered[:-1]))
+        gaps = np.diff(np.append(occupied, occupied[0] + columns))  # and the widest gap between them, going
+        widest = np.argmax(gaps)  # round, is where its box isn't
+        west, east = occupied[(widest + 1) % len(occupied)], occupied[widest]
+        bounds[zone_id] = zone_rows[0], zone_rows[-1], west, east
+
+        firsts = (firsts - west) % columns  # Columns east of the box's west edge, none of the runs wrapping
+        center_row = np.sum((zone_rows + .5) * lengths) / pixels[zone_id]
+        center_column = np.sum((firsts + lengths / 2) * lengths) / pixels[zone_id]
+        nearest_columns = np.clip(np.floor(center_column), firsts, firsts + lengths - 1)  # Each run's closest
+        closest = np.argmin((zone_rows + .5 - center_row) ** 2 + (nearest_columns + .5 - center_column) ** 2)
+        interior[zone_id] = zone_rows[closest], (nearest_columns[closest] + west) % columns
+    return bounds, pixels, area, interior, run_keys, run_lengths.astype(np.int32), zone_starts
+
+
+def write_extents(extents_path, zone_raster, zone_count):
+    """Writes the reverse index of a zone raster (.extents.npz) for timmeh.ZoneExtents.load"""
+    bounds, pixels, area, interior, run_keys, run_lengths, zone_starts = zone_extents(zone_raster, zone_count)
+    with replacing(extents_path) as extents:
+        np.savez(extents, shape=np.array(zone_raster.shape), bounds=bounds, pixels=pixels, area=area,
+                 interior=interior, run_keys=run_keys, run_lengths=run_lengths, zone_starts=zone_starts)
+
+
+def proper_name(tzid):
+    """Timezone as named in the shapefile's TZID, put right, its one record of 'Etc/GMT--7' being Etc/GMT-7"""
+    return tzid.replace('GMT--', 'GMT-')
+
+
+def read_polygons(shapefile_path):
+    """Timezone polygons from the shapefile, needs pyshp
+    Arguments:
+        shapefile_path (str), .shp with a TZID field, as tz_shapefiles/tz_color_sea
+    Yields:
+        tz (str), 'proper named' timezone
+        rings (list of 2D float arrays), lon, lat points of each ring of its polygons
+    """
+    try:
+        import shapefile
+    except ImportError:
+        raise ImportError('Reading the timezone polygons needs pyshp, "sudo -H pip3 install pyshp"')
+    if not os.path.exists(shapefile_path):
+        raise IOError('{} is missing, the polygons are in the .shp beside the .dbf/.shx/.prj'.format(shapefile_path))
+
+    reader = shapefile.Reader(shapefile_path)
+    try:
+        for shape_record in reader.iterShapeRecords():
+            points = np.array(shape_record.shape.points, dtype=np.float64).reshape(-1, 2)
+            parts = list(shape_record.shape.parts) + [len(points)]
+            yield (proper_name(shape_record.record['TZID']),
+                   [points[start:end] for start, end in zip(parts[:-1], parts[1:])])
+    finally:
+        reader.close()
+
+
+def border_pixels(zone_raster):
+    """Pixels with any of their 8 neighbors in another zone, wrapping round at +-180 degrees"""
+    border = np.zeros(zone_raster.shape, dtype=bool)
+    for row_offset in (-1, 0, 1):
+        here = slice(max(0, -row_offset), zone_raster.shape[0] - max(0, row_offset))
+        there = slice(max(0, row_offset), zone_raster.shape[0] - max(0, -row_offset))
+        for column_offset in (-1, 0, 1):
+            if row_offset or column_offset:
+                border[here] |= zone_raster[here] != np.roll(zone_raster[there], -column_offset, axis=1)
+    return border
+
+
+def polygon_edges(polygons, zone_names, max_rows):
+    """Files every polygon edge under each pixel row its latitudes span, for timmeh.BorderIndex
+    Arguments:
+        polygons (iterable), (tz, rings) as from 'read_polygons'
+        zone_names (list of str), zone table names, position being the zone index
+        max_rows (int), rows of the zone raster
+    Returns:
+        band_starts (1D int64 array), first edge of each pixel row, and one past the last
+        edges (2D float64 array), lon, lat, lon, lat of both ends of each edge, row by row
+        edge_zones (1D uint16 array), zone index of each edge
+    """
+    zone_ids = {tz: zone_id for zone_id, tz in enumerate(zone_names)}
+    edges, edge_zones = [], []
+    for tz, rings in polygons:
+        if tz not in zone_ids:
+            continue  # Not a zone the raster knows
+        for ring in rings:
+            edges.append(np.hstack((ring[:-1], ring[1:])))
+            edge_zones.append(np.full(len(ring) - 1, zone_ids[tz], dtype=np.uint16))
+    edges = np.vstack(edges) if edges else np.empty((0, 4))
+    edge_zones = np.concatenate(edge_zones) if edge_zones else np.empty(0, dtype=np.uint16)
+
+    def row_of(lats):  # Same arithmetic as BorderIndex.zones_containing
+        return np.clip(((90 - lats) * (max_rows / 180)).astype(np.int64), 0, max_rows - 1)
+
+    first_rows = row_of(np.maximum(edges[:, 1], edges[:, 3]))  # Northern end, first row
+    rows_spanned = row_of(np.minimum(edges[:, 1], edges[:, 3])) - first_rows + 1
+    filed = np.repeat(np.arange(len(edges)), rows_spanned)
+    rows = np.repeat(first_rows - (np.cumsum(rows_spanned) - rows_spanned), rows_spanned) + np.arange(len(filed))
+    order = np.argsort(rows, kind='stable')
+    band_starts = np.searchsorted(rows[order], np.arange(max_rows + 1))
+    return band_starts, edges[filed[order]], edge_zones[filed[order]]
+
+
+def write_borders(index_path, zone_raster, zone_names, shapefile_path):
+    """Writes the border index of a zone raster (.border.npz) for timmeh.BorderIndex.load
+    Arguments:
+        index_path (str), destination of the border index
+        zone_raster (2D uint16 array), zone index per pixel
+        zone_names (list of str), zone table names, position being the zone index
+        shapefile_path (str), timezone polygons
+    """
+    band_starts, edges, edge_zones = polygon_edges(read_polygons(shapefile_path), zone_names, zone_raster.shape[0])
+    with replacing(index_path) as index:
+        np.savez(index, border_bits=np.packbits(border_pixels(np.asarray(zone_raster)), axis=1),
+                 band_starts=band_starts, edges=edges, edge_zones=edge_zones)
+
+
+def shapefile_zone_table(shapefile_path):
+    """Zone table straight from the shapefile's records, TZID and COLOR, so no dictionary to keep in step.
+    Sea or land is as tzcolors has it, the sea zones first, as timmeh expects.
+    Arguments:
+        shapefile_path (str), .shp, its .dbf beside it, as tz_shapefiles/tz_color_sea
+    Returns:
+        zones (list of tuples), (rgb_values, kind, tz) per zone index
+    """
+    try:
+        import shapefile
+    except ImportError:
+        raise ImportError('Reading the timezone polygons needs pyshp, "sudo -H pip3 install pyshp"')
+    with open(os.path.splitext(shapefile_path)[0] + '.dbf', 'rb') as dbf:
+        reader = shapefile.Reader(dbf=dbf)
+        colors = {}
+        for record in reader.iterRecords():
+            rgb_values = tuple(int(value) for value in record['COLOR'].split(',')[:3])  # 'r, g, b, alpha'
+            colors.setdefault(proper_name(record['TZID']), rgb_values)
+    sea = set(tzcolors.seadic.values())
+    zones = [LOST_SOUL]
+    zones += [(rgb_values, 'sea', tz) for tz, rgb_values in colors.items() if tz in sea]
+    zones += [(rgb_values, 'land', tz) for tz, rgb_values in colors.items() if tz not in sea]
+    return zones
+
+
+def rasterize_rows(first_row, last_row, columns, band_starts, edges, edge_zones):
+    """Zone index of each pixel of some rows, filling the polygons even-odd along each row's center line.
+    Zones are laid down in zone index order, so where sea and land polygons overlap, land wins.
+    Arguments:
+        first_row (int), last_row (int), rows to rasterize, last_row not included
+        columns (int), pixels along a row
+        band_starts (1D int64 array), edges (2D float64 array), edge_zones (1D uint16 array), polygon
+            edges filed by row, from 'polygon_edges'
+    Returns:
+        zone_raster (2D uint16 array), zone index per pixel of the rows, 0 outside every polygon
+    """
+    rows = len(band_starts) - 1
+    zone_raster = np.zeros((last_row - first_row, columns), dtype=np.uint16)
+    for row in range(first_row, last_row):
+        lat = 90 - (row + .5) * (180 / rows)
+        band = slice(band_starts[row], band_starts[row + 1])
+        lon_1, lat_1, lon_2, lat_2 = edges[band].T
+        spanning = (lat_1 > lat) != (lat_2 > lat)  # Same crossing rule as BorderIndex.zones_containing, an
+        lon_1, lat_1, lon_2, lat_2 = lon_1[spanning], lat_1[spanning], lon_2[spanning], lat_2[spanning]
+        crossings = lon_1 + (lat - lat_1) * (lon_2 - lon_1) / (lat_2 - lat_1)  # even number for every ring
+        crossing_zones = edge_zones[band][spanning]
+        order = np.lexsort((crossings, crossing_zones))  # Zone by zone, west to east, in and out in pairs
+        spans = np.clip(np.ceil((crossings[order] + 180) * (columns / 360) - .5), 0, columns).astype(np.intp)
+        for (start, end), zone_id in zip(spans.reshape(-1, 2), crossing_zones[order][::2]):
+            zone_raster[row - first_row, start:end] = zone_id
+    return zone_raster
+
+
+_rasterizing = None  # Polygon edges in a rasterizing worker process
+
+
+def _start_rasterizer(columns, band_starts, edges, edge_zones):
+    """Rasterizing worker process start up, the edges handed over once"""
+    global _rasterizing
+    _rasterizing = columns, band_starts, edges, edge_zones
+
+
+def _rasterize_band(first_row, last_row):
+    """Rasterizing worker process, one band of rows"""
+    return rasterize_rows(first_row, last_row, *_rasterizing)
+
+
+def rasterize(shapefile_path, raster_path, zones, columns, rows, workers=0, band_rows=64):
+    """Zone raster of the polygons, in bands of rows across a process pool. Each band's polygon edges
+    are hashed into a manifest beside the raster, and a band whose edges haven't changed since the last
+    time is kept rather than rasterized again. Bands span whole rows, as even-odd filling needs them.
+    Arguments:
+        shapefile_path (str), timezone polygons
+        raster_path (str), zone raster being built, the polygons' own raster and manifest are kept beside it
+        zones (list of tuples), zone table from 'shapefile_zone_table'
+        columns (int), rows (int), size of the raster
+        workers (int), processes rasterizing, 0 or 1 for none
+        band_rows (int), rows per band
+    Returns:
+        zone_raster (2D uint16 array), zone index per pixel, before territorial waters
+        rebuilt (int), bands rasterized this time
+    """
+    zone_names = [tz for __rgb_values, __kind, tz in zones]
+    band_starts, edges, edge_zones = polygon_edges(read_polygons(shapefile_path), zone_names, rows)
+    polygons_path = os.path.splitext(raster_path)[0] + '.polygons.npy'
+    manifest_path = os.path.splitext(raster_path)[0] + '.manifest.json'
+
+    bands = [(first_row, min(first_row + band_rows, rows)) for first_row in range(0, rows, band_rows)]
+    digests = []
+    for first_row, last_row in bands:
+        edge_range = slice(band_starts[first_row], band_starts[last_row])
+        digests.append(hashlib.sha1(edges[edge_range].tobytes() + edge_zones[edge_range].tobytes()).hexdigest())
+    manifest = {'columns': columns, 'rows': rows, 'band_rows': band_rows, 'zones': zone_names}
+    previous = {}
+    if os.path.exists(manifest_path) and os.path.exists(polygons_path):
+        with open(manifest_path, encoding='utf-8') as manifest_file:
+            previous = json.load(manifest_file)
+    if all(previous.get(key) == value for key, value in manifest.items()):  # Same size, bands and zones,
+        zone_raster = np.load(polygons_path)  # so unchanged bands stand
+        changed = [band for band, digest in enumerate(digests) if previous['bands'][band] != digest]
+    else:
+        zone_raster = np.zeros((rows, columns), dtype=np.uint16)
+        changed = list(range(len(bands)))
+
+    first_rows, last_rows = [bands[band][0] for band in changed], [bands[band][1] for band in changed]
+    if workers > 1 and len(changed) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(workers, initializer=_start_rasterizer,
+                                 initargs=(columns, band_starts, edges, edge_zones)) as pool:
+            for first_row, last_row, band in zip(first_rows, last_rows, pool.map(_rasterize_band, first_rows,
+                                                                                 last_rows)):
+                zone_raster[first_row:last_row] = band
+    else:
+        for first_row, last_row in zip(first_rows, last_rows):
+            zone_raster[first_row:last_row] = rasterize_rows(first_row, last_row, columns, band_starts, edges,
+                                                             edge_zones)
+
+    manifest['bands'] = digests
+    with replacing(polygons_path) as polygons:
+        np.save(polygons, zone_raster)
+    with replacing(manifest_path, 'w') as manifest_file:  # Last, so it never vouches for a raster not written
+        json.dump(manifest, manifest_file)
+    return zone_raster, len(changed)
+
+
+def build_from_polygons(shapefile_path, raster_path, scales, columns=5265, rows=2633, distance=12 * 1852.0,
+                        workers=0):
+    """Zone rasters at several resolutions rasterized from the polygons, the pyramid of 'build_pyramid'
+    without the image, its colors or the dictionaries
+    Arguments:
+        shapefile_path (str), timezone polygons, TZID and COLOR in their records
+        raster_path (str), zone raster at scale 1, levels are named after it by timmeh.level_path
+        scales (list of floats), resolution of each level relative to columns x rows
+        columns (int), rows (int), size of the raster at scale 1
+        distance (float), meters, extent of territorial waters
+        workers (int), processes rasterizing, 0 or 1 for none
+    Returns:
+        level_paths (list of str), zone raster of each level
+        rebuilt (list of ints), bands of each level rasterized, the rest unchanged since the last build
+    """
+    zones = shapefile_zone_table(shapefile_path)
+    level_paths, rebuilt = [], []
+    for scale in scales:
+        level_paths.append(timmeh.level_path(raster_path, scale))
+        zone_raster, bands = rasterize(shapefile_path, level_paths[-1], zones, max(1, int(round(columns * scale))),
+                                       max(1, int(round(rows * scale))), workers)
+        write_level(level_paths[-1], zone_raster, zones, distance)
+        rebuilt.append(bands)
+    return level_paths, rebuilt
+
+
+def read_map(map_path):
+    """Zone raster and zone names of a version of the map, a zone raster beside its zone table or a zone database
+    Arguments:
+        map_path (str), .npy zone raster, or .tzdb from 'write_database'
+    Returns:
+        zone_raster (2D uint16 array), zone index per pixel, memory mapped for a .npy
+        zone_names (list of str), zone table names, position being the zone index
+    """
+    if os.path.splitext(map_path)[1] == '.tzdb':
+        database = timmeh.ZoneDatabase(map_path, tile_cache=1)  # Each tile is wanted once
+        zone_raster = np.empty(database.shape, dtype=np.uint16)
+        size = database.tile_size
+        for number, zone_id in enumerate(database.tile_zones):
+            tile_row, tile_column = divmod(number, database.tile_columns)
+            tile = (slice(tile_row * size, (tile_row + 1) * size), slice(tile_column * size, (tile_column + 1) * size))
+            zone_raster[tile] = database.tile(number) if zone_id == timmeh.MIXED_TILE else zone_id
+        table = database.zone_lines
+    else:
+        zone_raster = np.load(map_path, mmap_mode='r')
+        __build_format, table = timmeh.read_zone_table(zone_table_path(map_path))
+    return zone_raster, [line.split('\t')[2] for line in table]
+
+
+def connected_blocks(changed_blocks):
+    """Groups of changed blocks touching, sides or corners, each group one region
+    Arguments:
+        changed_blocks (2D bool array), block row, block column
+    Returns:
+        regions (list of lists), (block row, block column) of the blocks in each region
+    """
+    unvisited = set(zip(*np.nonzero(changed_blocks)))
+    regions = []
+    while unvisited:
+        region, waiting = [], [unvisited.pop()]
+        while waiting:  # Flood fill, the block grid being a few hundred blocks at most
+            block_row, block_column = waiting.pop()
+            region.append((int(block_row), int(block_column)))
+            for neighbor in [(block_row + row_offset, block_column + column_offset)
+                             for row_offset in (-1, 0, 1) for column_offset in (-1, 0, 1)]:
+                if neighbor in unvisited:
+                    unvisited.remove(neighbor)
+                    waiting.append(neighbor)
+        regions.append(sorted(region))
+    return sorted(regions)
+
+
+def diff_maps(old_path, new_path, block_size=DIFF_BLOCK):
+    """Where two versions of the map disagree, compared a strip of blocks at a time. Zones are matched by
+    name, not index, so a reordered or grown zone table is no change by itself.
+    Arguments:
+        old_path (str), new_path (str), versions of the map, .npy zone rasters or .tzdb, the same size
+        block_size (int), pixels square of the blocks the changes are reported in
+    Returns:
+        diff (dict), JSON ready:
+            rows, columns (ints), size of both maps
+            changed_pixels (int), changed_km2 (float), all told
+            added, removed (lists of str), zones only in the new, or the old, zone table
+            zones (dict), tz --> gained_pixels, lost_pixels (ints), gained_km2, lost_km2 (floats), for each
+                zone that gained or lost any
+            regions (list of dicts), touching changed blocks: south, west, north, east (floats), the box
+                round their changed pixels, pixels (int), area_km2 (float), and moves (list of dicts), from,
+                to (str) and pixels (int) of each change of zone, most pixels first
+    """
+    old_raster, old_names = read_map(old_path)
+    new_raster, new_names = read_map(new_path)
+    if old_raster.shape != new_raster.shape:
+        raise ValueError('{} is {} x {} pixels, {} is {} x {}, resample one to compare them'.format(
+            old_path, old_raster.shape[1], old_raster.shape[0], new_path, new_raster.shape[1], new_raster.shape[0]))
+    rows, columns = new_raster.shape
+    names = new_names + [tz for tz in old_names if tz not in new_names]  # New zone indices, then the gone
+    old_ids = np.array([names.index(tz) for tz in old_names], dtype=np.intp)  # Old zone index --> new
+    zone_count = len(names)
+    row_area = row_areas(rows, columns)
+
+    gained_pixels, lost_pixels = np.zeros(zone_count, dtype=np.int64), np.zeros(zone_count, dtype=np.int64)
+    gained_km2, lost_km2 = np.zeros(zone_count), np.zeros(zone_count)
+    changed_blocks = np.zeros((-(-rows // block_size), -(-columns // block_size)), dtype=bool)
+    block_boxes, block_area, block_moves = {}, {}, {}  # (block row, block column) --> first row, last row, first
+    for block_row, first_row in enumerate(range(0, rows, block_size)):  # column, last column; km2; moves, those
+        strip = slice(first_row, min(first_row + block_size, rows))
+        old_strip, new_strip = old_ids[old_raster[strip]], np.asarray(new_raster[strip], dtype=np.intp)
+        changed = old_strip != new_strip
+        if not changed.any():
+            continue
+        changed_rows, changed_columns = np.nonzero(changed)
+        weights = row_area[first_row + changed_rows]
+        gained_pixels += np.bincount(new_strip[changed], minlength=zone_count)
+        lost_pixels += np.bincount(old_strip[changed], minlength=zone_count)
+        gained_km2 += np.bincount(new_strip[changed], weights=weights, minlength=zone_count)
+        lost_km2 += np.bincount(old_strip[changed], weights=weights, minlength=zone_count)
+
+        moves = old_strip[changed] * zone_count + new_strip[changed]  # being from * zone_count + to
+        blocks = changed_columns // block_size  # Changed pixels are in row major order, so sorting them by
+        order = np.argsort(blocks, kind='stable')  # block keeps each block's rows in order
+        present, starts = np.unique(blocks[order], return_index=True)
+        for block_column, pixels in zip(present, np.split(order, starts[1:])):
+            changed_blocks[block_row, block_column] = True
+            block_boxes[block_row, block_column] = (first_row + changed_rows[pixels[0]],
+                                                    first_row + changed_rows[pixels[-1]],
+                                                    changed_columns[pixels].min(), changed_columns[pixels].max())
+            block_area[block_row, block_column] = float(weights[pixels].sum())
+            block_moves[block_row, block_column] = np.unique(moves[pixels], return_counts=True)
+
+    row_degrees, column_degrees = 180 / rows, 360 / columns
+    regions = []
+    for region in connected_blocks(changed_blocks):
+        boxes = np.array([block_boxes[block] for block in region])
+        moves, counts = (np.concatenate(parts) for parts in zip(*(block_moves[block] for block in region)))
+        moves, inverse = np.unique(moves, return_inverse=True)
+        counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        order = np.argsort(-counts, kind='stable')
+        regions.append({'south': float(90 - (boxes[:, 1].max() + 1) * row_degrees),
+                        'west': float(boxes[:, 2].min() * column_degrees - 180),
+                        'north': float(90 - boxes[:, 0].min() * row_degrees),
+                        'east': float((boxes[:, 3].max() + 1) * column_degrees - 180),
+                        'pixels': int(counts.sum()), 'area_km2': sum(block_area[block] for block in region),
+                        'moves': [{'from': names[moves[move] // zone_count], 'to': names[moves[move] % zone_count],
+                                   'pixels': int(counts[move])} for move in order]})
+
+    return {'rows': rows, 'columns': columns, 'changed_pixels': int(gained_pixels.sum()),
+            'changed_km2': float(gained_km2.sum()),
+            'added': [tz for tz in new_names if tz not in old_names],
+            'removed': [tz for tz in old_names if tz not in new_names],
+            'zones': {names[zone_id]: {'gained_pixels': int(gained_pixels[zone_id]),
+                                       'lost_pixels': int(lost_pixels[zone_id]),
+                                       'gained_km2': float(gained_km2[zone_id]), 'lost_km2': float(lost_km2[zone_id])}
+                      for zone_id in np.flatnonzero(gained_pixels + lost_pixels)},
+            'regions': regions}
+
+
+def main():
+    """Command line, regenerates the zone raster, or rasters of a pyramid, from the image or the polygons"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--image', default=timmeh.image_file, help='color referenced timezone image')
+    parser.add_argument('--raster', default=timmeh.raster_file, help='zone raster to write')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1], help='pyramid levels, e.g. 0.25 0.5 1 2')
+    parser.add_argument('--database', action='store_true', help='pack each level into a .tzdb zone database too')
+    parser.add_argument('--no-distances', action='store_true',
+                        help='leave out the distance field border distances come from, worked out on first use '
+                             'beside a raster, missing from a database')
+    parser.add_argument('--shapefile', nargs='?', const=timmeh.shapefile_file,
+                        help='rasterize the polygons rather than read the image, tz_color_sea by default')
+    parser.add_argument('--size', type=int, nargs=2, default=[5265, 2633], metavar=('COLUMNS', 'ROWS'),
+                        help='raster size at scale 1, with --shapefile')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='rasterizing processes, with --shapefile')
+    parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'),
+                        help='build nothing, print as JSON where two zone rasters or .tzdb differ')
+    args = parser.parse_args()
+
+    if args.diff:
+        print(json.dumps(diff_maps(*args.diff), indent=1))
+        return
+
+    if args.shapefile:
+        level_paths, rebuilt = build_from_polygons(args.shapefile, args.raster, args.scales, args.size[0], args.size[1],
+                                                   timmeh.DISTANCE, args.workers)
+        for level_path, bands in zip(level_paths, rebuilt):
+            print('{}: {} bands of rows rasterized'.format(level_path, bands))
+    else:
+        level_paths = build_pyramid(args.image, args.raster, tzcolors.seadic, tzcolors.bigdic, args.scales,
+                                    timmeh.color_spread, timmeh.DISTANCE)
+    for level_path in level_paths:
+        zone_raster = np.load(level_path, mmap_mode='r')
+        print('{}: {} x {} pixels, {:.1f} MB'.format(level_path, zone_raster.shape[1], zone_raster.shape[0],
+                                                     zone_raster.nbytes / 1e6))
+        if not args.no_distances:  # Built here, offline, rather than by whichever lookup first wants a distance
+            distance_path = os.path.splitext(level_path)[0] + '.distance.npy'
+            write_distances(distance_path, zone_raster)
+            print('{}: {:.1f} MB'.format(distance_path, os.path.getsize(distance_path) / 1e6))
+        if args.database:
+            database_path = os.path.splitext(level_path)[0] + '.tzdb'
+            write_database(database_path, level_path, distances=not args.no_distances)
+            print('{}: {:.1f} MB'.format(database_path, os.path.getsize(database_path) / 1e6))
+
+
+if __name__ == '__main__':
+    main()
+#
+# End
@@ -0,0 +1,126 @@
+#! /usr/bin/env python3
+# coding=utf-8
+"""Stays connected to gpsd, looks up the timezone of every fix, and says so when it changes"""
+import argparse
+import asyncio
+import json
+from collections import namedtuple
+
+if __package__:  # 'from timmeh import tzgps', timmeh a package
+    from . import timmeh
+else:  # Run or imported from beside timmeh.py
+    import timmeh
+
+__author__ = 'Moe'
+__copyright__ = 'Copyright 2016  Moe'
+__license__ = 'MIT'
+__version__ = '0.0.5'
+
+GPSD_HOST = '127.0.0.1'
+GPSD_PORT = 2947
+WATCH = b'?WATCH={"enable":true,"json":true}\n'  # gpsd JSON protocol, TPV reports as they come
+
+Fix = namedtuple('Fix', 'lat lon time')
+ZoneChange = namedtuple('ZoneChange', 'lat lon time tz previous confidence')
+
+
+async def fixes(host=GPSD_HOST, port=GPSD_PORT, retry=1.0):
+    """Every position fix gpsd reports, over one long lived connection, reconnected should it drop
+    Arguments:
+        host (str), port (int), where gpsd listens
+        retry (float), seconds between reconnection attempts
+    Yields:
+        fix (Fix), lat, lon and gpsd's time string (None if it sent none) of each TPV report with a position
+    """
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            await asyncio.sleep(retry)
+            continue
+        try:
+            writer.write(WATCH)
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break  # gpsd went away
+                try:
+                    report = json.loads(line.decode('utf-8', 'replace'))
+                except ValueError:
+                    continue  # Not JSON, not for us
+                if report.get('class') == 'TPV' and 'lat' in report and 'lon' in report:
+                    yield Fix(report['lat'], report['lon'], report.get('time'))
+        except OSError:
+            pass
+        finally:
+            writer.close()
+        await asyncio.sleep(retry)
+
+
+def ready(timezones, skip):
+    """Loads all a lookup of every fix needs, building what isn't built yet: the map, the border index if
+    it refines borders, and the distance field if skipping. Seconds or more on a first run, so run off the event loop.
+    """
+    timezones.load()
+    if timezones.borders:
+        timezones.border_index
+    if skip:
+        timezones.distance_field
+
+
+async def zone_changes(timezones=None, host=GPSD_HOST, port=GPSD_PORT, skip=False):
+    """Timezone of each fix, told only when it differs from the last one's
+    Arguments:
+        timezones (timmeh.TimezoneLookup), defaults to one remembering the last 64 pixels
+        host (str), port (int), where gpsd listens
+        skip (bool), look up again only once the receiver is further from where it last looked up than
+            that point's border distance, see timmeh.TimezoneLookup.border_distance
+    Yields:
+        change (ZoneChange), the fix, its timezone, the timezone before it (None for the first) and, if
+            skipping, the confidence in the answer (lookup_confidence), else None
+    """
+    timezones = timezones or timmeh.TimezoneLookup(cache_size=64)  # Fixes come from the same few pixels
+    await asyncio.get_running_loop().run_in_executor(None, ready, timezones, skip)  # Lookups after are quick
+    previous = None
+    looked_up = None  # Lat, lon and border distance of the last fix looked up, when skipping
+    async for fix in fixes(host, port):
+        if not skip:
+            __pixel_column, __pixel_row, __rgb_values, tz = timezones.lookup(fix.lat, fix.lon)
+            confidence = None
+        elif looked_up is None or timmeh.meters_between(looked_up[0], looked_up[1], fix.lat, fix.lon) >= looked_up[2]:
+            __pixel_column, __pixel_row, __rgb_values, tz, meters, confidence = \
+                timezones.lookup_confidence(fix.lat, fix.lon)
+            looked_up = fix.lat, fix.lon, meters
+        else:
+            continue  # Still inside the zone it was last looked up in
+        if tz != previous:
+            yield ZoneChange(fix.lat, fix.lon, fix.time, tz, previous, confidence)
+            previous = tz
+
+
+async def watch(host=GPSD_HOST, port=GPSD_PORT, skip=False):
+    """Prints timezone changes as they happen"""
+    async for change in zone_changes(host=host, port=port, skip=skip):
+        print('Lat:', change.lat, ' Lon:', change.lon, ' Time:', change.time)
+        print('Timezone:', change.tz, 'was:', change.previous, *(() if change.confidence is None else
+                                                                 ('confidence: {:.2f}'.format(change.confidence),)))
+
+
+def main():
+    """Command line, watches gpsd until interrupted"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default=GPSD_HOST)
+    parser.add_argument('--port', type=int, default=GPSD_PORT)
+    parser.add_argument('--skip', action='store_true', help='no lookups until the receiver could have changed zone')
+    args = parser.parse_args()
+    try:
+        asyncio.run(watch(args.host, args.port, args.skip))
+    except KeyboardInterrupt:
+        print('\nTerminated by user\nGood Bye.\n')
+
+
+if __name__ == '__main__':
+    main()
+#
+# End
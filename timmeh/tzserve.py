@@ -0,0 +1,218 @@
+#! /usr/bin/env python3
+# coding=utf-8
+"""Timezone lookups over HTTP, on TCP or a Unix socket, one map in memory for every client. Requests
+arriving together are looked up together, as one vectorised batch.
+    GET  /lookup?lat=48.5&lon=7.7          --> {"tz": "Europe/Paris", "zone_id": 123}
+    POST /lookup {"lats": [..], "lons": [..]} --> {"tz": [..], "zone_id": [..]}
+    GET  /metrics                          --> latency and batch size histograms, Prometheus text,
+                                               and with --stats the lookup's branch counts and step timings
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+if __package__:  # 'from timmeh import tzserve', timmeh a package
+    from . import timmeh
+else:  # Run or imported from beside timmeh.py
+    import timmeh
+
+__author__ = 'Moe'
+__copyright__ = 'Copyright 2016  Moe'
+__license__ = 'MIT'
+__version__ = '0.0.5'
+
+HOST = '127.0.0.1'
+PORT = 2948  # gpsd's neighbour
+LATENCY_BOUNDS = [.00005, .0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1]  # seconds
+BATCH_BOUNDS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 16384, 65536]  # points
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+def check_points(lats, lons):
+    """ValueError unless every point is a finite latitude and longitude on the globe, so that nothing
+    unusable ever reaches a batch it would spoil for the other requests in it
+    """
+    if not (np.isfinite(lats).all() and np.isfinite(lons).all()):
+        raise ValueError('lat and lon must be finite numbers')
+    if (np.abs(lats) > 90).any() or (np.abs(lons) > 180).any():
+        raise ValueError('lat must be within -90..90 and lon within -180..180')
+
+
+class Batcher(object):
+    """Gathers the points of requests arriving within 'wait' of each other, or up to 'most' points,
+    and looks them all up with the one lookup_many
+    Arguments:
+        timezones (timmeh.TimezoneLookup), map to look up on
+        wait (float), seconds the first request of a batch waits for company
+        most (int), points at which a batch goes without waiting further
+    """
+
+    def __init__(self, timezones, wait=.0002, most=65536):
+        self.timezones = timezones
+        self.wait = wait
+        self.most = most
+        self.batch_sizes = timmeh.Histogram(BATCH_BOUNDS)
+        self._pending = []  # (lats, lons, future)
+        self._points = 0
+        self._flush = None
+
+    async def lookup(self, lats, lons):
+        """Zone indices of the points, once their batch has been looked up"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((lats, lons, future))
+        self._points += len(lats)
+        if self._points >= self.most:
+            self.flush()
+        elif self._flush is None:
+            self._flush = asyncio.get_running_loop().call_later(self.wait, self.flush)
+        return await future
+
+    def flush(self):
+        """Looks up everything pending, handing each request its share"""
+        if self._flush is not None:
+            self._flush.cancel()
+            self._flush = None
+        pending, self._pending, self._points = self._pending, [], 0
+        if not pending:
+            return
+        lats = np.concatenate([request[0] for request in pending])
+        lons = np.concatenate([request[1] for request in pending])
+        self.batch_sizes.observe(len(lats))
+        try:
+            zone_ids, __tz = self.timezones.lookup_many(lats, lons)
+        except Exception:  # Request by request, so only the one at fault hears about it
+            for request_lats, request_lons, future in pending:
+                try:
+                    future.set_result(self.timezones.lookup_many(request_lats, request_lons)[0])
+                except Exception as error:
+                    future.set_exception(error)
+            return
+        start = 0
+        for request_lats, __lons, future in pending:
+            future.set_result(zone_ids[start:start + len(request_lats)])
+            start += len(request_lats)
+
+
+class LookupServer(object):
+    """HTTP/1.1, keep-alive, just enough of it for the lookups and metrics
+    Arguments:
+        timezones (timmeh.TimezoneLookup), map to look up on, defaults to timmeh.timezones
+        wait (float), most (int), see Batcher
+    """
+
+    def __init__(self, timezones=None, wait=.0002, most=65536):
+        self.timezones = timezones or timmeh.timezones
+        self.batcher = Batcher(self.timezones, wait, most)
+        self.latency = {'single': timmeh.Histogram(LATENCY_BOUNDS), 'batch': timmeh.Histogram(LATENCY_BOUNDS)}
+
+    async def handle(self, reader, writer):
+        """One connection, as many requests as the client sends on it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, __version = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode('latin-1').strip()
+                    if not line:
+                        break
+                    name, __colon, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload, content_type = await self.respond(method, target, body)
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\n\r\n'.format(
+                    status, STATUS[status], content_type, len(payload)).encode('latin-1') + payload)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass  # Garbled, or gone
+        finally:
+            writer.close()
+
+    async def respond(self, method, target, body):
+        """Status, body and content type for a request"""
+        url = urlsplit(target)
+        if url.path == '/metrics':
+            return 200, self.metrics().encode('utf-8'), 'text/plain; version=0.0.4'
+        if url.path != '/lookup':
+            return 404, b'{"error": "not found"}', 'application/json'
+
+        started = time.perf_counter()
+        try:
+            if method == 'GET':
+                query = parse_qs(url.query)
+                lats, lons = np.array([float(query['lat'][0])]), np.array([float(query['lon'][0])])
+                check_points(lats, lons)
+                zone_ids = await self.batcher.lookup(lats, lons)
+                answer = {'tz': self.timezones.zone_names[zone_ids[0]], 'zone_id': int(zone_ids[0])}
+                kind = 'single'
+            elif method == 'POST':
+                points = json.loads(body.decode('utf-8'))
+                lats, lons = np.asarray(points['lats'], dtype=np.float64), np.asarray(points['lons'], dtype=np.float64)
+                if lats.shape != lons.shape or lats.ndim != 1:
+                    raise ValueError('lats and lons must be lists of the same length')
+                check_points(lats, lons)
+                zone_ids = await self.batcher.lookup(lats, lons)
+                answer = {'tz': self.timezones.zone_name_array[zone_ids].tolist(), 'zone_id': zone_ids.tolist()}
+                kind = 'batch'
+            else:
+                return 405, b'{"error": "GET or POST"}', 'application/json'
+        except (KeyError, ValueError, TypeError) as error:
+            return 400, json.dumps({'error': str(error)}).encode('utf-8'), 'application/json'
+        except Exception as error:  # Answered all the same, the connection kept
+            return 500, json.dumps({'error': str(error)}).encode('utf-8'), 'application/json'
+        self.latency[kind].observe(time.perf_counter() - started)
+        return 200, json.dumps(answer).encode('utf-8'), 'application/json'
+
+    def metrics(self):
+        """Prometheus text exposition of the latency and batch size histograms, and the lookup's own stats"""
+        lines = ['# TYPE timmeh_request_seconds histogram']
+        for kind, histogram in sorted(self.latency.items()):
+            lines += histogram.prometheus('timmeh_request_seconds', 'kind="{}"'.format(kind))
+        lines.append('# TYPE timmeh_batch_points histogram')
+        lines += self.batcher.batch_sizes.prometheus('timmeh_batch_points')
+        text = '\n'.join(lines) + '\n'
+        if self.timezones.stats is not None:
+            text += self.timezones.stats.prometheus()
+        return text
+
+    async def serve(self, host=HOST, port=PORT, unix=None):
+        """Serves until cancelled, on the Unix socket if given one, otherwise TCP host:port"""
+        if self.timezones.zone_names is None:
+            self.timezones.load()  # Loaded once, before the first client
+        if unix:
+            server = await asyncio.start_unix_server(self.handle, unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """Command line, serves until interrupted"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--unix', help='Unix socket path, instead of TCP')
+    parser.add_argument('--wait', type=float, default=.0002, help='seconds a request waits for others to batch with')
+    parser.add_argument('--stats', action='store_true', help='lookup branch counts and step timings in /metrics')
+    args = parser.parse_args()
+    timezones = timmeh.TimezoneLookup(stats=True) if args.stats else None
+    try:
+        asyncio.run(LookupServer(timezones, wait=args.wait).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print('\nTerminated by user\nGood Bye.\n')
+
+
+if __name__ == '__main__':
+    main()
+#
+# End
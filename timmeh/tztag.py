@@ -0,0 +1,223 @@
+#! /usr/bin/env python3
+# coding=utf-8
+"""Tags track files with timezones, streamed chunk by chunk through the vectorised lookup"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+import numpy as np
+
+if __package__:  # 'from timmeh import tztag', timmeh a package
+    from . import timmeh
+else:  # Run or imported from beside timmeh.py
+    import timmeh
+
+__author__ = 'Moe'
+__copyright__ = 'Copyright 2016  Moe'
+__license__ = 'MIT'
+__version__ = '0.0.5'
+
+FORMATS = {'.csv': 'csv', '.json': 'ndjson', '.jsonl': 'ndjson', '.ndjson': 'ndjson', '.parquet': 'parquet'}
+CHUNK_SIZE = 100000  # Rows held at any one time
+
+
+def to_float(value):
+    """Float of a coordinate, NaN if there isn't one"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def timezones_of(timezones, lats, lons):
+    """lookup_many for a chunk, '' where a row has no usable coordinates, missing or off the globe
+    Arguments:
+        timezones (timmeh.TimezoneLookup), map to look up on
+        lats (array of floats), lons (array of floats), NaN where missing
+    Returns:
+        tz (array of str), 'proper named' timezone per row
+    """
+    with np.errstate(invalid='ignore'):  # NaN compares False, unusable either way
+        usable = (np.abs(lats) <= 90) & (np.abs(lons) <= 180)
+    tz = np.full(len(lats), '', dtype=object)
+    if usable.any():
+        __zone_ids, tz[usable] = timezones.lookup_many(lats[usable], lons[usable])
+    return tz
+
+
+def column_index(header, column):
+    """Position of a column in the header row, ValueError naming it if it isn't there"""
+    if column not in header:
+        raise ValueError('no {!r} column, the header has {}'.format(column, ', '.join(map(repr, header))))
+    return header.index(column)
+
+
+def tag_csv(source, destination, timezones, lat_column, lon_column, tz_column, chunk_size):
+    """Tags CSV, header row first, returns rows tagged. Rows short of the header are padded out with
+    empty fields, so the timezone always lands in its own column; a row longer than the header is a
+    ValueError.
+    """
+    reader = csv.reader(source)
+    writer = csv.writer(destination, lineterminator='\n')
+    header = next(reader, None)
+    if header is None:
+        raise ValueError('no header row, the input is empty')
+    lat_index, lon_index = column_index(header, lat_column), column_index(header, lon_column)
+    writer.writerow(header + [tz_column])
+    tagged = 0
+    while True:
+        rows = list(islice(reader, chunk_size))
+        if not rows:
+            return tagged
+        for number, row in enumerate(rows, tagged + 2):  # Line numbers, the header being line 1
+            if len(row) > len(header):
+                raise ValueError('row {} has {} fields, the header {}'.format(number, len(row), len(header)))
+            row.extend([''] * (len(header) - len(row)))
+        lats = np.array([to_float(row[lat_index]) for row in rows])
+        lons = np.array([to_float(row[lon_index]) for row in rows])
+        for row, tz in zip(rows, timezones_of(timezones, lats, lons)):
+            row.append(tz)
+        writer.writerows(rows)
+        tagged += len(rows)
+
+
+def json_object(line, number):
+    """The object on one line of NDJSON, ValueError naming the line if it isn't JSON or isn't an object"""
+    try:
+        row = json.loads(line)
+    except ValueError as error:
+        raise ValueError('line {} is not JSON, {}'.format(number, error))
+    if not isinstance(row, dict):
+        raise ValueError('line {} is a JSON {}, not an object'.format(number, type(row).__name__))
+    return row
+
+
+def tag_ndjson(source, destination, timezones, lat_column, lon_column, tz_column, chunk_size):
+    """Tags newline delimited JSON, one object per line, returns rows tagged. A line that isn't a JSON
+    object is a ValueError, blank lines are skipped.
+    """
+    tagged = 0
+    lines_read = 0
+    while True:
+        lines = list(islice(source, chunk_size))
+        rows = [json_object(line, number) for number, line in enumerate(lines, lines_read + 1) if line.strip()]
+        lines_read += len(lines)
+        if not lines:
+            return tagged
+        lats = np.array([to_float(row.get(lat_column)) for row in rows])
+        lons = np.array([to_float(row.get(lon_column)) for row in rows])
+        for row, tz in zip(rows, timezones_of(timezones, lats, lons)):
+            row[tz_column] = tz
+            destination.write(json.dumps(row))
+            destination.write('\n')
+        tagged += len(rows)
+
+
+def tag_parquet(source_path, destination_path, timezones, lat_column, lon_column, tz_column, chunk_size):
+    """Tags Parquet, record batch by record batch, needs pyarrow. Files only, Parquet can't stream
+    from a pipe. Returns rows tagged.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('Parquet needs pyarrow, "sudo -H pip3 install pyarrow"')
+    if source_path == '-' or destination_path == '-':
+        raise ValueError('Parquet is read and written as files, not through stdin/stdout')
+
+    parquet = pq.ParquetFile(source_path)
+    writer = None
+    tagged = 0
+    for column in (lat_column, lon_column):
+        column_index(parquet.schema_arrow.names, column)
+    try:
+        for batch in parquet.iter_batches(batch_size=chunk_size):
+            lats = batch.column(lat_column).to_numpy(zero_copy_only=False).astype(np.float64)
+            lons = batch.column(lon_column).to_numpy(zero_copy_only=False).astype(np.float64)
+            table = pa.Table.from_batches([batch]).append_column(
+                tz_column, pa.array(timezones_of(timezones, lats, lons), type=pa.string()))
+            if writer is None:
+                writer = pq.ParquetWriter(destination_path, table.schema)
+            writer.write_table(table)
+            tagged += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return tagged
+
+
+def tag(source_path, destination_path, file_format=None, lat_column='lat', lon_column='lon', tz_column='tz',
+        chunk_size=CHUNK_SIZE, timezones=None):
+    """Tags every row of a track file with the timezone of its lat/lon, holding one chunk at a time
+    Arguments:
+        source_path (str), track file, '-' for stdin
+        destination_path (str), tagged copy, '-' for stdout
+        file_format (str), 'csv', 'ndjson' or 'parquet', by default from the file extension, else csv
+        lat_column (str), lon_column (str), columns holding the coordinates
+        tz_column (str), column added for the timezone
+        chunk_size (int), rows per vectorised lookup
+        timezones (timmeh.TimezoneLookup), defaults to timmeh.timezones
+    Returns:
+        tagged (int), rows tagged
+    """
+    timezones = timezones or timmeh.timezones
+    file_format = file_format or FORMATS.get(os.path.splitext(source_path)[1].lower(), 'csv')
+    arguments = (timezones, lat_column, lon_column, tz_column, chunk_size)
+    if file_format == 'parquet':
+        return tag_parquet(source_path, destination_path, *arguments)
+
+    tagger = {'csv': tag_csv, 'ndjson': tag_ndjson}[file_format]
+    source = sys.stdin if source_path == '-' else open(source_path, newline='', encoding='utf-8')
+    destination = sys.stdout if destination_path == '-' else open(destination_path, 'w', newline='', encoding='utf-8')
+    try:
+        return tagger(source, destination, *arguments)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if destination is not sys.stdout:
+            destination.close()
+
+
+def add_arguments(parser):
+    """'tag' command line arguments, shared with timmeh.py"""
+    parser.add_argument('source', nargs='?', default='-', help="track file, '-' for stdin (the default)")
+    parser.add_argument('-o', '--output', default='-', help="tagged copy, '-' for stdout (the default)")
+    parser.add_argument('--format', choices=sorted(set(FORMATS.values())), help='default from the extension, or csv')
+    parser.add_argument('--lat', default='lat', help='latitude column')
+    parser.add_argument('--lon', default='lon', help='longitude column')
+    parser.add_argument('--tz', default='tz', help='timezone column to add')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows per lookup')
+
+
+def run(args, parser):
+    """Tags as the command line asks, reporting rows per second on stderr, and what's wrong with the input
+    through the parser
+    """
+    started = time.perf_counter()
+    try:
+        tagged = tag(args.source, args.output, args.format, args.lat, args.lon, args.tz, args.chunk_size)
+    except ValueError as error:
+        parser.error(str(error))
+    except BrokenPipeError:  # Whatever read stdout stopped, as 'head' does
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    seconds = time.perf_counter() - started
+    print('Tagged {} rows in {:.1f}s, {:.0f} rows/s'.format(tagged, seconds, tagged / seconds if seconds else 0),
+          file=sys.stderr)
+
+
+def main():
+    """Command line"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
+
+
+if __name__ == '__main__':
+    main()
+#
+# End
@@ -0,0 +1,167 @@
+#! /usr/bin/env python3
+# coding=utf-8
+"""UTC to local time in bulk. Each zone's UTC offset transitions are read once from the system's
+compiled zoneinfo (TZif) files and kept, after which converting any number of points is a lookup on
+the raster and a binary search per zone.
+"""
+import datetime
+import os
+import struct
+import zoneinfo
+
+import numpy as np
+
+if __package__:  # 'from timmeh import tztime', timmeh a package
+    from . import timmeh
+else:  # Run or imported from beside timmeh.py
+    import timmeh
+
+__author__ = 'Moe'
+__copyright__ = 'Copyright 2016  Moe'
+__license__ = 'MIT'
+__version__ = '0.0.5'
+
+END = int(datetime.datetime(2100, 1, 1, tzinfo=datetime.timezone.utc).timestamp())  # Transitions worked out to
+WEEK = 7 * 24 * 3600  # Rules never change a zone's offset twice in a week
+NO_ZONE = ('uninhabited', "Gates'o'Hell/Houston")  # No civil time, nautical time by longitude instead
+
+_transitions = {}  # tz --> (times, offsets), read on first use
+
+
+def read_tzif(tzif_path):
+    """Transitions written out in a compiled zoneinfo file, the 64 bit ones of version 2 and later
+    Arguments:
+        tzif_path (str), TZif file, as /usr/share/zoneinfo/Europe/Paris
+    Returns:
+        times (1D int64 array), UTC epoch seconds of each transition, ascending
+        offsets (1D int32 array), UTC offset in seconds from each transition on
+        initial (int), UTC offset in seconds before the first of them
+    """
+    with open(tzif_path, 'rb') as tzif:
+        data = tzif.read()
+    if data[:4] != b'TZif':
+        raise ValueError('{} is not a TZif file'.format(tzif_path))
+
+    header = struct.Struct('>4sc15x6l')  # magic, version, then the counts of each section
+    __magic, version, utc_count, standard_count, leap_count, time_count, type_count, character_count = \
+        header.unpack_from(data)
+    start, time_size = header.size, 4
+    if version >= b'2':  # Past the 32 bit data to the 64 bit header and data
+        start += (time_count * 5 + type_count * 6 + character_count + leap_count * 8 + standard_count + utc_count)
+        __magic, version, utc_count, standard_count, leap_count, time_count, type_count, character_count = \
+            header.unpack_from(data, start)
+        start, time_size = start + header.size, 8
+
+    times = np.frombuffer(data, dtype='>i{}'.format(time_size), count=time_count, offset=start).astype(np.int64)
+    types = np.frombuffer(data, dtype=np.uint8, count=time_count, offset=start + time_count * time_size)
+    type_start = start + time_count * (time_size + 1)
+    utc_offsets = np.array([struct.unpack_from('>l', data, type_start + index * 6)[0] for index in range(type_count)],
+                           dtype=np.int32)
+    return times, utc_offsets[types], int(utc_offsets[0])  # Type 0 is the time before any transition
+
+
+def sampled_transitions(zone, start, end=END):
+    """Transitions of a zone worked out from zoneinfo, week by week and then to the second, for the
+    years the TZif file leaves to its rule
+    Arguments:
+        zone (zoneinfo.ZoneInfo), the zone
+        start (int), end (int), UTC epoch seconds to look between
+    Returns:
+        times (list of ints), UTC epoch seconds of each transition
+        offsets (list of ints), UTC offset in seconds from each transition on
+    """
+    def offset_at(seconds):
+        return int(datetime.datetime.fromtimestamp(seconds, zone).utcoffset().total_seconds())
+
+    times, offsets = [], []
+    before, offset = start, offset_at(start)
+    for after in range(start + WEEK, end + WEEK, WEEK):
+        changed = offset_at(after)
+        if changed != offset:
+            low, high = before, after  # Offset before it at low, after it at high
+            while high - low > 1:
+                middle = (low + high) // 2
+                if offset_at(middle) == offset:
+                    low = middle
+                else:
+                    high = middle
+            times.append(high)
+            offsets.append(changed)
+            offset = changed
+        before = after
+    return times, offsets
+
+
+def transitions(tz):
+    """UTC offset transitions of a timezone, read on first use and kept
+    Arguments:
+        tz (str), 'proper named' timezone
+    Returns:
+        times (1D int64 array), UTC epoch seconds from which each offset holds, the first from the beginning
+            of time, ascending
+        offsets (1D int32 array), UTC offset in seconds of each
+    """
+    if tz not in _transitions:
+        zone = zoneinfo.ZoneInfo(tz)
+        for directory in zoneinfo.TZPATH:
+            if os.path.exists(os.path.join(directory, tz)):
+                times, offsets, initial = read_tzif(os.path.join(directory, tz))
+                break
+        else:  # zoneinfo has it from the tzdata package, not files; all from the rules, then
+            times, offsets, initial = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), None
+        start = int(times[-1]) if len(times) else 0
+        later_times, later_offsets = sampled_transitions(zone, start)
+        if initial is None:
+            initial = int(datetime.datetime.fromtimestamp(start, zone).utcoffset().total_seconds())
+        _transitions[tz] = (np.concatenate(([np.iinfo(np.int64).min], times, later_times)).astype(np.int64),
+                            np.concatenate(([initial], offsets, later_offsets)).astype(np.int32))
+    return _transitions[tz]
+
+
+def utc_offsets(zone_ids, zone_names, utc_seconds, lons, sea_zones=0):
+    """UTC offsets of points whose zones are known, one binary search per zone present
+    Arguments:
+        zone_ids (array of ints), index into 'zone_names' for each point
+        zone_names (list of str), zone table names, position being the zone index
+        utc_seconds (array of ints), UTC epoch seconds of each point
+        lons (array of floats), Longitudes, for the points in no civil timezone
+        sea_zones (int), zone indices 1..sea_zones are the open ocean's Etc/GMT zones, which the map names
+            the everyday way round, Etc/GMT-10 being ten hours behind, opposite to the tz database
+    Returns:
+        offsets (array of int32), UTC offset in seconds of each point
+    """
+    zone_ids, utc_seconds, lons = np.broadcast_arrays(np.asarray(zone_ids), np.asarray(utc_seconds, dtype=np.int64),
+                                                      np.asarray(lons, dtype=np.float64))
+    offsets = np.empty(zone_ids.shape, dtype=np.int32)
+    order = np.argsort(zone_ids, axis=None, kind='stable')  # Points grouped by zone
+    present, starts = np.unique(zone_ids.ravel()[order], return_index=True)
+    for zone_id, points in zip(present, np.split(order, starts[1:])):
+        if zone_names[zone_id] in NO_ZONE:
+            offsets.flat[points] = np.round(lons.flat[points] / 15) * 3600  # 15 degrees to the hour
+            continue
+        times, zone_offsets = transitions(zone_names[zone_id])
+        if 1 <= zone_id <= sea_zones:
+            zone_offsets = -zone_offsets  # Etc/GMT-10 in zoneinfo is UTC+10, on the map UTC-10
+        offsets.flat[points] = zone_offsets[np.searchsorted(times, utc_seconds.flat[points], 'right') - 1]
+    return offsets
+
+
+def local_times(lats, lons, utc_seconds, timezones=None):
+    """Local time of points at moments, the zone looked up on the raster and its offset at that moment
+    Arguments:
+        lats (array of floats), Latitudes North (positive), South (negative)
+        lons (array of floats), Longitudes East (positive), West (negative)
+        utc_seconds (array of ints), UTC epoch seconds of each point
+        timezones (timmeh.TimezoneLookup), defaults to timmeh.timezones
+    Returns:
+        zone_ids (array of ints), index into 'zone_names' for each point
+        offsets (array of int32), UTC offset in seconds of each point
+        local_seconds (array of int64), local time of each point, as epoch seconds; .astype('datetime64[s]')
+            for numpy datetimes
+    """
+    timezones = timezones or timmeh.timezones
+    zone_ids, __tz = timezones.lookup_many(lats, lons)
+    offsets = utc_offsets(zone_ids, timezones.zone_names, utc_seconds, lons, timezones.sea_zones)
+    return zone_ids, offsets, np.asarray(utc_seconds, dtype=np.int64) + offsets
+#
+# End